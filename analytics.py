@@ -0,0 +1,178 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from room_availability import row_interval
+import diagnostics
+
+# Occupancy and revenue reporting over Guest.csv and Future booking.csv.
+#
+# The stays and reservations are loaded once into NumPy arrays (start/end day ordinals, room type
+# codes, past stay or future booking). All reports are then computed with array operations:
+# nightly counts use a difference array (+1 on arrival, -1 on departure) followed by a cumulative
+# sum, so the cost depends on the number of stays and nights in the report, not on a Python loop
+# over every stay-night.
+
+UNASSIGNED = 'Unassigned'
+STAY = 0
+BOOKING = 1
+
+# Function to load stays and future bookings into arrays
+def load_stays(guest_data, booking_data):
+    type_by_prefix = {}
+    for guest in guest_data:
+        if guest.get('room_id') and guest.get('room_type'):
+            type_by_prefix.setdefault(guest['room_id'][:2], guest['room_type'])
+    room_types = sorted(set(type_by_prefix.values())) + [UNASSIGNED]
+    code_of = {room_type: code for code, room_type in enumerate(room_types)}
+
+    starts, ends, codes, sources = [], [], [], []
+    for source, rows in ((STAY, guest_data), (BOOKING, booking_data)):
+        for row in rows:
+            interval = row_interval(row)
+            if not interval or interval[1] <= interval[0]:
+                continue
+            room_type = row.get('room_type') or type_by_prefix.get((row.get('room_id') or '')[:2], UNASSIGNED)
+            starts.append(interval[0])
+            ends.append(interval[1])
+            codes.append(code_of.get(room_type, code_of[UNASSIGNED]))
+            sources.append(source)
+    return make_stays(starts, ends, codes, sources, room_types)
+
+# Function to wrap plain lists or arrays of stays into the structure used by the reports
+def make_stays(starts, ends, codes, sources, room_types):
+    return {
+        'start': np.asarray(starts, dtype=np.int32),
+        'end': np.asarray(ends, dtype=np.int32),
+        'type': np.asarray(codes, dtype=np.int16),
+        'source': np.asarray(sources, dtype=np.int8),
+        'room_types': list(room_types),
+    }
+
+# Function to list the dates of a report window [date_from, date_to)
+def _dates(first, last):
+    return [date.fromordinal(day).isoformat() for day in range(first, last)]
+
+# Function to select the stays of one source (STAY or BOOKING), or all of them
+def _select(stays, source=None):
+    if source is None:
+        return stays['start'], stays['end'], stays['type']
+    mask = stays['source'] == source
+    return stays['start'][mask], stays['end'][mask], stays['type'][mask]
+
+# Function to count, for every night in [date_from, date_to), the rooms occupied per room type
+def nightly_occupancy(stays, date_from, date_to, source=None):
+    first, last = date.fromisoformat(date_from).toordinal(), date.fromisoformat(date_to).toordinal()
+    nights = max(last - first, 0)
+    starts, ends, types = _select(stays, source)
+    # Only stays that overlap the window matter; clip them to it
+    mask = (starts < last) & (ends > first)
+    starts = np.clip(starts[mask], first, last) - first
+    ends = np.clip(ends[mask], first, last) - first
+    types = types[mask].astype(np.int64)
+    type_count = len(stays['room_types'])
+    difference = np.zeros(type_count * (nights + 1), dtype=np.int64)
+    difference += np.bincount(types * (nights + 1) + starts, minlength=difference.size)
+    difference -= np.bincount(types * (nights + 1) + ends, minlength=difference.size)
+    counts = np.cumsum(difference.reshape(type_count, nights + 1), axis=1)[:, :nights]
+    return {'dates': _dates(first, last), 'room_types': stays['room_types'], 'counts': counts}
+
+# Function to count arrivals and departures per day and room type in [date_from, date_to)
+def arrivals_departures(stays, date_from, date_to, source=None):
+    first, last = date.fromisoformat(date_from).toordinal(), date.fromisoformat(date_to).toordinal()
+    days = max(last - first, 0)
+    starts, ends, types = _select(stays, source)
+    type_count = len(stays['room_types'])
+
+    def per_day(days_of_event):
+        mask = (days_of_event >= first) & (days_of_event < last)
+        cells = types[mask].astype(np.int64) * days + (days_of_event[mask] - first)
+        return np.bincount(cells, minlength=type_count * days).reshape(type_count, days)
+
+    return {'dates': _dates(first, last), 'room_types': stays['room_types'],
+            'arrivals': per_day(starts), 'departures': per_day(ends)}
+
+# Function to count stays by their length in nights, per room type
+def length_of_stay_distribution(stays, source=None, max_nights=30):
+    starts, ends, types = _select(stays, source)
+    # Stays longer than max_nights are counted in the last bucket
+    nights = np.minimum(ends - starts, max_nights).astype(np.int64)
+    type_count = len(stays['room_types'])
+    counts = np.bincount(types.astype(np.int64) * (max_nights + 1) + nights,
+                         minlength=type_count * (max_nights + 1)).reshape(type_count, max_nights + 1)
+    return {'nights': list(range(max_nights + 1)), 'room_types': stays['room_types'], 'counts': counts}
+
+# Function to count the reserved rooms per night and room type for future dates (on the books)
+def on_the_books(stays, date_from, date_to):
+    return nightly_occupancy(stays, date_from, date_to, source=BOOKING)
+
+# Function to print a per-date table with one column per room type
+def print_table(dates, room_types, counts, title):
+    print(f"\n{title}")
+    columns = [room_type for room_type, column in zip(room_types, counts) if column.any()] or room_types
+    rows = [column for column in counts if column.any()] or list(counts)
+    print(f"{'Date':<12}" + "".join(f"{room_type[:13]:>14}" for room_type in columns) + f"{'Total':>8}")
+    for position, day in enumerate(dates):
+        values = [int(row[position]) for row in rows]
+        print(f"{day:<12}" + "".join(f"{value:>14}" for value in values) + f"{sum(values):>8}")
+
+# Function to ask for a date range; returns (date_from, date_to) or None
+def ask_date_range():
+    date_from = input("Enter start date (YYYY-MM-DD): ").strip()
+    date_to = input("Enter end date, exclusive (YYYY-MM-DD): ").strip()
+    try:
+        if date.fromisoformat(date_to) <= date.fromisoformat(date_from):
+            print("End date must be after the start date.")
+            return None
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return None
+    return date_from, date_to
+
+# Main function to manage the reports
+def reports_operations(guest_data, booking_data):
+    stays = load_stays(guest_data, booking_data)
+    while True:
+        print("\nReports:")
+        print("1. Nightly occupancy by room type")
+        print("2. Arrivals and departures by day")
+        print("3. Length of stay distribution")
+        print("4. On-the-books reservations for next month")
+        print("5. Go back")
+
+        choice = diagnostics.ask_menu_choice('reports', "Choose an operation: ").strip()
+
+        if choice == "1":
+            date_range = ask_date_range()
+            if date_range:
+                report = nightly_occupancy(stays, *date_range)
+                print_table(report['dates'], report['room_types'], report['counts'], "Occupied rooms per night:")
+
+        elif choice == "2":
+            date_range = ask_date_range()
+            if date_range:
+                report = arrivals_departures(stays, *date_range)
+                print_table(report['dates'], report['room_types'], report['arrivals'], "Arrivals per day:")
+                print_table(report['dates'], report['room_types'], report['departures'], "Departures per day:")
+
+        elif choice == "3":
+            report = length_of_stay_distribution(stays)
+            print("\nNumber of stays by length in nights (last row includes longer stays):")
+            print(f"{'Nights':<8}" + "".join(f"{room_type[:13]:>14}" for room_type in report['room_types']))
+            for nights in report['nights'][1:]:
+                values = report['counts'][:, nights]
+                if values.any():
+                    print(f"{nights:<8}" + "".join(f"{int(value):>14}" for value in values))
+
+        elif choice == "4":
+            today = date.today()
+            date_from = (today + timedelta(days=1)).isoformat()
+            date_to = (today + timedelta(days=31)).isoformat()
+            report = on_the_books(stays, date_from, date_to)
+            print_table(report['dates'], report['room_types'], report['counts'], "Reserved rooms per night:")
+
+        elif choice == "5":
+            break
+
+        else:
+            print("Invalid choice. Please try again.")
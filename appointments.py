@@ -0,0 +1,240 @@
+from datetime import date, datetime, timedelta
+import re
+
+# Helper functions for booking guests into the hotel services (spa, restaurant, pool, ...).
+#
+# The Working Hours of every service in Hotel_Services.csv ("09:00 - 21:00", "24/7") are turned
+# into a grid of SLOT_MINUTES slots, stored as a bitmap with one bit per slot of the day. Each
+# service takes a number of guests per slot (its capacity). The appointments in Appointments.csv
+# are counted per service, day and slot, and next to the counts every (service, day) keeps a
+# bitmap of the slots that are full. "Next free slot" is then the lowest bit of
+# open & ~full (& the slots from the asked time on), and "which services are open now" is a list
+# precomputed per slot of the day, so neither question scans the appointments.
+#
+# The counts follow the appointments dataset through its change listener. Appointments can only
+# be made for guests who are in-house on that day according to Guest.csv.
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+ALL_SLOTS = (1 << SLOTS_PER_DAY) - 1
+
+# Guests a service can take in one slot; services not listed take DEFAULT_CAPACITY
+SERVICE_CAPACITY = {
+    'Spa and Wellness Center': 6,
+    'Fitness Center': 40,
+    'Indoor Pool': 50,
+    'Restaurant and Bar': 80,
+}
+DEFAULT_CAPACITY = 10
+
+# How many days ahead next_free_slot() looks
+SEARCH_DAYS = 14
+
+_HOURS = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+# Function to get the key a service is stored under, so that names match regardless of case
+def service_key(name):
+    return (name or '').strip().casefold()
+
+# Function to turn 'HH:MM' into the number of its slot; raises ValueError unless it starts a slot,
+# or with round_up=True gives the first slot that starts at or after it
+def parse_time(text, round_up=False):
+    hours, _, minutes = (text or '').strip().partition(':')
+    if not (hours.isdigit() and minutes.isdigit() and len(minutes) == 2):
+        raise ValueError(f"Invalid time '{text}'. Please use HH:MM.")
+    total = int(hours) * 60 + int(minutes)
+    if int(minutes) >= 60 or total >= 24 * 60:
+        raise ValueError(f"Invalid time '{text}'. Please use HH:MM.")
+    if total % SLOT_MINUTES:
+        if round_up:
+            return -(-total // SLOT_MINUTES)
+        raise ValueError(f"Appointments start every {SLOT_MINUTES} minutes (for example 09:00 or 09:30).")
+    return total // SLOT_MINUTES
+
+# Function to turn a slot number back into 'HH:MM'
+def slot_time(slot):
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# Function to turn the Working Hours of a service into the bitmap of its open slots; hours that
+# cannot be read give an empty bitmap, and hours past midnight ("20:00 - 02:00") wrap around
+def parse_working_hours(text):
+    text = (text or '').strip()
+    if text.casefold() in ('24/7', '24h', '24 hours'):
+        return ALL_SLOTS
+    match = _HOURS.match(text)
+    if not match:
+        return 0
+    open_hour, open_minute, close_hour, close_minute = map(int, match.groups())
+    # Slots that are only partly inside the working hours are left out
+    first = -(-(open_hour * 60 + open_minute) // SLOT_MINUTES)
+    last = min(close_hour * 60 + close_minute, 24 * 60) // SLOT_MINUTES
+    if first >= SLOTS_PER_DAY:
+        return 0
+    if last > first:
+        return ((1 << last) - 1) & ~((1 << first) - 1)
+    return (ALL_SLOTS & ~((1 << first) - 1)) | ((1 << last) - 1)
+
+# Function to check whether a slot is set in a bitmap
+def slot_open(bitmap, slot):
+    return bitmap >> slot & 1 == 1
+
+# Function to build the schedule: the slot grid of every service and the appointments counted per slot
+def build_schedule(services_data, appointments_data):
+    schedule = {'services': {}, 'open_by_slot': [[] for _ in range(SLOTS_PER_DAY)],
+                'counts': {}, 'full': {}, 'by_guest': {}}
+    for service in services_data:
+        name = service.get('Service Name', '')
+        entry = {'name': name, 'open': parse_working_hours(service.get('Working Hours')),
+                 'capacity': SERVICE_CAPACITY.get(name, DEFAULT_CAPACITY)}
+        schedule['services'][service_key(name)] = entry
+        for slot in range(SLOTS_PER_DAY):
+            if slot_open(entry['open'], slot):
+                schedule['open_by_slot'][slot].append(entry)
+    for appointment in appointments_data:
+        _add_appointment(schedule, appointment)
+    if hasattr(appointments_data, 'on_change'):
+        appointments_data.on_change(lambda op, row, old_values: update_schedule(schedule, op, row, old_values))
+    return schedule
+
+# Function to get the schedule of the datasets, building it on first use
+def get_schedule(services_data, appointments_data):
+    if hasattr(appointments_data, 'derived'):
+        return appointments_data.derived('schedule', lambda rows: build_schedule(services_data, rows))
+    return build_schedule(services_data, appointments_data)
+
+# Function to add (step 1) or take away (step -1) one appointment from the counts and the full bitmaps
+def _count(schedule, appointment, step):
+    key = service_key(appointment.get('service_name'))
+    service = schedule['services'].get(key)
+    try:
+        slot = parse_time(appointment.get('time'))
+    except ValueError:
+        return
+    if service is None:
+        return
+    day = appointment.get('date')
+    counts = schedule['counts'].setdefault((key, day), [0] * SLOTS_PER_DAY)
+    counts[slot] += step
+    full = schedule['full'].get((key, day), 0)
+    if counts[slot] >= service['capacity']:
+        full |= 1 << slot
+    else:
+        full &= ~(1 << slot)
+    schedule['full'][(key, day)] = full
+
+# Function to add an appointment to the counts and to its guest's list
+def _add_appointment(schedule, appointment):
+    _count(schedule, appointment, 1)
+    schedule['by_guest'].setdefault(appointment.get('guest_id'), []).append(appointment)
+
+# Function to take an appointment out of the schedule; values are the ones it was added with
+def _remove_appointment(schedule, appointment, values):
+    _count(schedule, values, -1)
+    guest_id = values.get('guest_id')
+    appointments = schedule['by_guest'].get(guest_id, [])
+    appointments[:] = [a for a in appointments if a is not appointment]
+    if not appointments:
+        schedule['by_guest'].pop(guest_id, None)
+
+# Function to apply a change reported by the appointments dataset to the schedule
+def update_schedule(schedule, op, appointment, old_values=None):
+    if op in ('update', 'delete'):
+        _remove_appointment(schedule, appointment, {**dict(appointment.items()), **(old_values or {})})
+    if op in ('update', 'insert'):
+        _add_appointment(schedule, appointment)
+
+# Function to find a service by name (case-insensitive); returns None if unknown
+def find_service(schedule, service_name):
+    return schedule['services'].get(service_key(service_name))
+
+# Function to get the number of free places of a service in one slot of a day
+def free_places(schedule, service, day, slot):
+    if not slot_open(service['open'], slot):
+        return 0
+    counts = schedule['counts'].get((service_key(service['name']), day))
+    return service['capacity'] - (counts[slot] if counts else 0)
+
+# Function to find the first slot with a free place from a day and time on; returns (day, 'HH:MM') or None
+def next_free_slot(schedule, service_name, day, time='00:00', days=SEARCH_DAYS):
+    service = find_service(schedule, service_name)
+    if service is None or not service['open']:
+        return None
+    key = service_key(service['name'])
+    first_day = date.fromisoformat(day)
+    from_slot = parse_time(time, round_up=True)
+    for offset in range(days):
+        current = (first_day + timedelta(days=offset)).isoformat()
+        free = service['open'] & ~schedule['full'].get((key, current), 0)
+        if offset == 0:
+            free &= ~((1 << from_slot) - 1)
+        if free:
+            return current, slot_time((free & -free).bit_length() - 1)
+    return None
+
+# Function to list the services open at a moment, each with its free places in that slot
+def open_services(schedule, moment=None):
+    moment = moment or datetime.now()
+    slot = (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+    day = moment.date().isoformat()
+    return [(service, free_places(schedule, service, day, slot)) for service in schedule['open_by_slot'][slot]]
+
+# Function to find a guest's appointment for a service, day and time; returns None if there is none
+def find_appointment(schedule, guest_id, service_name, day, time):
+    for appointment in schedule['by_guest'].get(guest_id, []):
+        if (service_key(appointment.get('service_name')) == service_key(service_name)
+                and appointment.get('date') == day and appointment.get('time') == time):
+            return appointment
+    return None
+
+# Function to list a guest's appointments by day and time
+def guest_appointments(schedule, guest_id):
+    return sorted(schedule['by_guest'].get(guest_id, []), key=lambda a: (a.get('date') or '', a.get('time') or ''))
+
+# Function to book a guest into a service without prompting; returns (appointment, error message).
+# guest is the guest's row from Guest.csv; the day must be within the guest's stay.
+def book_appointment(appointments_data, schedule, guest, service_name, day, time):
+    service = find_service(schedule, service_name)
+    if service is None:
+        return None, f"Unknown service '{service_name}'."
+    try:
+        day = date.fromisoformat(day).isoformat()
+    except ValueError:
+        return None, "Invalid date format. Please use YYYY-MM-DD."
+    try:
+        slot = parse_time(time)
+    except ValueError as e:
+        return None, str(e)
+    time = slot_time(slot)
+    if not slot_open(service['open'], slot):
+        return None, f"{service['name']} is closed at {time}."
+    if not (guest.get('check_in_date') or '') <= day <= (guest.get('check_out_date') or ''):
+        return None, (f"Guest {guest.get('guest_id')} is not staying at the hotel on {day} "
+                      f"(stay: {guest.get('check_in_date')} to {guest.get('check_out_date')}).")
+    if find_appointment(schedule, guest.get('guest_id'), service['name'], day, time):
+        return None, f"The guest already has an appointment for {service['name']} on {day} at {time}."
+    if free_places(schedule, service, day, slot) <= 0:
+        suggestion = next_free_slot(schedule, service['name'], day, time)
+        hint = f" The next free slot is on {suggestion[0]} at {suggestion[1]}." if suggestion else ""
+        return None, f"{service['name']} is fully booked on {day} at {time}.{hint}"
+    appointment = appointments_data.append({
+        'guest_id': guest.get('guest_id'), 'first_name': guest.get('first_name'), 'last_name': guest.get('last_name'),
+        'service_name': service['name'], 'date': day, 'time': time,
+    })
+    return appointment, None
+
+# Function to cancel a guest's appointment without prompting; returns an error message or None
+def cancel_appointment(appointments_data, schedule, guest_id, service_name, day, time):
+    try:
+        day = date.fromisoformat(day).isoformat()
+    except ValueError:
+        return "Invalid date format. Please use YYYY-MM-DD."
+    try:
+        time = slot_time(parse_time(time))
+    except ValueError as e:
+        return str(e)
+    appointment = find_appointment(schedule, guest_id, service_name, day, time)
+    if appointment is None:
+        return f"No appointment found for guest {guest_id} at {service_name} on {day} at {time}."
+    appointments_data.remove(appointment)
+    return None
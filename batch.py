@@ -0,0 +1,215 @@
+import json
+import sys
+import time
+from itertools import islice
+
+import system
+from dataset import batch_writes
+from company_index import get_company_index, search_companies, find_company_rates, PRICE_COLUMNS
+from company_operations import find_company, set_cooperation_status, set_company_prices
+from room_availability import find_conflict, date_ordinal, list_free_rooms
+from tracking_future_bookings import create_reservation, change_booking_dates, find_booking
+from change_log import read_changes
+import appointments
+
+# Non-interactive access to the hotel operations.
+#
+# Every command is a dict with an "op" key plus the values the menus would otherwise ask for,
+# for example {"op": "cancel_booking", "first_name": "Diana", "last_name": "Miller"}.
+# A batch file holds one command per line (JSONL). All commands of a batch are applied in memory
+# and every touched CSV file is written once at the end.
+
+# Function to turn rows into plain dicts for the results
+def _rows(rows):
+    return [dict(row) for row in rows]
+
+def search_guest_by_id(command):
+    guest = system.find_guest(command['guest_id'])
+    return {'ok': True, 'results': _rows([guest] if guest else [])}
+
+def search_guest_by_name(command):
+    if command.get('last_name'):
+        results = system.guest_data.find_prefix('first_name', command['first_name'], last_name=command['last_name'])
+    else:
+        results = system.guest_data.find_prefix('first_name', command['first_name'])
+    return {'ok': True, 'results': _rows(results)}
+
+def modify_checkout(command):
+    return _result(system.change_checkout_date(command['guest_id'], command['check_out_date']))
+
+def change_cooperation_status(command):
+    company = find_company(system.company_data, command['company'])
+    if not company:
+        return _result(f"No company found with the name '{command['company']}'.")
+    return _result(set_cooperation_status(system.company_data, company, command['status']))
+
+def update_company_prices(command):
+    company = find_company(system.company_data, command['company'])
+    if not company:
+        return _result(f"No company found with the name '{command['company']}'.")
+    return _result(set_company_prices(system.company_data, company, command['prices']))
+
+def add_booking(command):
+    booking, error = create_reservation(system.booking_data, command, system.get_room_availability())
+    if error:
+        return _result(error)
+    return {'ok': True, 'results': _rows([booking])}
+
+def modify_booking(command):
+    booking = find_booking(system.booking_data, command['first_name'], command['last_name'])
+    if not booking:
+        return _result(f"No booking found for {command['first_name']} {command['last_name']}.")
+    return _result(change_booking_dates(system.booking_data, booking, command['reserved_from'],
+                                        command['reserved_to'], system.get_room_availability()))
+
+def cancel_booking(command):
+    booking = find_booking(system.booking_data, command['first_name'], command['last_name'])
+    if not booking:
+        return _result(f"No booking found for {command['first_name']} {command['last_name']}.")
+    system.get_front_office_views()
+    system.booking_data.remove(booking)
+    return _result(None)
+
+def search_company(command):
+    index = get_company_index(system.company_data)
+    return {'ok': True, 'results': _rows(search_companies(index, command['name'], command.get('limit', 20)))}
+
+def company_prices(command):
+    entry = find_company_rates(get_company_index(system.company_data), command['company'])
+    if not entry:
+        return _result(f"No company found with the name '{command['company']}'.")
+    if 'net_prices' not in entry:
+        return _result("Invalid numeric value in the dataset.")
+    prices = dict(zip(PRICE_COLUMNS, entry['net_prices']))
+    return {'ok': True, 'results': [dict(prices, **{'Company Name': entry['company']['Company Name'],
+                                                    'Discount %': int(entry['discount'] * 100)})]}
+
+def list_services(command):
+    return {'ok': True, 'results': _rows(system.services_data)}
+
+def search_booking(command):
+    bookings = system.booking_data.find('first_name', command['first_name'], last_name=command['last_name'])
+    return {'ok': True, 'results': _rows(bookings)}
+
+def check_room(command):
+    room_id = command['room_id'].strip().upper()
+    try:
+        conflict = find_conflict(system.get_room_availability(), room_id,
+                                 date_ordinal(command['reserved_from']), date_ordinal(command['reserved_to']))
+    except ValueError:
+        return _result("Invalid date format. Please use YYYY-MM-DD.")
+    # The results hold the stay or booking that occupies the room; an empty list means it is free
+    return {'ok': True, 'results': _rows([conflict] if conflict else [])}
+
+def free_rooms(command):
+    try:
+        rooms = list_free_rooms(system.get_room_availability(), command['room_type'],
+                                command['reserved_from'], command['reserved_to'])
+    except ValueError:
+        return _result("Invalid date format. Please use YYYY-MM-DD.")
+    return {'ok': True, 'results': [{'room_id': room_id} for room_id in rooms]}
+
+# Function to get the appointment schedule of the services (see appointments.py)
+def _schedule():
+    return appointments.get_schedule(system.services_data, system.appointments_data)
+
+def book_appointment(command):
+    guest = system.find_guest(command['guest_id'])
+    if guest is None:
+        return _result(f"No match found for guest ID '{command['guest_id']}'.")
+    appointment, error = appointments.book_appointment(system.appointments_data, _schedule(), guest, command['service'],
+                                                       command['date'], command['time'])
+    if error:
+        return _result(error)
+    return {'ok': True, 'results': _rows([appointment])}
+
+def cancel_appointment(command):
+    return _result(appointments.cancel_appointment(system.appointments_data, _schedule(), command['guest_id'],
+                                                   command['service'], command['date'], command['time']))
+
+def list_appointments(command):
+    return {'ok': True, 'results': _rows(appointments.guest_appointments(_schedule(), command['guest_id']))}
+
+def next_service_slot(command):
+    try:
+        slot = appointments.next_free_slot(_schedule(), command['service'], command['date'], command.get('time', '00:00'))
+    except ValueError as e:
+        return _result(str(e))
+    return {'ok': True, 'results': [{'date': slot[0], 'time': slot[1]}] if slot else []}
+
+def open_now(command):
+    return {'ok': True, 'results': [{'Service Name': service['name'], 'capacity': service['capacity'], 'free': free}
+                                    for service, free in appointments.open_services(_schedule())]}
+
+# Function to list the recorded changes after a sequence number, oldest first (at most limit of them)
+def changes_since(command):
+    changes = read_changes(system.change_log.path, command.get('since', 0))
+    return {'ok': True, 'results': list(islice(changes, command.get('limit', 1000)))}
+
+def _result(error):
+    return {'ok': False, 'error': error} if error else {'ok': True}
+
+COMMANDS = {
+    'search_guest_by_id': search_guest_by_id,
+    'search_guest_by_name': search_guest_by_name,
+    'modify_checkout': modify_checkout,
+    'change_cooperation_status': change_cooperation_status,
+    'update_company_prices': update_company_prices,
+    'add_booking': add_booking,
+    'modify_booking': modify_booking,
+    'cancel_booking': cancel_booking,
+    'search_company': search_company,
+    'company_prices': company_prices,
+    'list_services': list_services,
+    'search_booking': search_booking,
+    'check_room': check_room,
+    'free_rooms': free_rooms,
+    'book_appointment': book_appointment,
+    'cancel_appointment': cancel_appointment,
+    'list_appointments': list_appointments,
+    'next_service_slot': next_service_slot,
+    'open_services': open_now,
+    'changes_since': changes_since,
+}
+
+# Commands that only read; they never change a dataset
+READ_COMMANDS = {'search_guest_by_id', 'search_guest_by_name', 'search_company', 'company_prices',
+                 'list_services', 'search_booking', 'check_room', 'free_rooms', 'list_appointments',
+                 'next_service_slot', 'open_services', 'changes_since'}
+
+# Function to run a single command; returns a result dict with "ok" and either "results" or "error"
+def run_command(command):
+    handler = COMMANDS.get(command.get('op'))
+    if handler is None:
+        return {'ok': False, 'error': f"Unknown operation '{command.get('op')}'."}
+    try:
+        return handler(command)
+    except KeyError as e:
+        return {'ok': False, 'error': f"Missing required value '{e.args[0]}'."}
+
+# Function to run many commands, writing every touched CSV file once at the end
+def run_commands(commands):
+    with batch_writes(system.guest_data, system.company_data, system.booking_data, system.appointments_data):
+        return [run_command(command) for command in commands]
+
+# Function to run a JSONL file of commands and optionally write one JSON result per line
+def run_batch_file(commands_path, results_path=None):
+    with open(commands_path, 'r') as file:
+        commands = [json.loads(line) for line in file if line.strip()]
+    start = time.perf_counter()
+    results = run_commands(commands)
+    elapsed = time.perf_counter() - start
+    if results_path:
+        with open(results_path, 'w') as file:
+            for result in results:
+                file.write(json.dumps(result) + '\n')
+    failed = sum(1 for result in results if not result['ok'])
+    rate = len(commands) / elapsed if elapsed else float('inf')
+    print(f"Processed {len(commands)} commands ({failed} failed) in {elapsed:.2f} s ({rate:.0f} commands/s).")
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python batch.py commands.jsonl [results.jsonl]")
+    else:
+        run_batch_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,997 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+import subprocess
+import asyncio
+import json
+import shutil
+import builtins
+import io
+from contextlib import contextmanager, redirect_stdout
+from dataset import Dataset, batch_writes
+from snapshot import snapshot_path
+from records import GuestRecord, BookingRecord, CompanyRecord, ServiceRecord
+from field_index import build_field_index, find_equal, find_prefix, filter_equal
+from room_availability import build_availability, add_interval, find_conflict, row_interval
+from room_assignment import plan_assignments
+from generate_data import (generate_dataset, generate_guests, generate_bookings, make_rooms, write_csv,
+                           FIRST_NAMES, LAST_NAMES, ROOM_TYPES)
+from guest_identity import build_identity_index, identity_key
+from partitions import PartitionedDataset, partition_csv
+
+# Benchmarks for the performance-sensitive parts of the hotel system.
+# Run with: python benchmarks.py [benchmark name]
+
+# Function to time a callable over a number of repetitions and return seconds per call
+def time_it(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+# Function to compare linear scans against the guest indexes
+def benchmark_guest_lookup(count=1000000):
+    guests = generate_guests(count, random.Random(0))
+    start = time.perf_counter()
+    by_id = build_field_index(guests, 'guest_id')
+    by_first_name = build_field_index(guests, 'first_name')
+    build_time = time.perf_counter() - start
+    target = guests[count // 2]
+    guest_id = target['guest_id']
+    first_name = target['first_name']
+    last_name = target['last_name']
+
+    scan_id = time_it(lambda: [g for g in guests if g['guest_id'] == guest_id], 3)
+    index_id = time_it(lambda: find_equal(by_id, guest_id), 10000)
+    scan_name = time_it(lambda: [g for g in guests if first_name.lower() in g['first_name'].lower()], 3)
+    index_name = time_it(lambda: find_prefix(by_first_name, first_name), 1000)
+    scan_full = time_it(lambda: [g for g in guests if first_name.lower() in g['first_name'].lower()
+                                 and g['last_name'].lower() == last_name.lower()], 3)
+    index_full = time_it(lambda: filter_equal(find_prefix(by_first_name, first_name), {'last_name': last_name}), 1000)
+
+    print(f"Guest lookup benchmark with {count} rows (index build: {build_time:.2f} s)")
+    print(f"{'Lookup':<12}{'Scan (ms)':>12}{'Index (ms)':>12}{'Speedup':>12}")
+    for label, scan, indexed in [('By ID', scan_id, index_id), ('By name', scan_name, index_name),
+                                 ('Full name', scan_full, index_full)]:
+        print(f"{label:<12}{scan * 1000:>12.3f}{indexed * 1000:>12.4f}{scan / indexed:>11.0f}x")
+
+# Function to measure the automatic room assignment on a full season of bookings
+def benchmark_room_assignment(count=100000, rooms_per_type=700, assigned_share=0.2):
+    rng = random.Random(0)
+    rooms = [(f"{prefix}{number:03d}", room_type) for prefix, room_type, _ in ROOM_TYPES
+             for number in range(1, rooms_per_type + 1)]
+    inventory = [{'room_id': room_id, 'room_type': room_type,
+                  'check_in_date': '2024-10-01', 'check_out_date': '2024-10-02'} for room_id, room_type in rooms]
+    bookings = generate_bookings(count, rng, rooms)
+    # A share of the bookings keeps its room, as if pinned by a reservation agent; the rest waits for one
+    for booking in bookings:
+        if rng.random() >= assigned_share:
+            booking['room_id'] = ''
+    start = time.perf_counter()
+    availability = build_availability(inventory, bookings)
+    build_time = time.perf_counter() - start
+    waiting = [booking for booking in bookings if not booking['room_id']]
+
+    start = time.perf_counter()
+    assignments, unassigned = plan_assignments(waiting, availability)
+    assign_time = time.perf_counter() - start
+
+    # Verify that no room ends up double-booked
+    for booking, room_id in assignments:
+        booking['room_id'] = room_id
+    check = build_availability(inventory, [])
+    for booking in bookings:
+        if booking['room_id']:
+            start, end = row_interval(booking)
+            assert find_conflict(check, booking['room_id'], start, end) is None, "double-booked room"
+            add_interval(check, booking)
+
+    print(f"Room assignment benchmark with {count} bookings and {len(rooms)} rooms")
+    print(f"Index build: {build_time:.2f} s")
+    print(f"Assigned {len(assignments)} of {len(waiting)} unassigned bookings in {assign_time:.2f} s "
+          f"({len(waiting) / assign_time:.0f} bookings/s), {len(unassigned)} left without a room")
+
+DATASETS = [('Guest.csv', GuestRecord), ('Future booking.csv', BookingRecord),
+            ('Companies.csv', CompanyRecord), ('Hotel_Services.csv', ServiceRecord)]
+
+# Function to write a copy of a shipped CSV file with its rows repeated `scale` times
+def write_scaled_csv(source, target, scale):
+    with open(source, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        rows = list(reader)
+    with open(target, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for _ in range(scale):
+            writer.writerows(rows)
+
+# Function to measure time and memory of loading a CSV with a given loader
+def measure_load(loader):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = loader()
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, elapsed, memory
+
+# Function to compare dict rows from csv.DictReader with compact records on the four datasets
+def benchmark_records(scale=500):
+    print(f"Record benchmark with the shipped datasets repeated {scale} times")
+    print("Record s is a cold Dataset.load(), which also writes the snapshot cache")
+    print(f"{'Dataset':<20}{'Rows':>9}{'Dict MB':>10}{'Record MB':>11}{'Dict s':>9}{'Record s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for file_name, record_class in DATASETS:
+            path = os.path.join(directory, file_name)
+            write_scaled_csv(file_name, path, scale)
+
+            def load_dicts():
+                with open(path, 'r') as file:
+                    return list(csv.DictReader(file))
+            dicts, dict_time, dict_memory = measure_load(load_dicts)
+
+            def load_records():
+                dataset = Dataset(path, record_class)
+                dataset.load()
+                return dataset
+            records, record_time, record_memory = measure_load(load_records)
+            print(f"{file_name:<20}{len(dicts):>9}{dict_memory / 1e6:>10.1f}{record_memory / 1e6:>11.1f}"
+                  f"{dict_time:>9.2f}{record_time:>10.2f}")
+
+            if record_class is GuestRecord:
+                # Count stays that overlap a date range: strptime on strings versus stored ordinals
+                lo, hi = date(2024, 10, 1), date(2024, 10, 8)
+                start = time.perf_counter()
+                by_text = sum(1 for g in dicts
+                              if datetime.strptime(g['check_in_date'], "%Y-%m-%d").date() < hi
+                              and datetime.strptime(g['check_out_date'], "%Y-%m-%d").date() > lo)
+                text_time = time.perf_counter() - start
+                lo, hi = lo.toordinal(), hi.toordinal()
+                start = time.perf_counter()
+                by_ordinal = sum(1 for g in records if g.check_in_date < hi and g.check_out_date > lo)
+                ordinal_time = time.perf_counter() - start
+                assert by_text == by_ordinal
+                print(f"{'':<20}Date range filter: {text_time:.2f} s with strptime, {ordinal_time:.3f} s with ordinals")
+            del dicts, records
+
+# Function to compare loading the datasets from CSV (cold) and from the snapshot cache (warm)
+def benchmark_startup(scale=500):
+    print(f"Startup benchmark with the shipped datasets repeated {scale} times")
+    with tempfile.TemporaryDirectory() as directory:
+        for file_name, _ in DATASETS:
+            write_scaled_csv(file_name, os.path.join(directory, file_name), scale)
+
+        # Time until the main menu is shown: the datasets are no longer read at import time
+        source_directory = os.path.dirname(os.path.abspath(__file__))
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import system'], cwd=directory, check=True,
+                       env=dict(os.environ, PYTHONPATH=source_directory))
+        print(f"Python start and import system (menu ready): {time.perf_counter() - start:.2f} s")
+
+        print(f"{'Dataset':<20}{'Cold s':>9}{'Warm s':>9}")
+        for file_name, record_class in DATASETS:
+            path = os.path.join(directory, file_name)
+            start = time.perf_counter()
+            Dataset(path, record_class).load()
+            cold = time.perf_counter() - start
+            assert os.path.exists(snapshot_path(path))
+            start = time.perf_counter()
+            Dataset(path, record_class).load()
+            warm = time.perf_counter() - start
+            print(f"{file_name:<20}{cold:>9.2f}{warm:>9.2f}")
+
+# Function to time the NumPy reports on a large synthetic set of stays
+def benchmark_analytics(count=1000000):
+    try:
+        import numpy as np
+        import analytics
+    except ImportError:
+        print("The analytics benchmark needs NumPy (pip install numpy).")
+        return
+    rng = np.random.default_rng(0)
+    first = date(2024, 1, 1).toordinal()
+    starts = first + rng.integers(0, 730, count)
+    ends = starts + rng.choice([1, 2, 3, 4, 5, 7, 10, 14], count)
+    types = rng.integers(0, len(ROOM_TYPES), count)
+    sources = (starts > date(2025, 1, 1).toordinal()).astype(np.int8)
+    stays = analytics.make_stays(starts, ends, types, sources, [name for _, name, _ in ROOM_TYPES] + [analytics.UNASSIGNED])
+    stay_nights = int((ends - starts).sum())
+
+    print(f"Analytics benchmark with {count} stays ({stay_nights} stay-nights)")
+    for label, report in [
+        ('Nightly occupancy, 2 years', lambda: analytics.nightly_occupancy(stays, '2024-01-01', '2026-01-01')),
+        ('Nightly occupancy, 1 month', lambda: analytics.nightly_occupancy(stays, '2025-03-01', '2025-04-01')),
+        ('Arrivals/departures, 2 years', lambda: analytics.arrivals_departures(stays, '2024-01-01', '2026-01-01')),
+        ('Length of stay distribution', lambda: analytics.length_of_stay_distribution(stays)),
+        ('On the books, 1 month', lambda: analytics.on_the_books(stays, '2025-03-01', '2025-04-01')),
+    ]:
+        print(f"{label:<32}{time_it(report, 5) * 1000:>9.1f} ms")
+
+# Function to create synthetic partner companies with the same columns as Companies.csv
+def make_companies(count):
+    with open('Companies.csv', 'r', newline='') as file:
+        shipped = list(csv.DictReader(file))
+    # Real partner lists have thousands of distinct surnames; build a vocabulary of that size
+    syllables = ['ba', 'ber', 'co', 'da', 'del', 'fer', 'gar', 'han', 'kin', 'la', 'lar', 'man', 'mor', 'ne',
+                 'ol', 'par', 'ri', 'ro', 'sen', 'son', 'ta', 'ton', 'ver', 'wal', 'win', 'ley', 'ford', 'ham']
+    words = sorted({(a + b + c).capitalize() for a in syllables for b in syllables for c in ['', 'son', 'er', 's']})
+    patterns = ["{0}-{1}", "{0}, {1} and {2}", "{0} LLC", "{0} Group", "{0} {1} Travel"]
+    companies = []
+    names = set()
+    while len(companies) < count:
+        name = random.choice(patterns).format(*random.sample(words, 3))
+        if len(names) > count // 2:
+            name = f"{name} {len(companies)}"
+        if name in names:
+            continue
+        names.add(name)
+        company = dict(random.choice(shipped))
+        company['Company Name'] = name
+        companies.append(company)
+    return companies
+
+# Function to time fuzzy company search and type grouping against a linear substring scan
+def benchmark_company_search(count=100000):
+    from company_index import build_company_index, search_companies, company_types, companies_of_type, trigrams
+    companies = make_companies(count)
+    start = time.perf_counter()
+    index = build_company_index(companies)
+    build_time = time.perf_counter() - start
+    queries = [companies[count // 3]['Company Name'].split()[0].strip(','), companies[count // 2]['Company Name'],
+               companies[count // 4]['Company Name'][:-3] + 'xx', 'Larsn']
+    print(f"Company search benchmark with {count} companies (index build: {build_time:.2f} s)")
+    # The substring scan is what the menu did before; the fuzzy scan gives the same results as the index
+    print(f"{'Query':<32}{'Matches':>8}{'Substring scan (ms)':>21}{'Fuzzy scan (ms)':>17}{'Index (ms)':>12}")
+    for query in queries:
+        matches = search_companies(index, query, limit=20)
+        scan = time_it(lambda: [c for c in companies if query.lower() in c['Company Name'].lower()], 3)
+        grams = trigrams(query)
+        fuzzy = time_it(lambda: sorted((-len(grams & trigrams(c['Company Name'])), c['Company Name'])
+                                       for c in companies)[:20], 1)
+        indexed = time_it(lambda: search_companies(index, query, limit=20), 20)
+        print(f"{query[:30]:<32}{len(matches):>8}{scan * 1000:>21.2f}{fuzzy * 1000:>17.2f}{indexed * 1000:>12.3f}")
+    types = company_types(index)
+    print(f"Type grouping: {time_it(lambda: companies_of_type(index, types[0]), 100) * 1000:.3f} ms per type "
+          f"(scan: {time_it(lambda: [c for c in companies if c['Company Type'] == types[0]], 3) * 1000:.2f} ms)")
+
+# Function to compare the CSV and SQLite storage backends on guest data of several sizes
+def benchmark_storage(sizes=(10000, 100000, 1000000)):
+    from sqlite_store import SqliteDataset, migrate
+    first = date(2023, 1, 1).toordinal()
+    print(f"{'Rows':>8} {'Backend':<8}{'Migrate s':>10}{'Open+find s':>12}{'By ID ms':>10}{'By name ms':>11}"
+          f"{'Week ms':>9}{'Update ms':>10}{'Insert ms':>10}{'Delete ms':>10}")
+    for count in sizes:
+        guests = generate_guests(count, random.Random(0))
+        for number, guest in enumerate(guests):
+            guest['check_in_date'] = date.fromordinal(first + number * 730 // count).isoformat()
+            guest['check_out_date'] = date.fromordinal(first + number * 730 // count + 3).isoformat()
+        target = guests[count // 2]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Guest.csv')
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=GuestRecord.FIELDS)
+                writer.writeheader()
+                writer.writerows(guests)
+            db_path = os.path.join(directory, 'hotel.db')
+            start = time.perf_counter()
+            migrate(db_path, [Dataset(path, GuestRecord)])
+            migrate_time = time.perf_counter() - start
+
+            for name, open_dataset in [('CSV', lambda: Dataset(path, GuestRecord)),
+                                       ('SQLite', lambda: SqliteDataset(db_path, path, GuestRecord))]:
+                # Time from opening the data to the first answer, with the CSV snapshot cache already written
+                start = time.perf_counter()
+                dataset = open_dataset()
+                dataset.find('guest_id', target['guest_id'])
+                open_time = time.perf_counter() - start
+                # The first search on a field builds its index in the CSV backend; time the searches after that
+                dataset.prepare('first_name', 'check_in_date')
+                by_id = time_it(lambda: dataset.find('guest_id', target['guest_id']), 200)
+                by_name = time_it(lambda: dataset.find_prefix('first_name', target['first_name'], last_name=target['last_name']), 200)
+                week = time_it(lambda: dataset.find_range('check_in_date', '2024-03-01', '2024-03-08'), 20)
+                guest = dataset.find('guest_id', target['guest_id'])[0]
+                update = time_it(lambda: dataset.update(guest, {'check_out_date': '2024-12-31'}), 20)
+                added = []
+                insert = time_it(lambda: added.append(dataset.append(dict(target, guest_id='9' + target['guest_id']))), 20)
+                delete = time_it(lambda: dataset.remove(added.pop()), 20)
+                print(f"{count:>8} {name:<8}{migrate_time if name == 'SQLite' else 0:>10.2f}{open_time:>12.2f}"
+                      f"{by_id * 1000:>10.3f}{by_name * 1000:>11.3f}{week * 1000:>9.2f}{update * 1000:>10.2f}"
+                      f"{insert * 1000:>10.2f}{delete * 1000:>10.2f}")
+                del dataset
+
+# Function to measure the latency of one client sending lines to the server; returns a list of seconds
+async def _server_client(port, messages, terminal):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1024 * 1024)
+    latencies, errors = [], 0
+    if terminal:
+        writer.write(b'{"op": "terminal"}\n')
+        await reader.readline()
+    for message in messages:
+        start = time.perf_counter()
+        writer.write((json.dumps(message) + '\n').encode())
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        errors += reply.get('ok') is False
+        if reply.get('closed'):
+            break
+    writer.close()
+    return latencies, errors
+
+# Function to run many clients at once and print requests per second and latency percentiles
+async def _server_load(port, scripts, terminal):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_server_client(port, script, terminal) for script in scripts))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(errors for _, errors in results)
+    percentile = lambda share: latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000
+    print(f"{'Terminals' if terminal else 'Requests':<10}{len(scripts):>8}{len(latencies):>10}{len(latencies) / elapsed:>12.0f}"
+          f"{percentile(0.5):>10.2f}{percentile(0.99):>10.2f}{errors:>8}")
+
+# Function to load-test the reservation server with many simulated front desk terminals
+def benchmark_server(clients=50, rounds=20):
+    arrival = (date.today() + timedelta(days=30)).isoformat()
+    departure = (date.today() + timedelta(days=33)).isoformat()
+    with open('Guest.csv', 'r', newline='') as file:
+        guest_ids = [row['guest_id'] for row in csv.DictReader(file)]
+
+    # Each terminal looks up a guest, searches a company, books and cancels a stay and checks a room
+    def terminal_script(client):
+        keys = []
+        for turn in range(rounds):
+            first, last = f"Load{client}", f"Turn{turn}"
+            keys += ['1', '2', guest_ids[(client * rounds + turn) % len(guest_ids)], '8',
+                     '2', '1', 'garcia', '6',
+                     '3', '4', first, last, '+1-000-0000', arrival, departure, '',
+                     '6', first, last, 'yes',
+                     '7', 'ST001', arrival, departure, '13']
+        return [{'input': key} for key in keys + ['8']]
+
+    # The same work sent as requests instead of menu keystrokes
+    def request_script(client):
+        commands = []
+        for turn in range(rounds):
+            booking = {'first_name': f"Load{client}", 'last_name': f"Turn{turn}",
+                       'reserved_from': arrival, 'reserved_to': departure}
+            commands += [{'op': 'search_guest_by_id', 'guest_id': guest_ids[(client * rounds + turn) % len(guest_ids)]},
+                         {'op': 'search_company', 'name': 'garcia'},
+                         dict(booking, op='add_booking', phone_number='+1-000-0000'),
+                         dict(booking, op='cancel_booking'),
+                         {'op': 'check_room', 'room_id': 'ST001', 'reserved_from': arrival, 'reserved_to': departure}]
+        return commands
+
+    source_directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        for file_name, _ in DATASETS:
+            shutil.copy(file_name, directory)
+        server = subprocess.Popen([sys.executable, os.path.join(source_directory, 'server.py'), '0'],
+                                  cwd=directory, stdout=subprocess.PIPE, text=True,
+                                  env=dict(os.environ, PYTHONPATH=source_directory))
+        try:
+            port = int(server.stdout.readline().rsplit(':', 1)[1])
+            print(f"Server benchmark with {clients} concurrent clients, {rounds} rounds each")
+            print(f"{'Clients':<10}{'Count':>8}{'Requests':>10}{'Per second':>12}{'p50 ms':>10}{'p99 ms':>10}{'Errors':>8}")
+            asyncio.run(_server_load(port, [terminal_script(client) for client in range(clients)], True))
+            asyncio.run(_server_load(port, [request_script(client) for client in range(clients)], False))
+        finally:
+            server.terminate()
+            server.wait()
+
+# Function to run a menu function with scripted answers to its prompts and without printing
+@contextmanager
+def scripted_input(*answers):
+    answers = list(answers)
+    original = builtins.input
+    builtins.input = lambda prompt='': answers.pop(0) if answers else ''
+    try:
+        with redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original
+
+# Function to time one operation: the first call (which may build indexes) and the mean of the calls after it
+def time_operation(function, repeat):
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    return first, time_it(function, repeat)
+
+# Function to get the commit the benchmarks run on, so that result files can be told apart
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+# Function to time every core operation on generated data of several sizes and save the results as JSON
+def benchmark_suite(scales=(1000, 10000, 100000), output='benchmark_results.json'):
+    import system
+    from tracking_future_bookings import (search_upcoming_guest_by_name, search_upcoming_guest_by_last_name,
+                                          search_upcoming_guests_by_checkin_date, create_reservation,
+                                          change_booking_dates, cancel_booking)
+    from company_operations import calculate_discounted_prices
+    saved = (system.guest_data, system.company_data, system.booking_data, system.room_availability)
+    results = []
+    print(f"{'Operation':<40}{'Rows':>9}{'First ms':>11}{'Mean ms':>11}")
+    try:
+        for scale in scales:
+            with tempfile.TemporaryDirectory() as directory:
+                generate_dataset(directory, guests=scale, bookings=max(scale // 4, 10), companies=max(scale // 10, 10))
+                guest_path = os.path.join(directory, 'Guest.csv')
+                load_cold = time_it(lambda: system.load_csv(guest_path, GuestRecord).load(), 1)
+                load_warm = time_it(lambda: system.load_csv(guest_path, GuestRecord).load(), 3)
+
+                system.guest_data = system.load_csv(guest_path, GuestRecord)
+                system.booking_data = system.load_csv(os.path.join(directory, 'Future booking.csv'), BookingRecord)
+                system.company_data = system.load_csv(os.path.join(directory, 'Companies.csv'), CompanyRecord)
+                system.room_availability = None
+                guest = system.guest_data[len(system.guest_data) // 2]
+                booking = system.booking_data[len(system.booking_data) // 2]
+                company = system.company_data[len(system.company_data) // 2]
+                arrival = (date.today() + timedelta(days=400)).isoformat()
+                departure = (date.today() + timedelta(days=403)).isoformat()
+                added = []
+
+                def add_booking():
+                    reservation = {'first_name': 'Bench', 'last_name': f"Guest{len(added)}", 'phone_number': '+1-000-0000',
+                                   'reserved_from': arrival, 'reserved_to': departure, 'room_id': ''}
+                    added.append(create_reservation(system.booking_data, reservation, system.get_room_availability())[0])
+
+                def cancel_added_booking():
+                    with scripted_input('Bench', added.pop()['last_name'], 'yes'):
+                        cancel_booking(system.booking_data)
+
+                def run_scripted(function, *answers):
+                    with scripted_input(*answers):
+                        function()
+
+                operations = [
+                    ('search_guest_by_id', lambda: system.search_guest_by_id(guest['guest_id']), 1000),
+                    ('search_guest_by_name', lambda: run_scripted(lambda: system.search_guest_by_name(guest['first_name']),
+                                                                  guest['last_name']), 200),
+                    ('search_guests_by_checkin_date', lambda: system.search_guests_by_checkin_date(guest['check_in_date']), 200),
+                    ('modify_guest_data', lambda: system.modify_guest_data(guest['guest_id'], {'phone_number': '+1-555-0100'}), 20),
+                    ('search_upcoming_guest_by_name', lambda: run_scripted(
+                        lambda: search_upcoming_guest_by_name(system.booking_data, booking['first_name']), booking['last_name']), 200),
+                    ('search_upcoming_guest_by_last_name', lambda: run_scripted(
+                        lambda: search_upcoming_guest_by_last_name(system.booking_data, booking['last_name']), booking['first_name']), 200),
+                    ('search_upcoming_guests_by_checkin_date', lambda: run_scripted(
+                        lambda: search_upcoming_guests_by_checkin_date(system.booking_data, booking['reserved_from'])), 200),
+                    ('add_booking', add_booking, 20),
+                    ('modify_booking', lambda: change_booking_dates(system.booking_data, added[-1], arrival, departure,
+                                                                    system.get_room_availability()), 20),
+                    ('cancel_booking', cancel_added_booking, 20),
+                    ('calculate_discounted_prices', lambda: run_scripted(
+                        lambda: calculate_discounted_prices(system.company_data), company['Company Name']), 200),
+                ]
+                timings = [('load_csv (no snapshot)', load_cold, load_cold), ('load_csv (snapshot)', load_warm, load_warm)]
+                for name, function, repeat in operations:
+                    timings.append((name, *time_operation(function, repeat)))
+                for name, first, mean in timings:
+                    print(f"{name:<40}{scale:>9}{first * 1000:>11.3f}{mean * 1000:>11.3f}")
+                    results.append({'operation': name, 'rows': scale, 'first_ms': round(first * 1000, 4),
+                                    'mean_ms': round(mean * 1000, 4)})
+    finally:
+        system.guest_data, system.company_data, system.booking_data, system.room_availability = saved
+
+    with open(output, 'w') as file:
+        json.dump({'commit': current_commit(), 'python': sys.version.split()[0],
+                   'created': datetime.now().isoformat(timespec='seconds'), 'results': results}, file, indent=2)
+    print(f"Results written to '{output}'. Compare two runs with: python benchmarks.py compare old.json new.json")
+
+# Function to measure what the instrumentation of diagnostics.py costs, switched off and on
+def benchmark_diagnostics(scale=10000, rounds=2000):
+    import system
+    import diagnostics
+    saved = system.guest_data
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, guests=scale, bookings=10, companies=10)
+            system.guest_data = system.load_csv(os.path.join(directory, 'Guest.csv'), GuestRecord)
+            guest_ids = [guest['guest_id'] for guest in system.guest_data]
+            # Guest menu: search by ID, search by check-in date, back to the main menu
+            answers = []
+            for turn in range(rounds):
+                guest = system.guest_data[(turn * 7919) % len(guest_ids)]
+                answers += ['2', guest['guest_id'], '3', guest['check_in_date']]
+            answers.append('8')
+
+            def run_menu(enable):
+                with scripted_input(*answers):
+                    if enable:
+                        diagnostics.enable()
+                    start = time.perf_counter()
+                    system.guest_operations()
+                    elapsed = time.perf_counter() - start
+                    diagnostics.disable()
+                return elapsed / (rounds * 2)
+
+            run_menu(False)
+            off = min(run_menu(False) for _ in range(3))
+            on = min(run_menu(True) for _ in range(3))
+            hook = time_it(lambda: diagnostics.start_operation('guest 2'), 100000)
+            print(f"Diagnostics benchmark: {rounds * 2} guest menu operations on {scale} guests")
+            print(f"{'Instrumentation':<20}{'ms per operation':>18}")
+            print(f"{'off':<20}{off * 1000:>18.4f}")
+            print(f"{'on':<20}{on * 1000:>18.4f}")
+            print(f"A disabled hook costs {hook * 1e9:.0f} ns per call.")
+            diagnostics.reset()
+    finally:
+        system.guest_data = saved
+
+# Function to compare one Guest.csv with years of history against the same stays split into monthly partitions
+def benchmark_partitions(count=200000):
+    import diagnostics
+    with tempfile.TemporaryDirectory() as directory:
+        # The shipped number of rooms, so that the stays go back many years
+        guests = generate_guests(count, random.Random(0), make_rooms())
+        plain_path = os.path.join(directory, 'plain', 'Guest.csv')
+        split_path = os.path.join(directory, 'split', 'Guest.csv')
+        for path in (plain_path, split_path):
+            os.makedirs(os.path.dirname(path))
+            write_csv(path, guests, GuestRecord.FIELDS)
+        months = partition_csv(split_path, GuestRecord)
+        day = guests[len(guests) // 2]['check_in_date']
+        print(f"Partition benchmark with {count} stays over {len(months)} months")
+        print(f"{'Storage':<14}{'Date search s':>15}{'Change + save s':>17}{'Bytes written':>15}")
+        for name, path, dataset_class in (('One CSV', plain_path, Dataset), ('Partitions', split_path, PartitionedDataset)):
+            dataset_class(path, GuestRecord).load()     # write the snapshot caches
+            dataset = dataset_class(path, GuestRecord)
+            # First search by check-in date after startup, including loading and indexing
+            search_time = time_it(lambda: dataset.find('check_in_date', day), 1)
+            guest = dataset.find('check_in_date', day)[0]
+            dataset.update(guest, {'check_out_date': guest['check_out_date']})
+            # The instrumentation of diagnostics.py counts the bytes save() writes
+            diagnostics.reset()
+            diagnostics.enable()
+            save_time = time_it(dataset.save, 1)
+            diagnostics.disable()
+            written = diagnostics.totals['bytes_written']
+            print(f"{name:<14}{search_time:>15.3f}{save_time:>17.3f}{written:>15}")
+
+# Function to compare the hash join of guest_identity.py with a nested scan of the stays for every booking
+def benchmark_identity(count=100000, sample=200):
+    rng = random.Random(0)
+    rooms = make_rooms(count, count // 4)
+    guests = [GuestRecord.from_dict(row) for row in generate_guests(count, rng, rooms)]
+    bookings = [BookingRecord.from_dict(row) for row in generate_bookings(count // 4, rng, rooms)]
+    # A third of the bookings come from past guests
+    for booking in bookings[::3]:
+        guest = rng.choice(guests)
+        booking.update({'first_name': guest['first_name'], 'last_name': guest['last_name'], 'phone_number': guest['phone_number']})
+
+    start = time.perf_counter()
+    index = build_identity_index(guests, bookings, fuzzy=False)
+    join_time = time.perf_counter() - start
+
+    def nested(booking):
+        key = identity_key(booking)
+        return [guest for guest in guests if identity_key(guest) == key]
+    nested_time = time_it(lambda: [nested(booking) for booking in bookings[:sample]], 1) / sample * len(bookings)
+    print(f"Identity benchmark: {len(bookings)} bookings joined to {len(guests)} stays, {len(index['matches'])} returning guests")
+    print(f"Hash join: {join_time:.3f} s, nested scans: {nested_time:.0f} s (estimated from {sample} bookings)")
+
+# Function to time the bulk import of a large partner feed with one process and with a process pool
+def benchmark_bulk_import(count=200000):
+    import system
+    from bulk_import import import_feed, FIELDS
+    saved = (system.guest_data, system.booking_data, system.room_availability)
+    worker_counts = sorted({1, os.cpu_count() or 1})
+    print(f"Bulk import benchmark with a feed of {count} reservations ({os.cpu_count()} CPUs)")
+    print(f"{'Workers':<10}{'Accepted':>10}{'Rejected':>10}{'Seconds':>10}{'Rows/s':>10}")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            rng = random.Random(0)
+            # Far enough ahead not to collide with the bookings already in the file
+            feed = generate_bookings(count, rng, make_rooms(count, 10), today=date.today() + timedelta(days=1000))
+            for row in feed[::50]:
+                row['reserved_to'] = 'soon'
+            feed_path = os.path.join(directory, 'feed.csv')
+            write_csv(feed_path, feed, FIELDS)
+            for workers in worker_counts:
+                target = os.path.join(directory, f"run{workers}")
+                generate_dataset(target, guests=count, bookings=10, companies=10)
+                system.guest_data = system.load_csv(os.path.join(target, 'Guest.csv'), GuestRecord)
+                system.booking_data = system.load_csv(os.path.join(target, 'Future booking.csv'), BookingRecord)
+                system.room_availability = None
+                with redirect_stdout(io.StringIO()):
+                    system.get_room_availability()
+                summary = import_feed(feed_path, os.path.join(target, 'rejects.csv'), workers)
+                print(f"{workers:<10}{summary['accepted']:>10}{summary['rejected']:>10}{summary['seconds']:>10.2f}"
+                      f"{summary['rows'] / summary['seconds']:>10.0f}")
+    finally:
+        system.guest_data, system.booking_data, system.room_availability = saved
+
+# Function to compare full scans with the sorted date indexes for arrivals, departures and in-house guests
+def benchmark_date_queries(count=200000, repeat=50):
+    import result_cache
+    from date_queries import STAY_DATES, arrivals_between, departures_between, in_house, next_day
+    guests = generate_guests(count, random.Random(0), make_rooms())
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Guest.csv')
+        write_csv(path, guests, GuestRecord.FIELDS)
+        dataset = Dataset(path, GuestRecord)
+        rows = dataset.rows
+        night = guests[len(guests) // 2]['check_in_date']
+        first, last = night, (date.fromisoformat(night) + timedelta(days=6)).isoformat()
+        end = next_day(last)
+        # The result cache would answer the repeats; turn it off to time the indexes themselves
+        saved, result_cache.max_entries = result_cache.max_entries, 0
+        try:
+            build = time_it(lambda: (dataset.prepare(*STAY_DATES), in_house(dataset, STAY_DATES, night)), 1)
+            queries = [
+                ('Arrivals (week)', lambda: [row for row in rows if first <= row['check_in_date'] < end],
+                 lambda: arrivals_between(dataset, STAY_DATES, first, last)),
+                ('Departures (week)', lambda: [row for row in rows if first <= row['check_out_date'] < end],
+                 lambda: departures_between(dataset, STAY_DATES, first, last)),
+                ('In-house (night)', lambda: [row for row in rows if row['check_in_date'] <= night < row['check_out_date']],
+                 lambda: in_house(dataset, STAY_DATES, night)),
+            ]
+            print(f"Date query benchmark with {count} stays (indexes built on first use in {build:.2f} s)")
+            print(f"{'Query':<20}{'Rows':>8}{'Scan ms':>10}{'Index ms':>10}{'Speedup':>10}")
+            for name, scan, indexed in queries:
+                scan_time, index_time = time_it(scan, 3), time_it(indexed, repeat)
+                print(f"{name:<20}{len(indexed()):>8}{scan_time * 1000:>10.2f}{index_time * 1000:>10.3f}{scan_time / index_time:>9.0f}x")
+        finally:
+            result_cache.max_entries = saved
+
+# Function to time a day of repeated front desk searches with and without the result cache, with
+# one booking moved to new dates every `change_every` searches (which only drops the date searches).
+# Each kind of search is timed on its own, as the cache leaves the exact searches of the CSV backend
+# to its indexes.
+def benchmark_result_cache(count=100000, searches=5000, change_every=50):
+    import result_cache
+    from sqlite_store import SqliteDataset, migrate
+    rng = random.Random(0)
+    rooms = make_rooms(count, count // 4)
+    bookings = generate_bookings(count, rng, rooms)
+    days = sorted({booking['reserved_from'] for booking in bookings})[:30]
+    surnames = [booking['last_name'] for booking in rng.sample(bookings, 50)]
+    # Most searches are for a few popular dates and names, as at a front desk
+    workloads = [
+        ('Date', 'find', 'reserved_from', [rng.choice(days[:5] if rng.random() < 0.8 else days) for _ in range(searches)]),
+        ('Surname', 'prefix', 'last_name', [rng.choice(surnames[:10] if rng.random() < 0.8 else surnames)
+                                            for _ in range(searches)]),
+    ]
+    print(f"Result cache benchmark: {searches} searches of each kind over {count} bookings, "
+          f"a date change every {change_every} searches")
+    print(f"{'Backend':<10}{'Search':<10}{'Uncached s':>12}{'Cached s':>10}{'Speedup':>9}{'Hit rate':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Future booking.csv')
+        write_csv(path, bookings, BookingRecord.FIELDS)
+        db_path = os.path.join(directory, 'hotel.db')
+        migrate(db_path, [Dataset(path, BookingRecord)])
+        for name, open_dataset in [('CSV', lambda: Dataset(path, BookingRecord)),
+                                   ('SQLite', lambda: SqliteDataset(db_path, path, BookingRecord))]:
+            for search, kind, field, values in workloads:
+                times = []
+                for use_cache in (False, True):
+                    dataset = open_dataset()
+                    dataset.prepare('reserved_from', 'last_name')
+                    result_cache.clear()
+                    result_cache.reset_counters()
+                    moved = dataset.find('reserved_from', days[0])
+                    # The changes are held in memory and never written, so both runs start from the same data
+                    dataset.hold_writes()
+                    start = time.perf_counter()
+                    for number, value in enumerate(values, start=1):
+                        if use_cache:
+                            (result_cache.find if kind == 'find' else result_cache.find_prefix)(dataset, field, value)
+                        else:
+                            (dataset.find if kind == 'find' else dataset.find_prefix)(field, value)
+                        if number % change_every == 0:
+                            booking = moved[number // change_every % len(moved)]
+                            dataset.update(booking, {'reserved_from': rng.choice(days)})
+                    times.append(time.perf_counter() - start)
+                    stats = result_cache.cache_stats()
+                    del dataset
+                print(f"{name:<10}{search:<10}{times[0]:>12.3f}{times[1]:>10.3f}{times[0] / times[1]:>8.1f}x"
+                      f"{stats['hit_rate']:>10.0%}")
+
+# Function to time booking a busy day of service appointments, and the next free slot and
+# open now questions against scanning the appointments
+def benchmark_appointments(count=50000, services=20, repeat=200):
+    import appointments
+    from records import AppointmentRecord
+    rng = random.Random(0)
+    day = '2025-06-01'
+    service_rows = [{'Service Name': f'Service {number}',
+                     'Working Hours': '24/7' if number % 2 else '07:00 - 22:00'} for number in range(services)]
+    guests = [{'guest_id': str(number), 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+               'check_in_date': day, 'check_out_date': '2025-06-03'} for number in range(count)]
+    requests = [(guests[number], f'Service {rng.randrange(services)}', appointments.slot_time(rng.randrange(14, 44)))
+                for number in range(count)]
+    saved, appointments.DEFAULT_CAPACITY = appointments.DEFAULT_CAPACITY, 100
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Appointments.csv')
+            write_csv(path, [], AppointmentRecord.FIELDS)
+            dataset = Dataset(path, AppointmentRecord)
+            # The bookings are held in memory and never written
+            dataset.hold_writes()
+            schedule = appointments.get_schedule(service_rows, dataset)
+            start = time.perf_counter()
+            booked = sum(1 for guest, name, time_text in requests
+                         if appointments.book_appointment(dataset, schedule, guest, name, day, time_text)[0])
+            booking_time = time.perf_counter() - start
+            rows = dataset.rows
+            name, moment = 'Service 0', datetime(2025, 6, 1, 15, 0)
+
+            def scan_next_free_slot():
+                counts = [0] * appointments.SLOTS_PER_DAY
+                for row in rows:
+                    if row['service_name'] == name and row['date'] == day:
+                        counts[appointments.parse_time(row['time'])] += 1
+                opening = appointments.parse_working_hours(service_rows[0]['Working Hours'])
+                return next((slot for slot in range(appointments.SLOTS_PER_DAY)
+                             if appointments.slot_open(opening, slot) and counts[slot] < 100), None)
+
+            def scan_open_services():
+                slot = appointments.parse_time('15:00')
+                taken = sum(1 for row in rows if row['date'] == day and row['time'] == '15:00')
+                return [service for service in service_rows
+                        if appointments.slot_open(appointments.parse_working_hours(service['Working Hours']), slot)], taken
+
+            print(f"Appointment benchmark: {booked} of {count} requests booked on one day over {services} services "
+                  f"in {booking_time:.2f} s ({count / booking_time:.0f} requests/s)")
+            print(f"{'Query':<20}{'Scan ms':>10}{'Schedule ms':>13}{'Speedup':>10}")
+            for label, scan, indexed in [
+                    ('Next free slot', scan_next_free_slot, lambda: appointments.next_free_slot(schedule, name, day)),
+                    ('Open now', scan_open_services, lambda: appointments.open_services(schedule, moment))]:
+                scan_time, index_time = time_it(scan, 3), time_it(indexed, repeat)
+                print(f"{label:<20}{scan_time * 1000:>10.2f}{index_time * 1000:>13.4f}{scan_time / index_time:>9.0f}x")
+    finally:
+        appointments.DEFAULT_CAPACITY = saved
+
+# Function to compare a lookup-only terminal that reads Guest.csv in full with the memory-mapped
+# read-only mode: time and memory until the first guest is found, time per lookup, and the time
+# to add rows appended to the CSV to the offset index
+def benchmark_mapped(sizes=(100000, 1000000), lookups=2000, appended=1000):
+    from mapped_csv import MappedDataset, MappedFile, index_path
+    print(f"{'Rows':>9}  {'Mode':<8}{'First lookup s':>16}{'Memory MB':>11}{'Lookup us':>11}")
+    for count in sizes:
+        guests = generate_guests(count + appended, random.Random(0), make_rooms())
+        ids = [guest['guest_id'] for guest in random.Random(1).sample(guests[:count], lookups)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Guest.csv')
+            write_csv(path, guests[:count], GuestRecord.FIELDS)
+            for mode, dataset_class in [('Full', Dataset), ('Mapped', MappedDataset)]:
+                # The first run writes the snapshot cache or the offset index, as a terminal's first start would
+                dataset_class(path, GuestRecord).find('guest_id', ids[0])
+                start = time.perf_counter()
+                dataset = dataset_class(path, GuestRecord)
+                dataset.find('guest_id', ids[0])
+                first = time.perf_counter() - start
+                lookup = time_it(lambda: [dataset.find('guest_id', guest_id) for guest_id in ids], 1) / lookups
+                del dataset
+                tracemalloc.start()
+                dataset = dataset_class(path, GuestRecord)
+                dataset.find('guest_id', ids[0])
+                memory = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del dataset
+                print(f"{count:>9}  {mode:<8}{first:>16.4f}{memory / 1e6:>11.2f}{lookup * 1e6:>11.1f}")
+            dataset = MappedDataset(path, GuestRecord)
+            dataset.find('guest_id', ids[0])
+            with open(path, 'a', newline='') as file:
+                csv.DictWriter(file, fieldnames=GuestRecord.FIELDS).writerows(guests[count:])
+            start = time.perf_counter()
+            assert dataset.find('guest_id', guests[-1]['guest_id'])
+            added = time.perf_counter() - start
+            os.remove(index_path(path))
+            start = time.perf_counter()
+            MappedFile(path, 'guest_id').open()
+            rebuilt = time.perf_counter() - start
+            print(f"{'':>11}{appended} appended rows added to the index in {added:.3f} s (building it again: {rebuilt:.3f} s)")
+
+# Function to time chain-wide searches over `properties` hotels: a sequential scan that reads the
+# files of one property after the other, against the Chain fan-out in one process and in a pool
+def benchmark_chain(properties=20, guests=20000, bookings=10000, searches=20, workers=None):
+    from chain import Chain
+    workers = workers or max(2, os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(properties):
+            generate_dataset(os.path.join(directory, f"hotel{number:02d}"), guests, bookings, 50, seed=number)
+        rng = random.Random(0)
+        sample = generate_guests(200, random.Random(1), make_rooms())
+        workload = []
+        for _ in range(searches):
+            guest = rng.choice(sample)
+            workload.append(rng.choice([
+                ('Guest.csv', 'find', 'last_name', guest['last_name'], {'first_name': guest['first_name']}),
+                ('Guest.csv', 'find', 'check_in_date', guest['check_in_date'], {}),
+                ('Future booking.csv', 'find', 'last_name', guest['last_name'], {'first_name': guest['first_name']})]))
+
+        def sequential_scan(file_name, search, field, value, conditions):
+            wanted = dict(conditions, **{field: value})
+            results = []
+            for number in range(properties):
+                with open(os.path.join(directory, f"hotel{number:02d}", file_name), 'r', newline='') as file:
+                    results.extend((number, row) for row in csv.DictReader(file)
+                                   if all(row[name].strip().casefold() == text.casefold() for name, text in wanted.items()))
+            return results
+
+        def run(chain, file_name, search, field, value, conditions):
+            return chain.search(file_name, search, field, value, **conditions)
+
+        scan = time_it(lambda: [sequential_scan(*search) for search in workload[:3]], 1) / 3
+        print(f"Chain benchmark: {properties} properties with {guests} stays and {bookings} bookings each, "
+              f"{searches} searches")
+        print(f"{'Method':<32}{'First search s':>16}{'Later searches ms':>19}{'Speedup':>9}")
+        print(f"{'Sequential scan':<32}{scan:>16.3f}{scan * 1000:>19.1f}{1:>8.0f}x")
+        for label, count in [('Chain, one process', 1), (f"Chain, {workers} worker processes", workers)]:
+            # Every run starts without the snapshot caches, as after the files were changed
+            for name in os.listdir(directory):
+                for file_name in os.listdir(os.path.join(directory, name)):
+                    if file_name.endswith('.cache'):
+                        os.remove(os.path.join(directory, name, file_name))
+            chain = Chain(directory, count)
+            try:
+                first = time_it(lambda: run(chain, *workload[0]), 1)
+                # The first pass loads the other files and builds their indexes
+                for search in workload:
+                    run(chain, *search)
+                later = time_it(lambda: [run(chain, *search) for search in workload], 1) / searches
+            finally:
+                chain.close()
+            print(f"{label:<32}{first:>16.3f}{later * 1000:>19.2f}{scan / later:>8.0f}x")
+
+# Function to compare two result files of the suite and point out operations that got slower
+def compare_results(old_path, new_path, tolerance=1.2):
+    with open(old_path, 'r') as file:
+        old = json.load(file)
+    with open(new_path, 'r') as file:
+        new = json.load(file)
+    before = {(result['operation'], result['rows']): result['mean_ms'] for result in old['results']}
+    print(f"Comparing {old.get('commit') or old_path} with {new.get('commit') or new_path}")
+    print(f"{'Operation':<40}{'Rows':>9}{'Old ms':>11}{'New ms':>11}{'Change':>9}")
+    slower = 0
+    for result in new['results']:
+        key = (result['operation'], result['rows'])
+        if key not in before:
+            continue
+        ratio = result['mean_ms'] / before[key] if before[key] else 1.0
+        flag = '  slower' if ratio > tolerance else ''
+        slower += ratio > tolerance
+        print(f"{key[0]:<40}{key[1]:>9}{before[key]:>11.3f}{result['mean_ms']:>11.3f}{ratio:>8.2f}x{flag}")
+    print(f"{slower} operation(s) more than {tolerance:.1f}x slower.")
+    return slower
+
+# Function to time the daily views: building them against reading them back, a delta update against
+# a rebuild, and one day's lists; then check that many random changes leave them equal to a rebuild
+def benchmark_daily_views(guests=200000, bookings=50000, changes=2000):
+    import daily_views
+    with tempfile.TemporaryDirectory() as directory:
+        generate_dataset(directory, guests=guests, bookings=bookings, companies=10)
+        guest_data = Dataset(os.path.join(directory, 'Guest.csv'), GuestRecord)
+        booking_data = Dataset(os.path.join(directory, 'Future booking.csv'), BookingRecord)
+        guest_data.load()
+        booking_data.load()
+        path = daily_views.views_path(booking_data)
+        signature = daily_views.data_signature(guest_data, booking_data)
+        build = time_it(lambda: daily_views.save_views(path, {**daily_views.build_views(guest_data, booking_data),
+                                                              'signature': signature}), 1)
+        opened = []
+        read = time_it(lambda: opened.append(daily_views.open_views(guest_data, booking_data)), 1)
+        views = opened[0]
+        # The changes are held in memory and never written, so the files keep their signature
+        guest_data.hold_writes()
+        booking_data.hold_writes()
+        rng = random.Random(0)
+        stays, future = list(guest_data), list(booking_data)
+        day = future[0]['reserved_from']
+        start = time.perf_counter()
+        for number in range(changes):
+            if number % 2:
+                stay = rng.choice(stays)
+                checkout = date.fromisoformat(stay['check_out_date']) + timedelta(days=rng.randint(-1, 3))
+                if checkout.isoformat() > stay['check_in_date']:
+                    guest_data.update(stay, {'check_out_date': checkout.isoformat()})
+            elif number % 3:
+                booking = rng.choice(future)
+                arrival = date.fromisoformat(booking['reserved_from']) + timedelta(days=rng.randint(-5, 5))
+                booking_data.update(booking, {'reserved_from': arrival.isoformat(),
+                                              'reserved_to': (arrival + timedelta(days=rng.randint(1, 7))).isoformat()})
+            else:
+                booking = future.pop(rng.randrange(len(future)))
+                booking_data.remove(booking)
+                future.append(booking_data.append(dict(booking)))
+        delta = (time.perf_counter() - start) / changes
+        rebuild = time_it(lambda: daily_views.build_views(guest_data, booking_data), 1)
+        lists = time_it(lambda: daily_views.day_lists(views, day), 1000)
+        scan = time_it(lambda: ([stay for stay in guest_data if stay['check_in_date'] == day],
+                                [stay for stay in guest_data if stay['check_in_date'] <= day < stay['check_out_date']],
+                                [booking for booking in booking_data if booking['reserved_from'] <= day < booking['reserved_to']]), 3)
+        differences = daily_views.check_views(guest_data, booking_data, views)
+        print(f"Daily views benchmark with {guests} stays and {bookings} bookings")
+        print(f"Build from the datasets: {build:.2f} s, read back from {os.path.basename(path)} "
+              f"({os.path.getsize(path) // 1024} KB): {read:.2f} s")
+        print(f"One change: {delta * 1000:.3f} ms as a delta update, {rebuild * 1000:.0f} ms as a rebuild "
+              f"({rebuild / delta:.0f}x)")
+        print(f"Lists of one day: {lists * 1000:.3f} ms from the views, {scan * 1000:.0f} ms scanning the rows")
+        print(f"After {changes} changes: {len(differences)} difference(s) from a full rebuild")
+
+# Function to time recording the changes of a day and exporting them, against copying the whole file
+def benchmark_change_log(count=200000, history=500000, changes=5000, single=200):
+    import change_log
+    rng = random.Random(0)
+    bookings = generate_bookings(count, rng, make_rooms(count, count // 4))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Future booking.csv')
+        write_csv(path, bookings, BookingRecord.FIELDS)
+        log = change_log.ChangeLog(os.path.join(directory, 'changes.jsonl'))
+        # Earlier days of changes, so that the export has to find today's among them
+        log.write([('2025-01-01T00:00:00', 'Future booking.csv', 'update', bookings[number % count], bookings[number % count])
+                   for number in range(history)])
+        batch_times, single_times = [], []
+        for tracked in (False, True):
+            dataset = Dataset(path, BookingRecord)
+            dataset.load()
+            if tracked:
+                change_log.track(log, dataset)
+            picks = [rng.randrange(count) for _ in range(changes + single)]
+            # A batch: the file is written once at the end, and the changes are numbered then
+            start = time.perf_counter()
+            with batch_writes(dataset):
+                for number, position in enumerate(picks[:changes]):
+                    dataset.update(dataset[position], {'reserved_to': f"2031-01-{number % 28 + 1:02d}"}, position)
+            batch_times.append(time.perf_counter() - start)
+            # Single changes from the menus: one journal record and one change log record each
+            start = time.perf_counter()
+            for number, position in enumerate(picks[changes:]):
+                dataset.update(dataset[position], {'reserved_to': f"2031-02-{number % 28 + 1:02d}"}, position)
+            single_times.append((time.perf_counter() - start) / single)
+        log.close()
+        since = history
+        export = time_it(lambda: sum(1 for _ in change_log.read_changes(log.path, since)), 5)
+        scan = time_it(lambda: sum(1 for line in open(log.path, 'rb') if json.loads(line)['seq'] > since), 1)
+        copy = time_it(lambda: Dataset(path, BookingRecord).load(), 1)
+        print(f"Change log benchmark: {changes + single} changes to {count} bookings after {history} earlier changes")
+        print(f"Batch of {changes} changes: {batch_times[0]:.2f} s untracked, {batch_times[1]:.2f} s with the change log")
+        print(f"Single change: {single_times[0] * 1000:.2f} ms untracked, {single_times[1] * 1000:.2f} ms with the change log")
+        print(f"Export of the {changes + single} new changes: {export * 1000:.1f} ms (reading the whole log: {scan * 1000:.0f} ms, "
+              f"re-reading the whole file: {copy * 1000:.0f} ms, {os.path.getsize(path) // 1024} KB)")
+
+BENCHMARKS = {
+    'guest_lookup': benchmark_guest_lookup,
+    'room_assignment': benchmark_room_assignment,
+    'records': benchmark_records,
+    'startup': benchmark_startup,
+    'analytics': benchmark_analytics,
+    'company_search': benchmark_company_search,
+    'server': benchmark_server,
+    'storage': benchmark_storage,
+    'suite': benchmark_suite,
+    'diagnostics': benchmark_diagnostics,
+    'partitions': benchmark_partitions,
+    'identity': benchmark_identity,
+    'bulk_import': benchmark_bulk_import,
+    'result_cache': benchmark_result_cache,
+    'date_queries': benchmark_date_queries,
+    'appointments': benchmark_appointments,
+    'mapped': benchmark_mapped,
+    'chain': benchmark_chain,
+    'daily_views': benchmark_daily_views,
+    'change_log': benchmark_change_log,
+}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['compare']:
+        if len(sys.argv) != 4:
+            print("Usage: python benchmarks.py compare old.json new.json")
+        else:
+            compare_results(sys.argv[2], sys.argv[3])
+        sys.exit()
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available benchmarks: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
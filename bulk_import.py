@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import system
+from dataset import batch_writes
+from guest_identity import identity_key
+from tracking_future_bookings import check_booking_dates, check_room_conflict
+
+# Bulk import of reservation feeds from channel partners into Future booking.csv.
+#
+# A feed is a CSV file with a header, or a JSONL file with one reservation per line, using the
+# columns of Future booking.csv (room_id is optional). The feed is read in chunks of raw lines;
+# a pool of worker processes parses each chunk and checks the required fields and the dates.
+# The main process then drops duplicates of existing bookings (and of earlier rows of the feed),
+# checks the rooms for conflicts and adds the accepted rows in one batch, so Future booking.csv
+# is written once. Rejected rows are written to a CSV file together with the reason.
+#
+# Usage: python system.py --import feed.csv [rejects.csv] [workers]
+
+CHUNK_SIZE = 5000
+FIELDS = ['room_id', 'first_name', 'last_name', 'phone_number', 'reserved_from', 'reserved_to']
+REQUIRED_FIELDS = ['first_name', 'last_name', 'phone_number', 'reserved_from', 'reserved_to']
+REJECT_FIELDS = ['line', 'reason'] + FIELDS
+
+# Function to read a feed as chunks of (first line number, [lines]). A CSV chunk never ends inside a
+# quoted value that spans lines (its header is read separately); JSONL has one record per line,
+# where a quote may be escaped, so it is cut strictly by line
+def read_chunks(file, kind, chunk_size=CHUNK_SIZE):
+    lines = []
+    first_line = line_number = 1
+    open_quotes = False
+    for line in file:
+        lines.append(line)
+        line_number += 1
+        if kind == 'csv':
+            open_quotes ^= line.count('"') % 2 == 1
+        if len(lines) >= chunk_size and not open_quotes:
+            yield first_line, lines
+            lines, first_line = [], line_number
+    if lines:
+        yield first_line, lines
+
+# Function to check one reservation on its own; returns (reason, kind of reason) or None if it is fine
+def check_reservation(reservation):
+    missing = [field for field in REQUIRED_FIELDS if not reservation[field]]
+    if missing:
+        return f"Missing {', '.join(missing)}.", "Missing fields"
+    error = check_booking_dates(reservation['reserved_from'], reservation['reserved_to'])
+    return (error, error) if error else None
+
+# Function to number the records of a chunk with the line they start on; a CSV record can span
+# several lines when a quoted value holds line breaks
+def numbered_records(kind, first_line, lines):
+    if kind != 'csv':
+        yield from enumerate(lines, start=first_line)
+        return
+    reader = csv.reader(lines)
+    lines_read = 0
+    for record in reader:
+        yield first_line + lines_read, record
+        lines_read = reader.line_num
+
+# Function run by the worker processes: parse and check one chunk of a feed.
+# Returns ([(line, reservation)], [(line, reservation, reason, kind of reason)]).
+def parse_chunk(job):
+    kind, fieldnames, first_line, lines = job
+    accepted, rejected = [], []
+    for line, record in numbered_records(kind, first_line, lines):
+        if not record or (kind != 'csv' and not record.strip()):
+            continue
+        try:
+            row = dict(zip(fieldnames, record)) if kind == 'csv' else json.loads(record)
+            if not isinstance(row, dict):
+                raise ValueError
+        except ValueError:
+            rejected.append((line, {}, "Not a valid JSON object.", "Invalid JSON"))
+            continue
+        reservation = {field: str(row.get(field) or '').strip() for field in FIELDS}
+        reservation['room_id'] = reservation['room_id'].upper()
+        error = check_reservation(reservation)
+        if error:
+            rejected.append((line, reservation, *error))
+        else:
+            accepted.append((line, reservation))
+    return accepted, rejected
+
+# Function to read a feed file and yield the jobs for parse_chunk()
+def feed_jobs(file, kind, chunk_size=CHUNK_SIZE):
+    fieldnames = None
+    if kind == 'csv':
+        header = file.readline()
+        fieldnames = [field.strip() for field in next(csv.reader([header]), [])]
+    for first_line, lines in read_chunks(file, kind, chunk_size):
+        # Line numbers count the header of a CSV file
+        yield kind, fieldnames, first_line + (kind == 'csv'), lines
+
+# Function to parse and check all chunks, on `workers` processes; yields the results in feed order
+def parse_feed(jobs, workers):
+    if workers <= 1:
+        for job in jobs:
+            yield parse_chunk(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only a few chunks per worker are in flight, so a large feed is never read into memory at once
+        waiting = []
+        for job in jobs:
+            waiting.append(executor.submit(parse_chunk, job))
+            if len(waiting) >= workers * 2:
+                yield waiting.pop(0).result()
+        for future in waiting:
+            yield future.result()
+
+# Function to get the key that identifies a reservation when looking for duplicates:
+# the same guest (see guest_identity.py) for the same dates
+def duplicate_key(reservation):
+    return identity_key(reservation) + (reservation['reserved_from'], reservation['reserved_to'])
+
+# Function to import a feed into the bookings; returns a summary dict
+def import_feed(feed_path, rejects_path=None, workers=None, chunk_size=CHUNK_SIZE):
+    workers = workers or os.cpu_count() or 1
+    rejects_path = rejects_path or os.path.splitext(feed_path)[0] + '.rejects.csv'
+    kind = 'jsonl' if feed_path.lower().endswith(('.jsonl', '.json')) else 'csv'
+    bookings_data = system.booking_data
+    availability = system.get_room_availability()
+    seen = {duplicate_key(booking) for booking in bookings_data}
+    summary = {'rows': 0, 'accepted': 0, 'rejected': 0, 'reasons': {}}
+    start = time.perf_counter()
+    with open(feed_path, 'r', newline='') as feed, open(rejects_path, 'w', newline='') as rejects_file:
+        rejects = csv.DictWriter(rejects_file, fieldnames=REJECT_FIELDS, extrasaction='ignore')
+        rejects.writeheader()
+
+        def reject(line, reservation, reason, reason_kind):
+            rejects.writerow({'line': line, 'reason': reason, **reservation})
+            summary['rejected'] += 1
+            summary['reasons'][reason_kind] = summary['reasons'].get(reason_kind, 0) + 1
+
+        with batch_writes(bookings_data):
+            for accepted, rejected in parse_feed(feed_jobs(feed, kind, chunk_size), workers):
+                summary['rows'] += len(accepted) + len(rejected)
+                for line, reservation, reason, reason_kind in rejected:
+                    reject(line, reservation, reason, reason_kind)
+                for line, reservation in accepted:
+                    key = duplicate_key(reservation)
+                    if key in seen:
+                        reject(line, reservation, "Duplicate of an existing booking.", "Duplicate booking")
+                        continue
+                    room_id = reservation['room_id']
+                    if room_id and room_id not in availability['room_types']:
+                        reject(line, reservation, f"Unknown room {room_id}.", "Unknown room")
+                        continue
+                    # The dates were checked by the workers; adding the booking updates the availability,
+                    # so later rows of the feed see the rooms it takes
+                    error = check_room_conflict(availability, room_id, reservation['reserved_from'], reservation['reserved_to'])
+                    if error:
+                        reject(line, reservation, error, "Room not free")
+                        continue
+                    bookings_data.append(reservation)
+                    seen.add(key)
+                    summary['accepted'] += 1
+    summary['seconds'] = time.perf_counter() - start
+    summary['rejects_path'] = rejects_path
+    return summary
+
+# Function to import a feed and print the outcome
+def run_import(feed_path, rejects_path=None, workers=None):
+    try:
+        summary = import_feed(feed_path, rejects_path, workers)
+    except FileNotFoundError:
+        print(f"Error: The file '{feed_path}' was not found.")
+        return None
+    rate = summary['rows'] / summary['seconds'] if summary['seconds'] else float('inf')
+    print(f"Imported {summary['accepted']} of {summary['rows']} reservations in {summary['seconds']:.2f} s ({rate:.0f} rows/s).")
+    if summary['rejected']:
+        for reason, count in sorted(summary['reasons'].items(), key=lambda item: -item[1]):
+            print(f"  {count} rejected: {reason}")
+        print(f"The rejected rows and their reasons were written to '{summary['rejects_path']}'.")
+    return summary
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python bulk_import.py feed.csv [rejects.csv] [workers]")
+    else:
+        run_import(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None,
+                   int(sys.argv[3]) if len(sys.argv) > 3 else None)
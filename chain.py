@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import diagnostics
+from dataset import Dataset
+from partitions import PartitionedDataset, is_partitioned, file_signature
+from records import GuestRecord, BookingRecord, CompanyRecord
+
+# Chain-wide searches over all the hotels of a chain.
+#
+# Every property keeps its own working directory (Guest.csv, Future booking.csv, Companies.csv, ...)
+# and the menus of a terminal only read and change the files of the property it runs in. Set
+# HOTEL_CHAIN to a directory with one directory per property, and the Chain-wide Search menu asks
+# every property at once: "find guest Smith in any property", "all arrivals on a date".
+#
+# Chain mode only searches: the workers open the files of the other properties read-only, and
+# guests, bookings and companies are still added and changed from a terminal started in the
+# directory of their own property, which is the only one it writes to.
+#
+# The properties are split over a pool of worker processes. Each worker always gets the same
+# properties and keeps their files loaded together with their indexes between searches, opening a
+# file again only when it (or its journal) has changed, so a repeated search costs one index lookup
+# per property. The results of the workers are merged in property order.
+
+CHAIN = os.environ.get('HOTEL_CHAIN')
+
+# The files of a property that can be searched across the chain
+SHARD_FILES = {'Guest.csv': GuestRecord, 'Future booking.csv': BookingRecord, 'Companies.csv': CompanyRecord}
+SEARCHES = ('find', 'find_prefix', 'find_range')
+
+# Files opened by this worker process: path -> (signature, dataset)
+_open_files = {}
+
+# Function to list the properties of a chain: its directories that hold at least one of the SHARD_FILES
+def list_properties(chain_directory):
+    properties = []
+    for name in sorted(os.listdir(chain_directory)):
+        directory = os.path.join(chain_directory, name)
+        if os.path.isdir(directory) and any(file_exists(os.path.join(directory, file_name)) for file_name in SHARD_FILES):
+            properties.append(directory)
+    return properties
+
+# Function to check whether a property has a file, as a CSV or as monthly partitions
+def file_exists(path):
+    return os.path.exists(path) or is_partitioned(path)
+
+# Function to get a loaded file of a property, opening it again when it has changed since the last search
+def shard_dataset(directory, file_name):
+    path = os.path.join(directory, file_name)
+    signature = file_signature(path)
+    entry = _open_files.get(path)
+    if entry is None or entry[0] != signature:
+        dataset = (PartitionedDataset if is_partitioned(path) else Dataset)(path, SHARD_FILES[file_name])
+        dataset.load()
+        entry = _open_files[path] = (signature, dataset)
+    return entry[1]
+
+# Function run by the worker processes: run one search in some of the properties.
+# Returns [(property, [rows])] in the order the properties were given.
+def search_properties(job):
+    directories, file_name, search, args, conditions = job
+    results = []
+    for directory in directories:
+        rows = []
+        if file_exists(os.path.join(directory, file_name)):
+            rows = getattr(shard_dataset(directory, file_name), search)(*args, **conditions)
+        results.append((os.path.basename(directory), list(rows)))
+    return results
+
+# The properties of a chain and the worker processes that search them
+class Chain:
+    def __init__(self, directory, workers=None):
+        self.directory = directory
+        self.properties = list_properties(directory)
+        self.order = {os.path.basename(path): number for number, path in enumerate(self.properties)}
+        workers = max(1, min(workers or os.cpu_count() or 1, len(self.properties)))
+        # Property n always goes to worker n % workers, so every worker keeps its own properties loaded
+        self.groups = [self.properties[worker::workers] for worker in range(workers)]
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in self.groups] if workers > 1 else []
+
+    # Function to run a search (find, find_prefix or find_range of Dataset) on one file of every property.
+    # Returns [(property, row)] in property order.
+    def search(self, file_name, search, *args, **conditions):
+        if file_name not in SHARD_FILES or search not in SEARCHES:
+            raise ValueError(f"Cannot search {file_name} with {search} across the chain.")
+        jobs = [(group, file_name, search, args, conditions) for group in self.groups]
+        if self.executors:
+            futures = [executor.submit(search_properties, job) for executor, job in zip(self.executors, jobs)]
+            parts = [future.result() for future in futures]
+        else:
+            parts = [search_properties(job) for job in jobs]
+        found = sorted((result for part in parts for result in part), key=lambda result: self.order[result[0]])
+        return [(name, row) for name, rows in found for row in rows]
+
+    # Function to stop the worker processes and let go of the files loaded in this process
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+        self.executors = []
+        _open_files.clear()
+
+# Function to print chain-wide results one per line, with their property
+def print_chain_results(title, results, columns):
+    print(f"\n{title}: {len(results)}")
+    if results:
+        print(f"{'Property':<16}" + ''.join(f"{label:<{width}}" for label, _, width in columns))
+    for name, row in results:
+        print(f"{name:<16}" + ''.join(f"{str(row.get(field) or '-'):<{width}}" for _, field, width in columns))
+
+GUEST_COLUMNS = [('Guest ID', 'guest_id', 20), ('Name', 'first_name', 12), ('', 'last_name', 12),
+                 ('Check-in', 'check_in_date', 12), ('Check-out', 'check_out_date', 12), ('Room', 'room_id', 7)]
+BOOKING_COLUMNS = [('Name', 'first_name', 12), ('', 'last_name', 12), ('From', 'reserved_from', 12),
+                   ('To', 'reserved_to', 12), ('Room', 'room_id', 7), ('Phone', 'phone_number', 16)]
+COMPANY_COLUMNS = [('Company', 'Company Name', 32), ('Type', 'Company Type', 20), ('Status', 'Cooperation Status', 12)]
+
+# Main function for the searches across all properties of the chain
+def chain_operations(chain):
+    while True:
+        print(f"\nChain-wide Search ({len(chain.properties)} properties, read-only):")
+        print("1. Find guests by last name")
+        print("2. Find a guest by ID")
+        print("3. Arrivals on a date")
+        print("4. Find bookings by last name")
+        print("5. Find companies by name")
+        print("6. Go back")
+
+        choice = diagnostics.ask_menu_choice('chain', "Choose an operation: ").strip()
+
+        if choice == "1":
+            name = input("Enter last name (or its beginning): ").strip()
+            print_chain_results(f"Guests named '{name}'", chain.search('Guest.csv', 'find_prefix', 'last_name', name), GUEST_COLUMNS)
+
+        elif choice == "2":
+            guest_id = input("Enter guest ID: ").strip()
+            print_chain_results(f"Guest '{guest_id}'", chain.search('Guest.csv', 'find', 'guest_id', guest_id), GUEST_COLUMNS)
+
+        elif choice == "3":
+            day = input("Enter the date (YYYY-MM-DD): ").strip()
+            print_chain_results(f"Guests checking in on {day}", chain.search('Guest.csv', 'find', 'check_in_date', day), GUEST_COLUMNS)
+            print_chain_results(f"Bookings arriving on {day}", chain.search('Future booking.csv', 'find', 'reserved_from', day), BOOKING_COLUMNS)
+
+        elif choice == "4":
+            name = input("Enter last name (or its beginning): ").strip()
+            print_chain_results(f"Bookings for '{name}'", chain.search('Future booking.csv', 'find_prefix', 'last_name', name), BOOKING_COLUMNS)
+
+        elif choice == "5":
+            name = input("Enter company name (or its beginning): ").strip()
+            print_chain_results(f"Companies named '{name}'", chain.search('Companies.csv', 'find_prefix', 'Company Name', name), COMPANY_COLUMNS)
+
+        elif choice == "6":
+            break
+
+        else:
+            print("Invalid choice. Please try again.")
@@ -0,0 +1,206 @@
+import atexit
+import json
+import os
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the log is still written, but two terminals must not change data at the same moment
+    fcntl = None
+
+# Change log for the systems that copy our data (accounting, the CRM).
+#
+# Every insert, update and delete of the tracked datasets (Guest.csv, Companies.csv and
+# Future booking.csv) is written to changes.jsonl as one JSON line with a sequence number and
+# the row as it was before and after the change:
+#
+#   {"seq": 42, "time": "2025-01-14T09:30:00", "file": "Future booking.csv", "op": "update",
+#    "before": {...}, "after": {...}}
+#
+# before is null for inserts and after is null for deletes. The sequence numbers keep growing
+# across restarts and across the terminals that share the files, so a downstream system only
+# remembers the last number it has seen and asks for what came after it:
+#
+#   python system.py --export-changes 41 [changes.jsonl]
+#
+# A change is numbered and written only once it is on disk itself: right away for the changes the
+# datasets journal as they are made, and when the file is written for the ones held back by batch
+# mode (batch files, bulk imports) or by the server until it writes several at once. Every append
+# to the log is flushed to disk, so a number a downstream system has seen is never given again.
+#
+# The lines are appended in sequence order, so the export finds its first line by bisecting the
+# file and reads only the changes it returns.
+
+CHANGE_LOG = os.environ.get('HOTEL_CHANGE_LOG', 'changes.jsonl')
+
+# Bytes read from the end of the log to find the last sequence number
+TAIL_SIZE = 64 * 1024
+
+class ChangeLog:
+    def __init__(self, path=CHANGE_LOG):
+        self.path = path
+        self.file = None
+        self.sequence = 0   # last sequence number in the log
+        self.end = None     # size of the log after our last record; another size means another terminal wrote
+        self.lock = threading.Lock()
+
+    # Function to open the log for appending, on the first change
+    def _open(self):
+        self.file = open(self.path, 'ab')
+        atexit.register(self.close)
+
+    # Function to read the last sequence number of the log, dropping a torn last line first
+    def _read_sequence(self):
+        self.file.seek(0, os.SEEK_END)
+        size = self.file.tell()
+        with open(self.path, 'rb') as log:
+            start = max(0, size - TAIL_SIZE)
+            log.seek(start)
+            tail = log.read(size - start)
+        if tail and not tail.endswith(b'\n'):
+            # The process writing the last line died halfway; that change has no record
+            size -= len(tail) - tail.rfind(b'\n') - 1
+            os.truncate(self.path, size)
+            tail = tail[:tail.rfind(b'\n') + 1]
+        lines = tail.splitlines()
+        self.sequence = json.loads(lines[-1])['seq'] if lines else 0
+        self.end = size
+
+    # Function to append changes (time, file, op, before, after) with the next sequence numbers and
+    # flush them to disk; returns the records
+    def write(self, changes):
+        if not changes:
+            return []
+        with self.lock:
+            if self.file is None:
+                self._open()
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.fstat(self.file.fileno()).st_size != self.end:
+                    self._read_sequence()
+                records = []
+                for number, (time, file_name, op, before, after) in enumerate(changes, start=self.sequence + 1):
+                    records.append({'seq': number, 'time': time, 'file': file_name, 'op': op,
+                                    'before': before, 'after': after})
+                data = ''.join(json.dumps(record) + '\n' for record in records).encode()
+                self.file.write(data)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.sequence += len(records)
+                self.end += len(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            return records
+
+    # Function to close the log
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                self.end = None
+
+    # Function to start recording the changes of one dataset (see Dataset.on_change and on_written)
+    def follow(self, dataset):
+        file_name = os.path.basename(dataset.file_path)
+        # Changes made while the dataset holds its writes back, oldest first; None for an update
+        # that changed nothing, which still stands for one held-back change
+        waiting = deque()
+
+        def changed(op, row, old_values):
+            after = dict(row)
+            time = datetime.now().isoformat(timespec='seconds')
+            if op == 'insert':
+                change = (time, file_name, op, None, after)
+            elif op == 'delete':
+                change = (time, file_name, op, after, None)
+            elif any(old_values[field] != after.get(field) for field in old_values):
+                change = (time, file_name, op, {**after, **old_values}, after)
+            else:
+                change = None
+            if dataset.deferred or dataset.pending is not None:
+                with self.lock:
+                    waiting.append(change)
+            elif change is not None:
+                # The dataset has already written it (the journal record comes before the callbacks)
+                self.write([change])
+
+        def written(count):
+            with self.lock:
+                count = len(waiting) if count is None else min(count, len(waiting))
+                changes = [waiting.popleft() for _ in range(count)]
+            self.write([change for change in changes if change is not None])
+
+        dataset.on_change(changed)
+        dataset.on_written(written)
+
+# Function to record every change of the given datasets in the change log
+def track(change_log, *datasets):
+    for dataset in datasets:
+        change_log.follow(dataset)
+
+# Function to get the start of the first line that starts at or after a byte offset of the log
+def line_start(log, offset):
+    if offset == 0:
+        return 0
+    log.seek(offset - 1)
+    log.readline()
+    return log.tell()
+
+# Function to find the byte offset of the first line whose sequence number is above since,
+# by bisecting the log (its lines are in sequence order)
+def find_offset(log, size, since):
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        start = line_start(log, middle)
+        log.seek(start)
+        line = log.readline()
+        if not line.endswith(b'\n') or json.loads(line)['seq'] > since:
+            high = middle
+        else:
+            low = start + 1
+    return line_start(log, low)
+
+# Function to read the changes with a sequence number above since, in order, one record at a time
+def read_changes(path=CHANGE_LOG, since=0):
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as log:
+        # Only what was in the log, flushed to disk, when it was opened; a terminal appending right
+        # now holds the lock until its records are on disk
+        if fcntl is not None:
+            fcntl.flock(log.fileno(), fcntl.LOCK_SH)
+        size = os.fstat(log.fileno()).st_size
+        if fcntl is not None:
+            fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+        log.seek(find_offset(log, size, since))
+        while log.tell() < size:
+            line = log.readline()
+            if not line.endswith(b'\n'):
+                # A torn last line, left by a terminal that died while appending
+                break
+            record = json.loads(line)
+            if record['seq'] > since:
+                yield record
+
+# Function to write the changes after a sequence number as JSONL to a file, or to the screen
+def export_changes(since=0, output_path=None, path=CHANGE_LOG):
+    output = open(output_path, 'w') if output_path else sys.stdout
+    count = last = 0
+    try:
+        for record in read_changes(path, since):
+            output.write(json.dumps(record) + '\n')
+            count, last = count + 1, record['seq']
+    finally:
+        if output_path:
+            output.close()
+    if output_path:
+        print(f"{count} change(s) written to '{output_path}'" + (f", up to sequence number {last}." if count else "."))
+    return count, last
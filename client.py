@@ -0,0 +1,38 @@
+import json
+import socket
+import sys
+
+from server import HOST, PORT
+
+# Thin terminal for the reservation server (see server.py): the menus run on the server,
+# this program only shows their output and sends back what the user types.
+
+# Function to run one terminal session against the server
+def run_terminal(host=HOST, port=PORT):
+    try:
+        connection = socket.create_connection((host, port))
+    except OSError as e:
+        print(f"Error: Could not connect to the server at {host}:{port} ({e.strerror or e}).")
+        return
+    with connection, connection.makefile('rw', encoding='utf-8', newline='\n') as stream:
+        stream.write(json.dumps({'op': 'terminal'}) + '\n')
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            print(message.get('output', ''), end='')
+            if message.get('closed'):
+                return
+            try:
+                text = input(message.get('prompt', ''))
+            except (EOFError, KeyboardInterrupt):
+                print()
+                return
+            stream.write(json.dumps({'input': text}) + '\n')
+            stream.flush()
+        print("The connection to the server was closed.")
+
+if __name__ == "__main__":
+    # Usage: python client.py [host] [port]
+    host = sys.argv[1] if len(sys.argv) > 1 else HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+    run_terminal(host, port)
@@ -0,0 +1,212 @@
+from bisect import bisect_left
+from collections import Counter
+from math import ceil
+import journal
+
+# Helper functions for indexed company lookups and corporate rates.
+#
+# The index holds, for every company, its row and its net rate for each room type, keyed by the
+# case-folded company name. Together the rate rows form a company x room-type matrix that is
+# computed once from Companies.csv and refreshed only for the company whose row changes.
+#
+# For searching, every name is split into trigrams (" ga", "gar", "arc", ...) and an inverted
+# index maps each trigram to the names containing it. A query only looks at the names that share
+# trigrams with it and ranks them by similarity, which also finds names with a typo in them. The
+# query itself is not padded, so a query found anywhere inside a name shares all its trigrams with it.
+# Companies are also grouped by Company Type, with the types kept in a fixed alphabetical order.
+
+# Minimum share of the query's trigrams (0..1) a name must contain to count as a fuzzy match
+FUZZY_THRESHOLD = 0.4
+
+# Price columns, one per room type
+PRICE_COLUMNS = ['Standard Price', 'Twin Price', 'Accessible Price', 'Deluxe Price', 'Family Deluxe Price', 'Suite Price']
+
+# Function to get the corporate discount for the nights a company occupied last year
+def discount_for_nights(nights_occupied):
+    if nights_occupied < 50:
+        return 0.05
+    elif 50 <= nights_occupied < 100:
+        return 0.10
+    elif 100 <= nights_occupied < 150:
+        return 0.12
+    return 0.15
+
+# Function to compute the rate row of one company
+def company_rates(company):
+    nights_occupied = int(company['Nights Occupied Last Year'])
+    discount = discount_for_nights(nights_occupied)
+    prices = [int(float(company[column])) for column in PRICE_COLUMNS]
+    return {
+        'company': company,
+        'nights_occupied': nights_occupied,
+        'discount': discount,
+        'prices': prices,
+        'net_prices': [int(price * (1 - discount)) for price in prices],
+    }
+
+# Function to build the name index and rate matrix over all companies
+def build_company_index(company_data):
+    index = {'by_name': {}, 'errors': {}, 'trigrams': {}, 'by_type': {}, 'types': []}
+    for company in company_data:
+        _add_company(index, company)
+    if hasattr(company_data, 'on_change'):
+        company_data.on_change(lambda op, company, old_values: update_company_index(index, op, company, old_values))
+    return index
+
+# Function to split a name into the trigrams used by the search index
+def trigrams(text):
+    padded = f" {text.strip().casefold()} "
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+# Function to split a query into trigrams; unlike names it is not padded, as it may start or end mid-word
+def query_trigrams(text):
+    text = text.strip().casefold()
+    return {text[position:position + 3] for position in range(len(text) - 2)}
+
+# Function to add one company to the index; rows with broken numbers are kept for lookups only
+def _add_company(index, company, add_to_group=True):
+    key = company.get('Company Name', '').strip().casefold()
+    for gram in trigrams(key):
+        index['trigrams'].setdefault(gram, set()).add(key)
+    if add_to_group:
+        company_type = company.get('Company Type', '')
+        if company_type not in index['by_type']:
+            index['types'].insert(bisect_left(index['types'], company_type), company_type)
+        index['by_type'].setdefault(company_type, []).append(company)
+    try:
+        index['by_name'][key] = company_rates(company)
+        index['errors'].pop(key, None)
+    except (KeyError, ValueError) as e:
+        index['by_name'][key] = {'company': company}
+        index['errors'][key] = e
+
+# Function to apply a change reported by the company dataset to the index
+def update_company_index(index, op, company, old_values=None):
+    if op in ('update', 'delete'):
+        old_name = (old_values or {}).get('Company Name', company.get('Company Name', ''))
+        old_key = old_name.strip().casefold()
+        entry = index['by_name'].get(old_key)
+        if entry and entry['company'] is company:
+            del index['by_name'][old_key]
+            for gram in trigrams(old_key):
+                names = index['trigrams'].get(gram)
+                if names is not None:
+                    names.discard(old_key)
+                    if not names:
+                        del index['trigrams'][gram]
+    old_type = (old_values or {}).get('Company Type', company.get('Company Type', ''))
+    # A company keeps its place in its type group unless its type changes
+    regroup = op != 'update' or old_type != company.get('Company Type', '')
+    if op in ('update', 'delete') and regroup:
+        group = index['by_type'].get(old_type, [])
+        group[:] = [c for c in group if c is not company]
+        if not group and old_type in index['by_type']:
+            del index['by_type'][old_type]
+            index['types'].remove(old_type)
+    if op in ('update', 'insert'):
+        _add_company(index, company, add_to_group=regroup)
+
+# Function to get the index of a company dataset, building it on first use
+def get_company_index(company_data):
+    if hasattr(company_data, 'derived'):
+        return company_data.derived('company_index', build_company_index)
+    return build_company_index(company_data)
+
+# Function to look up a company and its rates by name (case-insensitive); returns None if unknown
+def find_company_rates(index, company_name):
+    return index['by_name'].get(company_name.strip().casefold())
+
+# Function to rank companies by how well their name matches a query; returns a list of company rows
+def search_companies(index, query, limit=None):
+    query = query.strip().casefold()
+    if not query:
+        return []
+    if len(query) < 3:
+        # Too short for trigrams to tell names apart; plain substring matching in name order
+        keys = sorted(key for key in index['by_name'] if query in key)
+        return [index['by_name'][key]['company'] for key in keys][:limit]
+
+    query_grams = query_trigrams(query)
+    postings = sorted((index['trigrams'].get(gram, set()) for gram in query_grams), key=len)
+    minimum = max(1, ceil(FUZZY_THRESHOLD * len(postings)))
+
+    # Posting lists are read from the shortest one up. A name sharing at least `needed` trigrams
+    # with the query must be in one of the first len(postings) - needed + 1 lists, so after reading
+    # `used` lists every name with needed = len(postings) - used + 1 or more shared trigrams is
+    # known. Reading stops as soon as those names fill the limit, which is usually after a few
+    # short lists.
+    shared = Counter()
+    needed = len(postings)
+    for used, names in enumerate(postings, start=1):
+        new_names = names - shared.keys()
+        if new_names:
+            # Count the shared trigrams of all new names at once with set intersections
+            for other in postings:
+                shared.update(new_names & other)
+        needed = len(postings) - used + 1
+        if needed <= minimum:
+            break
+        if limit is not None:
+            names_with_count = Counter(shared.values())
+            if sum(names_with_count[count] for count in range(needed, len(postings) + 1)) >= limit:
+                break
+    needed = max(needed, minimum)
+
+    ranked = []
+    for key, count in shared.items():
+        if count >= needed:
+            # Substring matches first, then by the share of the query found in the name, then by
+            # overall similarity so that shorter, closer names come before longer ones
+            ranked.append((query not in key, -count, -2 * count / (len(postings) + len(key)), key))
+    ranked.sort()
+    return [index['by_name'][key]['company'] for *_, key in ranked[:limit]]
+
+# Function to get all company types in a stable (alphabetical) order
+def company_types(index):
+    return list(index['types'])
+
+# Function to get the companies of one type, in the order they were loaded
+def companies_of_type(index, company_type):
+    return list(index['by_type'].get(company_type, []))
+
+# Function to match a room type typed by a user ("suite", "Suite Price") to its price column
+def price_column(room_type):
+    wanted = room_type.strip().casefold()
+    for column in PRICE_COLUMNS:
+        if wanted in (column.casefold(), column[:-len(' Price')].casefold()):
+            return column
+    return None
+
+# Function to price many (company name, room type, nights) requests; returns one quote dict per request
+def bulk_quotes(index, requests):
+    quotes = []
+    for company_name, room_type, nights in requests:
+        quote = {'Company Name': company_name, 'Room Type': room_type, 'Nights': nights,
+                 'Discount %': '', 'List Price': '', 'Net Price': '', 'Total': '', 'Error': ''}
+        entry = find_company_rates(index, company_name)
+        column = price_column(room_type)
+        if entry is None:
+            quote['Error'] = 'Unknown company'
+        elif 'net_prices' not in entry:
+            quote['Error'] = 'Invalid numeric value in the dataset'
+        elif column is None:
+            quote['Error'] = 'Unknown room type'
+        elif not str(nights).isdigit() or int(nights) < 1:
+            quote['Error'] = 'Invalid number of nights'
+        else:
+            position = PRICE_COLUMNS.index(column)
+            quote['Company Name'] = entry['company']['Company Name']
+            quote['Room Type'] = column[:-len(' Price')]
+            quote['Nights'] = int(nights)
+            quote['Discount %'] = int(entry['discount'] * 100)
+            quote['List Price'] = entry['prices'][position]
+            quote['Net Price'] = entry['net_prices'][position]
+            quote['Total'] = entry['net_prices'][position] * int(nights)
+        quotes.append(quote)
+    return quotes
+
+QUOTE_FIELDS = ['Company Name', 'Room Type', 'Nights', 'Discount %', 'List Price', 'Net Price', 'Total', 'Error']
+
+# Function to write quotes to a CSV file in one pass
+def export_quotes(file_path, quotes):
+    journal.save_to_csv(file_path, quotes, QUOTE_FIELDS)
@@ -1,15 +1,11 @@
 import csv
+import diagnostics
+import result_cache
+from company_index import (PRICE_COLUMNS, get_company_index, find_company_rates, bulk_quotes, export_quotes,
+                           search_companies, company_types, companies_of_type)
 
 # Helper functions for companies
 
-# Function to save updated data back to the CSV file
-def save_to_csv(file_path, data, fieldnames):
-    """Save the updated data back to the CSV file."""
-    with open(file_path, 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
-
 # Function to display detailed company information
 def display_company_info(company):
     print("\nCompany Information:")
@@ -26,78 +22,109 @@ def display_company_info(company):
 
 # Function to search for a company by name
 def search_company_by_name(company_data, name):
-    try:
-        # Filter companies matching the name
-        results = [company for company in company_data if 'Company Name' in company and name.lower() in company['Company Name'].lower()]
-        if results:
-            # Display information for all matching companies
-            for company in results:
-                display_company_info(company)
-        else:
-            print(f"No match found for the company name '{name}'.")
-    except KeyError:
-        print("Error: 'Company Name' column not found in the dataset. Available keys are:", company_data[0].keys())
+    # Closest matches first; names containing the search text rank above fuzzy (typo) matches
+    results = result_cache.cached(company_data, ('search', name.strip().casefold()),
+                                  lambda: search_companies(get_company_index(company_data), name))
+    if results:
+        # Display information for all matching companies
+        for company in results:
+            display_company_info(company)
+    else:
+        print(f"No match found for the company name '{name}'.")
 
 # Function to search for companies by type
 def search_company_by_type(company_data):
-    try:
-        # Extract unique company types
-        types = {company['Company Type'] for company in company_data}
-        print("Available Company Types:")
-        for idx, company_type in enumerate(types, start=1):
-            print(f"{idx}. {company_type}")
-
-        # Prompt user to select a company type
-        choice = input("Select a company type by number: ")
-        if choice.isdigit() and 1 <= int(choice) <= len(types):
-            selected_type = list(types)[int(choice) - 1]
-            results = [company for company in company_data if company['Company Type'] == selected_type]
-            print(f"Companies of type '{selected_type}':")
-            for company in results:
-                display_company_info(company)
-        else:
-            print("Invalid choice.")
-    except KeyError:
-        print("Error: 'Company Type' column not found in the dataset. Available keys are:", company_data[0].keys())
+    index = get_company_index(company_data)
+    # Types are listed in a fixed order so the numbers always mean the same type
+    types = company_types(index)
+    print("Available Company Types:")
+    for idx, company_type in enumerate(types, start=1):
+        print(f"{idx}. {company_type}")
+
+    # Prompt user to select a company type
+    choice = input("Select a company type by number: ")
+    if choice.isdigit() and 1 <= int(choice) <= len(types):
+        selected_type = types[int(choice) - 1]
+        print(f"Companies of type '{selected_type}':")
+        for company in companies_of_type(index, selected_type):
+            display_company_info(company)
+    else:
+        print("Invalid choice.")
 
 # Function to calculate discounted prices based on nights occupied
 def calculate_discounted_prices(company_data):
-    try:
-        # Prompt user to enter company name
-        company_name = input("Enter the company name: ")
-        company = next((c for c in company_data if c['Company Name'].lower() == company_name.lower()), None)
-        if not company:
-            print(f"No company found with the name '{company_name}'.")
-            return
-
-        # Determine discount based on nights occupied
-        nights_occupied = int(company['Nights Occupied Last Year'])
-        if nights_occupied < 50:
-            discount = 0.05
-        elif 50 <= nights_occupied < 100:
-            discount = 0.10
-        elif 100 <= nights_occupied < 150:
-            discount = 0.12
-        else:
-            discount = 0.15
-
-        print(f"The company '{company_name}' has occupied {nights_occupied} nights within a year and gets a {int(discount * 100)}% discount.")
-        # Calculate and display discounted prices for each room type
-        for room_type in ['Standard Price', 'Twin Price', 'Accessible Price', 'Deluxe Price', 'Family Deluxe Price', 'Suite Price']:
-            original_price = int(float(company[room_type]))
-            discounted_price = int(original_price * (1 - discount))
-            print(f"{room_type}: Original Price: {original_price}, Discounted Price: {discounted_price}")
-    except KeyError as e:
-        print(f"Error: Missing required column '{e.args[0]}' in the dataset.")
-    except ValueError:
+    # Prompt user to enter company name
+    company_name = input("Enter the company name: ")
+    entry = result_cache.cached(company_data, ('rates', company_name.strip().casefold()),
+                                lambda: find_company_rates(get_company_index(company_data), company_name))
+    if not entry:
+        print(f"No company found with the name '{company_name}'.")
+        return
+    if 'net_prices' not in entry:
         print("Error: Invalid numeric value in the dataset.")
+        return
+
+    # The discount and the discounted prices were computed once when the rates were indexed
+    discount = entry['discount']
+    print(f"The company '{company_name}' has occupied {entry['nights_occupied']} nights within a year and gets a {int(discount * 100)}% discount.")
+    for room_type, original_price, discounted_price in zip(PRICE_COLUMNS, entry['prices'], entry['net_prices']):
+        print(f"{room_type}: Original Price: {original_price}, Discounted Price: {discounted_price}")
+
+# Function to price many stays at once and export the quotes to a CSV file
+def export_bulk_quotes(company_data):
+    requests_path = input("Enter the CSV file with quote requests (Company Name, Room Type, Nights), or leave empty to quote all companies: ").strip()
+    if requests_path:
+        try:
+            with open(requests_path, 'r', newline='') as file:
+                requests = [(row.get('Company Name', ''), row.get('Room Type', ''), row.get('Nights', ''))
+                            for row in csv.DictReader(file)]
+        except OSError as e:
+            print(f"Error: Could not read '{requests_path}': {e.strerror}.")
+            return
+    else:
+        nights = input("Enter the number of nights: ").strip()
+        requests = [(company['Company Name'], room_type[:-len(' Price')], nights)
+                    for company in company_data for room_type in PRICE_COLUMNS]
+
+    # The same request file or the same number of nights for all companies is priced once until a company changes
+    quotes = result_cache.cached(company_data, ('quotes', tuple(requests)),
+                                 lambda: bulk_quotes(get_company_index(company_data), requests))
+    output_path = input("Enter the output CSV file name (default: quotes.csv): ").strip() or 'quotes.csv'
+    export_quotes(output_path, quotes)
+    failed = sum(1 for quote in quotes if quote['Error'])
+    print(f"{len(quotes)} quote(s) written to '{output_path}' ({failed} with errors).")
+
+# Cooperation statuses a company can have
+COOPERATION_STATUSES = ['Active', 'Inactive', 'Pending', 'Paused', 'Cancelled']
+
+# Function to find a company by its exact name (case-insensitive)
+def find_company(company_data, company_name):
+    companies = result_cache.find(company_data, 'Company Name', company_name)
+    return companies[0] if companies else None
+
+# Function to set the cooperation status of a company without prompting; returns an error message or None
+def set_cooperation_status(company_data, company, new_status):
+    if new_status not in COOPERATION_STATUSES:
+        return f"Unknown cooperation status '{new_status}'. Choose one of: {', '.join(COOPERATION_STATUSES)}."
+    company_data.update(company, {'Cooperation Status': new_status})
+    return None
+
+# Function to set new room prices for a company without prompting; returns an error message or None
+def set_company_prices(company_data, company, prices):
+    for column, price in prices.items():
+        if column not in PRICE_COLUMNS:
+            return f"Unknown price column '{column}'. Choose from: {', '.join(PRICE_COLUMNS)}."
+        if not str(price).isdigit():
+            return f"Invalid price '{price}' for {column}."
+    company_data.update(company, {column: str(price) for column, price in prices.items()})
+    return None
 
 # Function to change the cooperation status of a company
 def change_cooperation_status(company_data):
     try:
         # Prompt user to enter company name
         company_name = input("Enter the company name: ")
-        company = next((c for c in company_data if c['Company Name'].lower() == company_name.lower()), None)
+        company = find_company(company_data, company_name)
         if not company:
             print(f"No company found with the name '{company_name}'.")
             return
@@ -105,8 +132,7 @@ def change_cooperation_status(company_data):
         # Display current status and available statuses to change
         current_status = company['Cooperation Status']
         print(f"Current Cooperation Status: {current_status}")
-        available_statuses = ['Active', 'Inactive', 'Pending']
-        available_statuses.remove(current_status)
+        available_statuses = [status for status in COOPERATION_STATUSES if status != current_status]
         print("Available statuses to change:")
         for idx, status in enumerate(available_statuses, start=1):
             print(f"{idx}. {status}")
@@ -115,8 +141,7 @@ def change_cooperation_status(company_data):
         choice = input("Select the new status by number: ")
         if choice.isdigit() and 1 <= int(choice) <= len(available_statuses):
             new_status = available_statuses[int(choice) - 1]
-            company['Cooperation Status'] = new_status
-            save_to_csv('Companies.csv', company_data, company_data[0].keys())
+            set_cooperation_status(company_data, company, new_status)
             print(f"Cooperation status changed to '{new_status}'.")
         else:
             print("Invalid choice.")
@@ -132,10 +157,11 @@ def company_operations(company_data):
         print("2. Search company by type")
         print("3. Calculate discounted corporate prices")
         print("4. Change cooperation status")
-        print("5. Go back")
+        print("5. Export bulk corporate quotes")
+        print("6. Go back")
 
         # Get user choice
-        choice = input("Choose an operation: ")
+        choice = diagnostics.ask_menu_choice('company', "Choose an operation: ")
 
         if choice == "1":
             # Search company by name
@@ -155,6 +181,10 @@ def company_operations(company_data):
             change_cooperation_status(company_data)
 
         elif choice == "5":
+            # Price many stays at once and save them to a CSV file
+            export_bulk_quotes(company_data)
+
+        elif choice == "6":
             # Exit the company operations menu
             break
 
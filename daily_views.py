@@ -0,0 +1,226 @@
+import atexit
+import os
+import pickle
+from collections import Counter
+from datetime import date
+from partitions import file_signature
+from room_availability import row_interval
+
+# Daily front office views: the arrivals, the departures and the in-house counts by room type of
+# every date, from the stays in Guest.csv and the bookings in Future booking.csv.
+#
+# The views are built once and then follow the datasets through their change listeners. A changed
+# stay or booking (a new check-out date, a booking added, moved or cancelled) is applied as a delta:
+# its old version is taken out and its new version added, which touches its arrival day, its
+# departure day and the nights of the stay, never the other rows.
+#
+# The views are kept in daily_views.cache next to the CSV files together with the signatures of
+# the files they describe, and read back on the next start as long as no other program has changed
+# the files in between; otherwise they are built again. check_views() compares them with a full
+# rebuild.
+
+VIEWS_FILE = 'daily_views.cache'
+VIEWS_VERSION = 1
+STAY = 'stay'
+BOOKING = 'booking'
+UNASSIGNED = 'Unassigned'
+
+# Fields a row's place in the views depends on; changes to other fields (such as the email) are skipped
+VIEW_FIELDS = {'guest_id', 'first_name', 'last_name', 'phone_number', 'room_id', 'room_type',
+               'check_in_date', 'check_out_date', 'reserved_from', 'reserved_to'}
+
+# Function to get the file the views of a directory's CSV files are kept in
+def views_path(booking_data):
+    return os.path.join(os.path.dirname(booking_data.file_path), VIEWS_FILE)
+
+# Function to describe the files the views are built from; None when they are not plain files
+# (the SQLite backend), in which case the views are not kept on disk
+def data_signature(guest_data, booking_data):
+    if hasattr(guest_data, 'db_path') or hasattr(booking_data, 'db_path'):
+        return None
+    return file_signature(guest_data.file_path), file_signature(booking_data.file_path)
+
+# Function to describe a stay or booking in the arrival and departure lists
+def view_entry(source, row, interval):
+    reference = row.get('guest_id') if source == STAY else row.get('phone_number')
+    return (source, row.get('first_name') or '', row.get('last_name') or '', row.get('room_id') or '',
+            interval[0], interval[1], reference or '')
+
+# Function to add step to the count of item under key, dropping counts and keys that reach zero
+def _bump(table, key, item, step):
+    counts = table.setdefault(key, Counter())
+    counts[item] += step
+    if counts[item] <= 0:
+        del counts[item]
+        if not counts:
+            del table[key]
+
+# Function to add (step 1) or take away (step -1) one stay or booking
+def apply_row(views, source, row, step):
+    interval = row_interval(row)
+    if interval is None:
+        return
+    start, end = interval
+    entry = view_entry(source, row, interval)
+    _bump(views['arrivals'], start, entry, step)
+    _bump(views['departures'], end, entry, step)
+    room_id = row.get('room_id') or ''
+    if source == STAY:
+        group = row.get('room_type') or UNASSIGNED
+        if room_id and row.get('room_type'):
+            # Bookings carry no room type; it is taken from the stays in rooms with the same prefix
+            _bump(views['room_types'], room_id[:2], row['room_type'], step)
+    else:
+        group = room_id[:2]
+    for night in range(start, end):
+        _bump(views['in_house'], night, (source, group), step)
+
+# Function to build the views from all stays and bookings
+def build_views(guest_data, booking_data):
+    views = {'arrivals': {}, 'departures': {}, 'in_house': {}, 'room_types': {}, 'signature': None}
+    for guest in guest_data:
+        apply_row(views, STAY, guest, 1)
+    for booking in booking_data:
+        apply_row(views, BOOKING, booking, 1)
+    return views
+
+# Function to apply a change reported by the guest (source STAY) or booking (BOOKING) dataset to the views
+def update_views(views, source, op, row, old_values=None):
+    if op == 'update' and not VIEW_FIELDS & set(old_values or ()):
+        return
+    if op in ('update', 'delete'):
+        apply_row(views, source, {**dict(row.items()), **(old_values or {})}, -1)
+    if op in ('update', 'insert'):
+        apply_row(views, source, row, 1)
+
+# Function to read the views back from their file; returns None when they do not describe the current files
+def load_views(path, signature):
+    try:
+        with open(path, 'rb') as file:
+            saved = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    if saved.get('version') != VIEWS_VERSION or saved['views'].get('signature') != signature:
+        return None
+    return saved['views']
+
+# Function to write the views to their file
+def save_views(path, views):
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            pickle.dump({'version': VIEWS_VERSION, 'views': views}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError:
+        # Like the snapshot cache, the file is only an optimisation
+        pass
+
+# Function to write the views on exit, unless another program changed the files after our last change
+def _save_on_exit(guest_data, booking_data, views):
+    signature = data_signature(guest_data, booking_data)
+    if signature is not None and signature == views['signature']:
+        save_views(views_path(booking_data), views)
+
+# Function to read the views from their file, or build them, and follow the changes of both datasets
+def open_views(guest_data, booking_data):
+    path = views_path(booking_data)
+    signature = data_signature(guest_data, booking_data)
+    views = load_views(path, signature) if signature is not None else None
+    if views is None:
+        views = build_views(guest_data, booking_data)
+        views['signature'] = signature
+        if signature is not None:
+            save_views(path, views)
+
+    def follow(source):
+        def changed(op, row, old_values):
+            update_views(views, source, op, row, old_values)
+            # The files as they are now. A change held back by batch mode or hold_writes() is not in
+            # them yet; the signature is taken again once it is written (see written below)
+            views['signature'] = data_signature(guest_data, booking_data)
+        return changed
+
+    def written(count):
+        views['signature'] = data_signature(guest_data, booking_data)
+
+    if hasattr(guest_data, 'on_change'):
+        guest_data.on_change(follow(STAY))
+        booking_data.on_change(follow(BOOKING))
+        guest_data.on_written(written)
+        booking_data.on_written(written)
+        atexit.register(_save_on_exit, guest_data, booking_data, views)
+    return views
+
+# Function to get the views of the datasets, opening them on first use
+def get_daily_views(guest_data, booking_data):
+    if hasattr(booking_data, 'derived'):
+        return booking_data.derived('daily_views', lambda bookings: open_views(guest_data, bookings))
+    return build_views(guest_data, booking_data)
+
+# Function to get the room type the bookings of a room prefix count under
+def room_type_of(views, prefix):
+    types = views['room_types'].get(prefix)
+    if not types:
+        return UNASSIGNED
+    return max(types.items(), key=lambda item: (item[1], item[0]))[0]
+
+# Function to get the lists of one day (YYYY-MM-DD): the arrivals and departures as sorted entries
+# and the in-house counts as {room type: {STAY: n, BOOKING: n}}; raises ValueError for a bad date
+def day_lists(views, day):
+    ordinal = date.fromisoformat(day).toordinal()
+    in_house = {}
+    for (source, group), count in views['in_house'].get(ordinal, {}).items():
+        room_type = group if source == STAY else room_type_of(views, group)
+        counts = in_house.setdefault(room_type, {STAY: 0, BOOKING: 0})
+        counts[source] += count
+    return {'arrivals': sorted(views['arrivals'].get(ordinal, Counter()).elements()),
+            'departures': sorted(views['departures'].get(ordinal, Counter()).elements()),
+            'in_house': in_house}
+
+# Function to compare the views with a full rebuild; returns the differences found (none when they match)
+def check_views(guest_data, booking_data, views=None):
+    views = views if views is not None else get_daily_views(guest_data, booking_data)
+    rebuilt = build_views(guest_data, booking_data)
+    differences = []
+    for name in ('arrivals', 'departures', 'in_house', 'room_types'):
+        for key in sorted(set(views[name]) | set(rebuilt[name])):
+            have, want = views[name].get(key, Counter()), rebuilt[name].get(key, Counter())
+            if have != want:
+                differences.append(f"{name} {key}: {dict(have - want)} too many, {dict(want - have)} missing")
+    return differences
+
+# Function to replace the views with a full rebuild, keeping the dict the listeners update
+def rebuild_views(guest_data, booking_data, views):
+    rebuilt = build_views(guest_data, booking_data)
+    rebuilt['signature'] = data_signature(guest_data, booking_data)
+    views.clear()
+    views.update(rebuilt)
+    if rebuilt['signature'] is not None:
+        save_views(views_path(booking_data), views)
+
+# Function to print one list of arrivals or departures
+def print_entries(title, entries):
+    print(f"\n{title}: {len(entries)}")
+    for source, first_name, last_name, room_id, start, end, reference in entries:
+        print(f"{'Stay' if source == STAY else 'Booking':<9}{room_id or '-':<7}{first_name + ' ' + last_name:<26}"
+              f"{date.fromordinal(start).isoformat():<12}{date.fromordinal(end).isoformat():<12}{reference}")
+
+# Function to ask for a day and print its arrivals, departures and in-house counts by room type
+def show_day_lists(guest_data, booking_data):
+    day = input("Enter the date (YYYY-MM-DD, leave empty for today): ").strip() or date.today().isoformat()
+    try:
+        lists = day_lists(get_daily_views(guest_data, booking_data), day)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    print(f"\nFront office lists for {day}")
+    print(f"{'Source':<9}{'Room':<7}{'Guest':<26}{'Arrival':<12}{'Departure':<12}Guest ID / phone")
+    print_entries("Arrivals", lists['arrivals'])
+    print_entries("Departures", lists['departures'])
+    print(f"\nIn-house on the night of {day}:")
+    print(f"{'Room type':<20}{'Stays':>8}{'Bookings':>10}{'Total':>8}")
+    for room_type, counts in sorted(lists['in_house'].items()):
+        print(f"{room_type:<20}{counts[STAY]:>8}{counts[BOOKING]:>10}{counts[STAY] + counts[BOOKING]:>8}")
+    total_stays = sum(counts[STAY] for counts in lists['in_house'].values())
+    total_bookings = sum(counts[BOOKING] for counts in lists['in_house'].values())
+    print(f"{'Total':<20}{total_stays:>8}{total_bookings:>10}{total_stays + total_bookings:>8}")
@@ -0,0 +1,251 @@
+from contextlib import contextmanager
+import os
+import time
+import diagnostics
+import journal
+import snapshot
+from field_index import build_field_index, update_field_index, field_key, find_equal, find_prefix, find_between, filter_equal
+
+# A dataset is the in-memory list of rows of one CSV file together with its persistence.
+# It behaves like the list returned by csv.DictReader for reading, while every change goes
+# through update(), append() or remove() so that it is journaled and other parts of the
+# system (such as the guest indexes) can follow along.
+#
+# When a record class (see records.py) is given and the CSV header matches it, rows are stored
+# as compact records; otherwise they are plain dicts. Rows are loaded on first use, from the
+# snapshot cache (see snapshot.py) when the CSV has not changed since it was parsed.
+#
+# Searches go through find(), find_prefix() and find_range(), which use in-memory field indexes
+# here and indexed SQL queries in the SQLite backend (see sqlite_store.py), so the menus work the
+# same with either storage.
+
+class Dataset:
+    # missing_ok: a missing CSV file is read as an empty table with the header of record_class
+    # (for files older installs do not have yet); it is created by the first save
+    def __init__(self, file_path, record_class=None, missing_ok=False):
+        self.file_path = file_path
+        self.requested_class = record_class
+        self.missing_ok = missing_ok and record_class is not None
+        self.record_class = None
+        self.fieldnames = None
+        self._rows = None
+        self.listeners = []
+        self.written_listeners = []
+        self.deferred = False   # while True, changes stay in memory until end_batch()
+        self.dirty = False
+        self.pending = None     # while a list, journal records wait here until they are taken
+        self.derived_data = {}
+
+    # The CSV is only read the first time its rows are needed
+    @property
+    def rows(self):
+        if self._rows is None:
+            self.load()
+        return self._rows
+
+    # Function to read the rows from the snapshot cache or the CSV file and replay the journal
+    def load(self):
+        start = time.perf_counter()
+        cached = snapshot.load_snapshot(self.file_path, self.requested_class)
+        if self.missing_ok and not os.path.exists(self.file_path):
+            # The journal (if any) holds the changes made since; it was started against no file
+            fieldnames, rows, source = list(self.requested_class.FIELDS), [], 'missing'
+        elif cached is None:
+            fieldnames, rows = journal.read_csv(self.file_path, self.requested_class)
+            snapshot.save_snapshot(self.file_path, fieldnames, rows, self.requested_class)
+            source = 'csv'
+        else:
+            fieldnames, rows = cached
+            source = 'snapshot'
+        record_class = self.requested_class
+        if record_class is not None and tuple(fieldnames) != tuple(record_class.FIELDS):
+            record_class = None
+        self.fieldnames, self.record_class, self._rows = fieldnames, record_class, rows
+        journal.replay(self.file_path, self._rows, self.make_row)
+        if diagnostics.enabled:
+            diagnostics.record_load(self.file_path, source,
+                                    time.perf_counter() - start, len(rows))
+
+    # Function to check whether the rows have been read yet
+    def is_loaded(self):
+        return self._rows is not None
+
+    # Function to turn a dict into the kind of row this dataset stores
+    def make_row(self, row):
+        if self.record_class is None:
+            return row if isinstance(row, dict) else dict(row)
+        if isinstance(row, self.record_class):
+            return row
+        return self.record_class.from_dict(row)
+
+    def __iter__(self):
+        if diagnostics.enabled:
+            diagnostics.add_rows(len(self.rows))
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, position):
+        return self.rows[position]
+
+    # Function to get a structure derived from the rows (such as an index), building it on first use.
+    # build(dataset) is called once; it can register on_change callbacks to keep the structure current.
+    def derived(self, name, build):
+        if name not in self.derived_data:
+            self.derived_data[name] = build(self)
+        return self.derived_data[name]
+
+    # Function to get the index of one field (see field_index.py), building it on first use
+    def field_index(self, field):
+        def build(dataset):
+            index = build_field_index(dataset, field)
+            dataset.on_change(lambda op, row, old_values: update_field_index(index, op, row, old_values))
+            return index
+        return self.derived(f'field:{field}', build)
+
+    # Function to build the indexes of the given fields now instead of on the first search
+    def prepare(self, *fields):
+        for field in fields:
+            self.field_index(field)
+
+    # Function to find the rows whose field equals value (case-insensitive); other keyword
+    # arguments are further fields that must match too, e.g. find('first_name', 'Eve', last_name='Jones')
+    def find(self, field, value, **conditions):
+        return self._found(filter_equal(find_equal(self.field_index(field), value), conditions))
+
+    # Function to find the rows whose field starts with prefix (case-insensitive), in field order
+    def find_prefix(self, field, prefix, **conditions):
+        return self._found(filter_equal(find_prefix(self.field_index(field), prefix), conditions))
+
+    # Function to find the rows whose field is in [start, end), in field order (for YYYY-MM-DD dates)
+    def find_range(self, field, start, end):
+        return self._found(find_between(self.field_index(field), field_key(start), field_key(end)))
+
+    # Function to count the rows a search returns while instrumentation is on (see diagnostics.py)
+    def _found(self, rows):
+        if diagnostics.enabled:
+            diagnostics.add_rows(len(rows))
+        return rows
+
+    # Function to register a callback(op, row, old_values) that is called after every change
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self, op, row, old_values=None):
+        for callback in self.listeners:
+            callback(op, row, old_values)
+
+    # Function to register a callback(count) that is called once changes held back by batch mode or
+    # hold_writes() are on disk: the oldest count of them, or all of them when count is None.
+    # Changes made outside those modes are on disk before the on_change callbacks are called.
+    def on_written(self, callback):
+        self.written_listeners.append(callback)
+
+    # Function to report that held-back changes are on disk; called by save() and by the writer of
+    # the records taken with take_pending()
+    def written(self, count=None):
+        for callback in self.written_listeners:
+            callback(count)
+
+    # Function to find the position of a row object in the dataset
+    def position(self, row):
+        if self.record_class is not None and isinstance(row, self.record_class):
+            # Records compare by identity, so the list can do the search in C
+            return self.rows.index(row)
+        for position, candidate in enumerate(self.rows):
+            if candidate is row:
+                return position
+        raise ValueError("Row is not part of this dataset.")
+
+    # Function to check whether a row object is still part of the dataset; on the server another
+    # terminal can remove a row while this one waits at a prompt
+    def contains(self, row):
+        try:
+            self.position(row)
+        except ValueError:
+            return False
+        return True
+
+    # Function to journal a record and fold the journal into the CSV once it grows too big
+    def _write(self, record):
+        if self.deferred:
+            self.dirty = True
+            return
+        if self.pending is not None:
+            self.pending.append(record)
+            return
+        size = journal.append_record(self.file_path, record)
+        if size > journal.MAX_JOURNAL_SIZE:
+            self.save()
+
+    # Function to change some fields of a row; returns the previous values of those fields
+    def update(self, row, changes, position=None):
+        if position is None and not self.deferred:
+            position = self.position(row)
+        old_values = {field: row.get(field) for field in changes}
+        row.update(changes)
+        self._write({'op': 'update', 'row': position, 'values': dict(changes)})
+        self._notify('update', row, old_values)
+        return old_values
+
+    # Function to add a new row at the end of the dataset; returns the row as it is stored
+    def append(self, row):
+        rows = self.rows
+        row = self.make_row(row)
+        rows.append(row)
+        self._write({'op': 'insert', 'values': dict(row)})
+        self._notify('insert', row)
+        return row
+
+    # Function to delete a row from the dataset
+    def remove(self, row, position=None):
+        if position is None:
+            position = self.position(row)
+        del self.rows[position]
+        self._write({'op': 'delete', 'row': position})
+        self._notify('delete', row)
+
+    # Function to write the full dataset back to its CSV file and clear the journal
+    def save(self):
+        journal.compact(self.file_path, self.rows, self.fieldnames)
+        snapshot.save_snapshot(self.file_path, self.fieldnames, self.rows, self.requested_class)
+        self.dirty = False
+        if self.pending is not None:
+            # The CSV now holds every change, including the ones still waiting for the journal
+            self.pending = []
+        self.written()
+
+    # Function to keep changes in memory only, until end_batch() writes the file once
+    def begin_batch(self):
+        self.deferred = True
+
+    # Function to leave batch mode and write the whole file if anything changed
+    def end_batch(self):
+        self.deferred = False
+        if self.dirty:
+            self.save()
+
+    # Function to keep journal records in memory so that they can be written later, several at a time.
+    # The caller takes them with take_pending() and appends them with journal.append_records().
+    def hold_writes(self):
+        if self.pending is None:
+            self.pending = []
+
+    # Function to take the journal records that are waiting to be written
+    def take_pending(self):
+        records = self.pending or []
+        if self.pending is not None:
+            self.pending = []
+        return records
+
+# Function to apply many changes to several datasets and write each touched file only once at the end
+@contextmanager
+def batch_writes(*datasets):
+    for dataset in datasets:
+        dataset.begin_batch()
+    try:
+        yield
+    finally:
+        for dataset in datasets:
+            dataset.end_batch()
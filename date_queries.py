@@ -0,0 +1,114 @@
+from collections import Counter
+from datetime import date, timedelta
+import result_cache
+from room_availability import row_interval
+
+# Helper functions for date range questions about stays and bookings: who arrives or leaves
+# between two dates, and who is in-house on a given night.
+#
+# Arrivals and departures are range searches (find_range) on the sorted index of the check-in or
+# check-out field, which every dataset keeps current as rows are added, changed or removed, so a
+# search costs one binary search plus the rows it returns.
+#
+# A guest is in-house on night N when they arrive on or before N and leave after N. Only guests
+# who arrived within the longest stay before N can still be in the house, so the search reads the
+# arrivals of that window from the check-in index and keeps the ones that leave after N. The stay
+# lengths are counted in a histogram that follows the dataset, so the window shrinks again when
+# the longest stay is shortened or cancelled.
+
+# (start field, end field) of the stays in Guest.csv and of the bookings in Future booking.csv
+STAY_DATES = ('check_in_date', 'check_out_date')
+BOOKING_DATES = ('reserved_from', 'reserved_to')
+
+# Function to check a YYYY-MM-DD date and get the day after it; raises ValueError for a bad date
+def next_day(text):
+    return (date.fromisoformat(text) + timedelta(days=1)).isoformat()
+
+# Function to count the stays of each length (in nights) in a dataset
+def build_stay_lengths(dataset, fields):
+    lengths = Counter()
+    for row in dataset:
+        _count_stay(lengths, row, 1)
+    if hasattr(dataset, 'on_change'):
+        dataset.on_change(lambda op, row, old_values: update_stay_lengths(lengths, fields, op, row, old_values))
+    return lengths
+
+def _count_stay(lengths, row, step):
+    interval = row_interval(row)
+    if interval and interval[1] > interval[0]:
+        nights = interval[1] - interval[0]
+        lengths[nights] += step
+        if lengths[nights] <= 0:
+            del lengths[nights]
+
+# Function to apply a change reported by the dataset to the stay length histogram
+def update_stay_lengths(lengths, fields, op, row, old_values=None):
+    if op == 'update' and not set(fields) & set(old_values or ()):
+        return
+    if op in ('update', 'delete'):
+        _count_stay(lengths, {**dict(row.items()), **(old_values or {})}, -1)
+    if op in ('update', 'insert'):
+        _count_stay(lengths, row, 1)
+
+# Function to get the stay length histogram of a dataset, building it on first use
+def get_stay_lengths(dataset, fields):
+    if hasattr(dataset, 'derived'):
+        return dataset.derived(f'stay_lengths:{fields[0]}', lambda rows: build_stay_lengths(rows, fields))
+    return build_stay_lengths(dataset, fields)
+
+# Function to find the rows arriving from first to last (YYYY-MM-DD, both included), by arrival date
+def arrivals_between(dataset, fields, first, last):
+    next_day(first)
+    return result_cache.find_range(dataset, fields[0], first, next_day(last))
+
+# Function to find the rows leaving from first to last (YYYY-MM-DD, both included), by departure date
+def departures_between(dataset, fields, first, last):
+    next_day(first)
+    return result_cache.find_range(dataset, fields[1], first, next_day(last))
+
+# Function to find the rows that are in-house on a night (arrived on or before it, leaving after it), by arrival date
+def in_house(dataset, fields, night):
+    def compute():
+        lengths = get_stay_lengths(dataset, fields)
+        if not lengths:
+            return []
+        window_start = (date.fromisoformat(night) - timedelta(days=max(lengths) - 1)).isoformat()
+        return [row for row in dataset.find_range(fields[0], window_start, next_day(night))
+                if (row.get(fields[1]) or '') > night]
+    next_day(night)
+    return result_cache.cached(dataset, ('in_house', fields, night), compute, fields)
+
+# Function to print rows one per line with their dates, room and name
+def print_date_list(title, rows, fields):
+    print(f"\n{title}: {len(rows)}")
+    for row in rows:
+        name = f"{row.get('first_name', '')} {row.get('last_name', '')}"
+        print(f"{row.get(fields[0]) or '-':<12}{row.get(fields[1]) or '-':<12}{row.get('room_id') or '-':<7}{name}")
+
+# Function to ask for two dates and print the arrivals and departures from the first to the last
+def show_arrivals_and_departures(dataset, fields):
+    first = input("Enter the first date (YYYY-MM-DD): ").strip()
+    last = input("Enter the last date, included (YYYY-MM-DD): ").strip()
+    try:
+        if date.fromisoformat(last) < date.fromisoformat(first):
+            print("The last date must not be before the first date.")
+            return
+        arrivals = arrivals_between(dataset, fields, first, last)
+        departures = departures_between(dataset, fields, first, last)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    print(f"{'Arrival':<12}{'Departure':<12}{'Room':<7}Guest")
+    print_date_list(f"Arrivals from {first} to {last}", arrivals, fields)
+    print_date_list(f"Departures from {first} to {last}", departures, fields)
+
+# Function to ask for a night and print who is in-house on it
+def show_in_house(dataset, fields):
+    night = input("Enter the night (YYYY-MM-DD): ").strip()
+    try:
+        guests = in_house(dataset, fields, night)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    print(f"{'Arrival':<12}{'Departure':<12}{'Room':<7}Guest")
+    print_date_list(f"In-house on the night of {night}", guests, fields)
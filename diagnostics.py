@@ -0,0 +1,266 @@
+import builtins
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import result_cache
+
+# Built-in instrumentation of the menu operations, for finding out why "the system is slow".
+#
+# Every menu reads its choice through ask_menu_choice(). While instrumentation is enabled, each
+# choice starts an operation named after the menu and the choice ("guest 2", "bookings 4", ...)
+# that lasts until the next menu prompt; choices of the main menu only open a submenu (and load
+# its data the first time). For every operation the number of calls, a latency
+# histogram, the rows scanned and the bytes written are kept; time spent waiting for the user to
+# type is left out. CSV load times are recorded separately, and so are the hits and misses of the
+# result cache (see result_cache.py). The next operation can also be run under cProfile.
+# Everything is shown from the Diagnostics menu or saved as JSON.
+#
+# When instrumentation is disabled (the default) the hooks return after checking one flag.
+# Set HOTEL_DIAGNOSTICS=1 to enable it when the menus start.
+
+enabled = False
+profile_next = False
+
+# Upper bounds of the latency histogram buckets in milliseconds; the last bucket holds everything slower
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000]
+
+stats = {}                          # operation -> counters, see _new_stats()
+loads = []                          # one entry per dataset load
+totals = {'rows_scanned': 0, 'bytes_written': 0}
+bytes_by_file = {}
+_lock = threading.Lock()
+_local = threading.local()          # the operation running in this thread (the server runs one per terminal)
+_original_input = None
+
+def _new_stats():
+    return {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'histogram': [0] * (len(BUCKETS_MS) + 1),
+            'rows_scanned': 0, 'bytes_written': 0}
+
+# Function to switch instrumentation on
+def enable():
+    global enabled, _original_input
+    if enabled:
+        return
+    _original_input = builtins.input
+    builtins.input = _timed_input
+    enabled = True
+
+# Function to switch instrumentation off; the statistics collected so far are kept
+def disable():
+    global enabled
+    if not enabled:
+        return
+    finish_operation()
+    if builtins.input is _timed_input:
+        builtins.input = _original_input
+    enabled = False
+
+# Function to enable instrumentation when HOTEL_DIAGNOSTICS is set
+def enable_from_environment():
+    if os.environ.get('HOTEL_DIAGNOSTICS', '') not in ('', '0'):
+        enable()
+
+# Function to clear all statistics
+def reset():
+    with _lock:
+        stats.clear()
+        loads.clear()
+        bytes_by_file.clear()
+        totals.update(rows_scanned=0, bytes_written=0)
+    result_cache.reset_counters()
+
+# input() while instrumentation is enabled: the time the user takes to answer is not counted
+def _timed_input(prompt=''):
+    start = time.perf_counter()
+    try:
+        return _original_input(prompt)
+    finally:
+        add_wait(time.perf_counter() - start)
+
+# Function to leave time spent waiting for the user out of the running operation
+def add_wait(seconds):
+    if enabled and getattr(_local, 'operation', None) is not None:
+        _local.waiting += seconds
+
+# Function used by the menus to read a choice; it ends the previous operation and starts the chosen one
+def ask_menu_choice(menu, prompt):
+    if not enabled:
+        return input(prompt)
+    finish_operation()
+    choice = input(prompt)
+    start_operation(f"{menu} {choice.strip()}", profile=menu != 'main')
+    return choice
+
+# Function to start timing an operation in this thread; with profile=True it is the one
+# profiled when a profile was asked for
+def start_operation(name, profile=True):
+    global profile_next
+    if not enabled:
+        return
+    finish_operation()
+    _local.operation = name
+    _local.waiting = 0.0
+    _local.rows = 0
+    _local.bytes = 0
+    _local.profiler = None
+    if profile and profile_next:
+        profile_next = False
+        _local.profiler = cProfile.Profile()
+        _local.profiler.enable()
+    _local.started = time.perf_counter()
+
+# Function to stop timing the operation running in this thread and add it to the statistics
+def finish_operation():
+    name = getattr(_local, 'operation', None)
+    if name is None:
+        return
+    elapsed_ms = max(time.perf_counter() - _local.started - _local.waiting, 0.0) * 1000
+    _local.operation = None
+    if _local.profiler is not None:
+        _local.profiler.disable()
+        print_profile(name, _local.profiler)
+        _local.profiler = None
+    bucket = next((position for position, bound in enumerate(BUCKETS_MS) if elapsed_ms <= bound), len(BUCKETS_MS))
+    with _lock:
+        entry = stats.setdefault(name, _new_stats())
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['histogram'][bucket] += 1
+        entry['rows_scanned'] += _local.rows
+        entry['bytes_written'] += _local.bytes
+        totals['rows_scanned'] += _local.rows
+
+# Function to count rows read by a scan or a search; they are added to the totals when the
+# operation finishes, so that the searches of concurrent terminals do not wait on the lock
+def add_rows(count):
+    if getattr(_local, 'operation', None) is not None:
+        _local.rows += count
+        return
+    with _lock:
+        totals['rows_scanned'] += count
+
+# Function to count bytes written to a file
+def add_bytes(file_path, count):
+    with _lock:
+        totals['bytes_written'] += count
+        bytes_by_file[file_path] = bytes_by_file.get(file_path, 0) + count
+    if getattr(_local, 'operation', None) is not None:
+        _local.bytes += count
+
+# Function to record how long a dataset took to load and where it was read from ('csv', 'snapshot', 'sqlite' or
+# 'missing' for an optional file that does not exist yet)
+def record_load(file_path, source, seconds, rows):
+    with _lock:
+        loads.append({'file': file_path, 'source': source, 'ms': round(seconds * 1000, 3), 'rows': rows})
+
+# Function to estimate a latency percentile (0..1) from a histogram: the upper bound of the bucket
+# it falls in, or the slowest call if that is lower
+def percentile_ms(entry, share):
+    wanted = share * entry['calls']
+    seen = 0
+    for position, count in enumerate(entry['histogram']):
+        seen += count
+        if count and seen >= wanted:
+            return min(BUCKETS_MS[position], entry['max_ms']) if position < len(BUCKETS_MS) else entry['max_ms']
+    return 0.0
+
+# Function to collect all statistics as plain data (for JSON)
+def snapshot_stats():
+    with _lock:
+        operations = {}
+        for name, entry in sorted(stats.items()):
+            operations[name] = dict(entry, mean_ms=entry['total_ms'] / entry['calls'] if entry['calls'] else 0.0,
+                                    p50_ms=percentile_ms(entry, 0.5), p95_ms=percentile_ms(entry, 0.95),
+                                    p99_ms=percentile_ms(entry, 0.99))
+        return {'enabled': enabled, 'buckets_ms': BUCKETS_MS, 'operations': operations, 'loads': list(loads),
+                'totals': dict(totals), 'bytes_by_file': dict(bytes_by_file), 'result_cache': result_cache.cache_stats()}
+
+# Function to save the statistics to a JSON file
+def dump_stats(file_path):
+    with open(file_path, 'w') as file:
+        json.dump(snapshot_stats(), file, indent=2)
+
+# Function to print the statistics as tables
+def print_stats():
+    data = snapshot_stats()
+    cache = data['result_cache']
+    if not data['operations'] and not data['loads']:
+        print("No statistics yet. Enable instrumentation and use the menus first.")
+        print_cache_stats(cache)
+        return
+    print(f"\n{'Operation':<16}{'Calls':>7}{'Mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Max ms':>10}"
+          f"{'Rows':>11}{'Bytes':>11}")
+    for name, entry in data['operations'].items():
+        print(f"{name:<16}{entry['calls']:>7}{entry['mean_ms']:>10.2f}{entry['p50_ms']:>9.2f}{entry['p95_ms']:>9.2f}"
+              f"{entry['p99_ms']:>9.2f}{entry['max_ms']:>10.2f}{entry['rows_scanned']:>11}{entry['bytes_written']:>11}")
+    if data['loads']:
+        print(f"\n{'Dataset load':<30}{'Source':>10}{'Rows':>10}{'ms':>10}")
+        for load in data['loads']:
+            print(f"{os.path.basename(load['file']):<30}{load['source']:>10}{load['rows']:>10}{load['ms']:>10.1f}")
+    print(f"\nRows scanned: {data['totals']['rows_scanned']}, bytes written: {data['totals']['bytes_written']}")
+    print_cache_stats(cache)
+
+# Function to print the counters of the result cache
+def print_cache_stats(cache):
+    print(f"Result cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%} hit rate), "
+          f"{cache['invalidations']} invalidated, {cache['evictions']} evicted, {cache['entries']} of {cache['max_entries']} entries")
+
+# Function to print the slowest functions of a profiled operation
+def print_profile(name, profiler, limit=20):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    print(f"\nProfile of '{name}':")
+    print(stream.getvalue())
+
+# Main function of the Diagnostics menu
+def diagnostics_operations():
+    global profile_next
+    while True:
+        print("\nDiagnostics:")
+        print(f"1. {'Disable' if enabled else 'Enable'} instrumentation (currently {'on' if enabled else 'off'})")
+        print("2. Show operation statistics")
+        print("3. Profile the next operation")
+        print("4. Save statistics as JSON")
+        print("5. Reset statistics")
+        print("6. Go back")
+
+        choice = input("Choose an operation: ").strip()
+
+        if choice == "1":
+            if enabled:
+                disable()
+                print("Instrumentation disabled.")
+            else:
+                enable()
+                print("Instrumentation enabled.")
+
+        elif choice == "2":
+            print_stats()
+
+        elif choice == "3":
+            enable()
+            profile_next = True
+            print("The next operation chosen in a submenu will be profiled; the report is shown when it finishes.")
+
+        elif choice == "4":
+            file_path = input("Enter the output file name (default: diagnostics.json): ").strip() or 'diagnostics.json'
+            try:
+                dump_stats(file_path)
+                print(f"Statistics saved to '{file_path}'.")
+            except OSError as e:
+                print(f"Error: Could not write '{file_path}': {e.strerror}.")
+
+        elif choice == "5":
+            reset()
+            print("Statistics cleared.")
+
+        elif choice == "6":
+            break
+
+        else:
+            print("Invalid choice. Please try again.")
@@ -0,0 +1,79 @@
+from bisect import bisect_left, insort
+
+# Helper functions for the in-memory field indexes of the CSV datasets.
+#
+# A field index maps the case-folded value of one field to the rows that have it, and keeps the
+# distinct values sorted for prefix and range searches. Datasets build one per searched field on
+# first use and keep it current through their change listeners (see Dataset.field_index).
+
+# Function to normalise a value so that lookups are case-insensitive
+def field_key(value):
+    return ('' if value is None else str(value)).strip().casefold()
+
+# Function to build the index of one field in one pass over the rows
+def build_field_index(rows, field):
+    index = {'field': field, 'buckets': {}, 'keys': []}
+    for row in rows:
+        index['buckets'].setdefault(field_key(row.get(field)), []).append(row)
+    # Sorting once at the end is much cheaper than keeping the list sorted row by row
+    index['keys'] = sorted(index['buckets'])
+    return index
+
+# Function to add a single row to an existing index
+def add_row(index, row, value):
+    key = field_key(value)
+    if key not in index['buckets']:
+        insort(index['keys'], key)
+    index['buckets'].setdefault(key, []).append(row)
+
+# Function to remove a single row from the index, using the value it was indexed under
+def remove_row(index, row, value):
+    key = field_key(value)
+    bucket = index['buckets'].get(key)
+    if bucket is None:
+        return
+    bucket[:] = [r for r in bucket if r is not row]
+    if not bucket:
+        del index['buckets'][key]
+        position = bisect_left(index['keys'], key)
+        if position < len(index['keys']) and index['keys'][position] == key:
+            del index['keys'][position]
+
+# Function to apply a change reported by the dataset to the index
+def update_field_index(index, op, row, old_values=None):
+    field = index['field']
+    if op == 'update':
+        if not old_values or field not in old_values or field_key(old_values[field]) == field_key(row.get(field)):
+            return
+        remove_row(index, row, old_values[field])
+        add_row(index, row, row.get(field))
+    elif op == 'insert':
+        add_row(index, row, row.get(field))
+    elif op == 'delete':
+        remove_row(index, row, row.get(field))
+
+# Function to find the rows whose value equals the given one
+def find_equal(index, value):
+    return list(index['buckets'].get(field_key(value), []))
+
+# Function to find the rows whose value is in [start, end), in value order
+def find_between(index, start, end):
+    keys = index['keys']
+    first = bisect_left(keys, start)
+    last = bisect_left(keys, end, first)
+    results = []
+    for key in keys[first:last]:
+        results.extend(index['buckets'][key])
+    return results
+
+# Function to find the rows whose value starts with the given text, in value order
+def find_prefix(index, prefix):
+    prefix = field_key(prefix)
+    return find_between(index, prefix, prefix + '\U0010ffff')
+
+# Function to keep only the rows whose other fields equal the given values, e.g. last_name='Smith'
+def filter_equal(rows, conditions):
+    if not conditions:
+        return rows
+    wanted = [(field, field_key(value)) for field, value in conditions.items()]
+    return [row for row in rows if all(field_key(row.get(field)) == key for field, key in wanted)]
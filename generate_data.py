@@ -0,0 +1,161 @@
+import csv
+import os
+import random
+import shutil
+import sys
+from datetime import date, timedelta
+
+from records import GuestRecord, BookingRecord, CompanyRecord, AppointmentRecord
+
+# Generator of realistic synthetic datasets for load testing and benchmarks.
+#
+# It writes Guest.csv, Future booking.csv and Companies.csv with the same columns as the shipped
+# files, copies Hotel_Services.csv and writes an empty Appointments.csv, so the system can be run
+# on the output directory as is.
+# Rooms keep the ST001/TW050 pattern and the room type mix of the shipped hotel, and the number of
+# rooms grows with the data. Stays and bookings never overlap in a room; their lengths follow the
+# shipped data, past stays run back in time from today and bookings start tomorrow.
+#
+# Usage: python generate_data.py output_dir [guests] [bookings] [companies] [seed]
+
+# Room id prefix, room type and number of rooms per type in the shipped hotel
+ROOM_TYPES = [('ST', 'Standard', 90), ('TW', 'Twin', 55), ('FA', 'Family Deluxe', 12),
+              ('DE', 'Deluxe', 10), ('SU', 'Suite', 6), ('AC', 'Accessible', 3)]
+SHIPPED_GUESTS = 450
+SHIPPED_BOOKINGS = 114
+
+# Stay lengths in nights with their frequency in Guest.csv and Future booking.csv
+STAY_NIGHTS = {1: 3, 2: 38, 3: 22, 4: 49, 5: 48, 6: 35, 7: 41, 8: 37, 9: 35, 10: 32, 11: 37, 12: 19, 13: 23, 14: 29}
+BOOKING_NIGHTS = {2: 27, 3: 23, 4: 9, 5: 21, 6: 18, 7: 16}
+
+FIRST_NAMES = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank', 'Grace', 'Helen', 'Jane', 'John',
+               'Ivan', 'Julia', 'Karl', 'Laura', 'Marco', 'Nina', 'Oscar', 'Paula', 'Quentin', 'Rosa',
+               'Sven', 'Tara', 'Ugo', 'Vera', 'Walter', 'Xenia', 'Yusuf', 'Zoe', 'Anna', 'Lars',
+               'Sofia', 'Pierre', 'Hanna', 'Mateo', 'Ingrid', 'Piotr', 'Lucia', 'Emil', 'Clara', 'Jonas']
+LAST_NAMES = ['Brown', 'Jones', 'Miller', 'Smith', 'Taylor', 'Wilson', 'Davis', 'Garcia', 'Clark', 'Lewis',
+              'Andersen', 'Bauer', 'Costa', 'Dubois', 'Eriksson', 'Fischer', 'Greco', 'Hansen', 'Jansen', 'Kowalski',
+              'Larsen', 'Moreau', 'Novak', 'Olsen', 'Petit', 'Rossi', 'Schmidt', 'Silva', 'Weber', 'Nowak',
+              'Romano', 'Lefebvre', 'Berg', 'Horvat', 'Lindqvist', 'Martin', 'Meyer', 'Nielsen', 'Ricci', 'Vidal']
+COUNTRY_CODES = ['+31', '+33', '+34', '+39', '+44', '+46', '+47', '+48', '+49']
+
+COMPANY_TYPES = {'Local travel agents': 40, 'Direct Companies': 31, 'Online travel agency': 29}
+COOPERATION_STATUSES = {'Active': 40, 'Paused': 32, 'Cancelled': 27, 'Inactive': 1}
+# Lowest and highest price of each room type in Companies.csv
+PRICE_RANGES = {'Standard Price': (41000, 46000), 'Twin Price': (41000, 46000), 'Accessible Price': (41000, 46000),
+                'Deluxe Price': (58000, 64000), 'Family Deluxe Price': (65000, 72000), 'Suite Price': (74000, 82000)}
+
+# Function to pick one key of a {value: weight} dict
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+# Function to list the rooms of a hotel sized for the given numbers of stays and bookings: [(room_id, room_type)]
+def make_rooms(guests=SHIPPED_GUESTS, bookings=SHIPPED_BOOKINGS):
+    scale = max(1, -(-guests // SHIPPED_GUESTS), -(-bookings // SHIPPED_BOOKINGS))
+    return [(f"{prefix}{number:03d}", room_type)
+            for prefix, room_type, count in ROOM_TYPES for number in range(1, count * scale + 1)]
+
+# Function to make a guest's name, e-mail address and phone number
+def _person(rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    phone = f"{rng.choice(COUNTRY_CODES)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    return first, last, f"{first.lower()}.{last.lower()}@gmail.com", phone
+
+# Function to lay out back-to-back stays per room; returns [(room_id, room_type, start, end)].
+# Each room is filled from `first_day` onwards (or backwards when going back) with small gaps.
+def _schedule(rng, rooms, count, first_day, nights, backwards=False):
+    stays = []
+    cursor = {room_id: first_day for room_id, _ in rooms}
+    while len(stays) < count:
+        for room_id, room_type in rooms:
+            if len(stays) == count:
+                break
+            gap = timedelta(days=rng.choice([0, 0, 1, 2, 3]))
+            length = timedelta(days=_weighted(rng, nights))
+            if backwards:
+                end = cursor[room_id] - gap
+                start = end - length
+                cursor[room_id] = start
+            else:
+                start = cursor[room_id] + gap
+                end = start + length
+                cursor[room_id] = end
+            stays.append((room_id, room_type, start, end))
+    return stays
+
+# Function to generate past and current stays with the columns of Guest.csv
+def generate_guests(count, rng, rooms=None, today=None):
+    today = today or date.today()
+    rooms = rooms or make_rooms(guests=count)
+    guests = []
+    guest_ids = set()
+    for room_id, room_type, start, end in sorted(_schedule(rng, rooms, count, today, STAY_NIGHTS, True),
+                                                 key=lambda stay: (stay[0], stay[2])):
+        guest_id = str(rng.randrange(10 ** 15, 10 ** 16))
+        while guest_id in guest_ids:
+            guest_id = str(rng.randrange(10 ** 15, 10 ** 16))
+        guest_ids.add(guest_id)
+        first, last, email, phone = _person(rng)
+        guests.append({'guest_id': guest_id, 'first_name': first, 'last_name': last, 'email': email,
+                       'phone_number': phone, 'check_in_date': start.isoformat(), 'check_out_date': end.isoformat(),
+                       'room_id': room_id, 'room_type': room_type})
+    return guests
+
+# Function to generate future reservations with the columns of Future booking.csv
+def generate_bookings(count, rng, rooms=None, today=None):
+    today = today or date.today()
+    rooms = rooms or make_rooms(bookings=count)
+    bookings = []
+    for room_id, _, start, end in _schedule(rng, rooms, count, today + timedelta(days=1), BOOKING_NIGHTS):
+        first, last, _, phone = _person(rng)
+        bookings.append({'room_id': room_id, 'first_name': first, 'last_name': last, 'phone_number': phone,
+                         'reserved_from': start.isoformat(), 'reserved_to': end.isoformat()})
+    rng.shuffle(bookings)
+    return bookings
+
+# Function to generate corporate clients with the columns of Companies.csv
+def generate_companies(count, rng):
+    companies = []
+    names = set()
+    while len(companies) < count:
+        first, second, third = rng.sample(LAST_NAMES, 3)
+        name = rng.choice([f"{first}-{second}", f"{first}, {second} and {third}", f"{first} {second} Travel",
+                           f"{first} Group"])
+        if name in names:
+            # There are only so many name combinations; number the repeats
+            name = f"{name} {len(companies)}"
+        names.add(name)
+        company = {'Company Name': name, 'Company Type': _weighted(rng, COMPANY_TYPES),
+                   'Nights Occupied Last Year': str(rng.randint(59, 694)),
+                   'Cooperation Status': _weighted(rng, COOPERATION_STATUSES)}
+        for column, (low, high) in PRICE_RANGES.items():
+            company[column] = str(rng.randrange(low, high + 1, 1000))
+        companies.append(company)
+    return companies
+
+# Function to write rows to a CSV file with the given columns
+def write_csv(file_path, rows, fieldnames):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Function to write a complete set of datasets into a directory
+def generate_dataset(directory, guests=SHIPPED_GUESTS, bookings=SHIPPED_BOOKINGS, companies=100, seed=0):
+    rng = random.Random(seed)
+    rooms = make_rooms(guests, bookings)
+    os.makedirs(directory, exist_ok=True)
+    write_csv(os.path.join(directory, 'Guest.csv'), generate_guests(guests, rng, rooms), GuestRecord.FIELDS)
+    write_csv(os.path.join(directory, 'Future booking.csv'), generate_bookings(bookings, rng, rooms), BookingRecord.FIELDS)
+    write_csv(os.path.join(directory, 'Companies.csv'), generate_companies(companies, rng), CompanyRecord.FIELDS)
+    write_csv(os.path.join(directory, 'Appointments.csv'), [], AppointmentRecord.FIELDS)
+    services_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hotel_Services.csv')
+    if os.path.abspath(directory) != os.path.dirname(services_path):
+        shutil.copy(services_path, directory)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python generate_data.py output_dir [guests] [bookings] [companies] [seed]")
+    else:
+        counts = [int(value) for value in sys.argv[2:6]]
+        generate_dataset(sys.argv[1], *counts)
+        print(f"Datasets written to '{sys.argv[1]}'.")
@@ -0,0 +1,165 @@
+import re
+from collections import Counter
+from company_index import trigrams
+from room_availability import row_interval
+
+# Helper functions for recognising returning guests among the future bookings.
+#
+# A person is identified by their normalised first name, last name and phone number (digits only).
+# The past stays in Guest.csv are grouped by that identity in a hash table, and every booking is
+# looked up in it once, so the join takes one pass over each file. When the exact identity is not
+# found, a booking can still be matched to a past guest with the same phone number and a similar
+# name (a typo or a shortened first name).
+#
+# The index follows both datasets through their change listeners: adding, changing or cancelling a
+# booking, or a change to a stay, only re-matches the bookings with the phone number involved.
+
+# Minimum name similarity (shared trigrams, 0..1) for a booking to match a past guest with the same phone number
+FUZZY_THRESHOLD = 0.5
+
+# Fields that make up a guest's identity
+IDENTITY_FIELDS = {'first_name', 'last_name', 'phone_number'}
+
+_NON_DIGITS = re.compile(r'\D')
+
+# Function to keep only the digits of a phone number, so that '+48-873-3866' and '48 873 3866' match
+def phone_key(value):
+    return _NON_DIGITS.sub('', value or '')
+
+# Function to get the identity of a stay or booking: (first name, last name, phone digits)
+def identity_key(row):
+    return (row.get('first_name', '').strip().casefold(), row.get('last_name', '').strip().casefold(),
+            phone_key(row.get('phone_number')))
+
+# Function to tell how alike two (first name, last name) pairs are, from 0 to 1
+def name_similarity(key, other):
+    grams, other_grams = trigrams(' '.join(key[:2])), trigrams(' '.join(other[:2]))
+    return len(grams & other_grams) / max(len(grams), len(other_grams), 1)
+
+# Function to build the identity index: past stays by identity, and the returning guests among the bookings
+def build_identity_index(guest_data, booking_data, fuzzy=True):
+    index = {'stays': {}, 'keys_by_phone': {}, 'bookings_by_phone': {}, 'matches': {}, 'fuzzy': fuzzy}
+    # Build side: the stay history
+    for guest in guest_data:
+        _add_stay(index, guest, identity_key(guest))
+    # Probe side: one lookup per booking
+    for booking in booking_data:
+        index['bookings_by_phone'].setdefault(phone_key(booking.get('phone_number')), []).append(booking)
+        _match_booking(index, booking)
+    if hasattr(guest_data, 'on_change'):
+        guest_data.on_change(lambda op, guest, old_values: update_stays(index, op, guest, old_values))
+    if hasattr(booking_data, 'on_change'):
+        booking_data.on_change(lambda op, booking, old_values: update_bookings(index, op, booking, old_values))
+    return index
+
+# Function to get the identity index of the datasets, building it on first use
+def get_identity_index(guest_data, booking_data):
+    if hasattr(booking_data, 'derived'):
+        return booking_data.derived('guest_identity', lambda bookings: build_identity_index(guest_data, bookings))
+    return build_identity_index(guest_data, booking_data)
+
+def _add_stay(index, guest, key):
+    index['stays'].setdefault(key, []).append(guest)
+    index['keys_by_phone'].setdefault(key[2], set()).add(key)
+
+def _remove_stay(index, guest, key):
+    stays = index['stays'].get(key)
+    if stays is None:
+        return
+    stays[:] = [stay for stay in stays if stay is not guest]
+    if not stays:
+        del index['stays'][key]
+        keys = index['keys_by_phone'][key[2]]
+        keys.discard(key)
+        if not keys:
+            del index['keys_by_phone'][key[2]]
+
+# Function to (re)match one booking against the stay history
+def _match_booking(index, booking):
+    key = identity_key(booking)
+    if key in index['stays']:
+        index['matches'][id(booking)] = (booking, key, True)
+        return
+    if index['fuzzy'] and key[2]:
+        candidates = [(name_similarity(key, other), other) for other in index['keys_by_phone'].get(key[2], ())]
+        if candidates:
+            similarity, other = max(candidates)
+            if similarity >= FUZZY_THRESHOLD:
+                index['matches'][id(booking)] = (booking, other, False)
+                return
+    index['matches'].pop(id(booking), None)
+
+# Function to re-match the bookings made with a phone number after the stays of that number changed
+def _rematch_phone(index, phone):
+    for booking in index['bookings_by_phone'].get(phone, []):
+        _match_booking(index, booking)
+
+# Function to apply a change of Guest.csv to the index
+def update_stays(index, op, guest, old_values=None):
+    old_key = identity_key({**dict(guest.items()), **(old_values or {})})
+    new_key = identity_key(guest)
+    if op == 'update' and old_key == new_key:
+        return
+    if op in ('update', 'delete'):
+        _remove_stay(index, guest, old_key)
+    if op in ('update', 'insert'):
+        _add_stay(index, guest, new_key)
+    for phone in {old_key[2], new_key[2]}:
+        _rematch_phone(index, phone)
+
+# Function to apply a new, changed or cancelled booking to the index
+def update_bookings(index, op, booking, old_values=None):
+    if op == 'update' and not IDENTITY_FIELDS & set(old_values or ()):
+        # New dates or another room do not change who the guest is
+        return
+    old_phone = phone_key((old_values or {}).get('phone_number', booking.get('phone_number')))
+    if op in ('update', 'delete'):
+        bookings = index['bookings_by_phone'].get(old_phone, [])
+        bookings[:] = [b for b in bookings if b is not booking]
+        index['matches'].pop(id(booking), None)
+    if op in ('update', 'insert'):
+        index['bookings_by_phone'].setdefault(phone_key(booking.get('phone_number')), []).append(booking)
+        _match_booking(index, booking)
+
+# Function to get the returning guest profile of a booking; returns None for a first-time guest
+def returning_profile(index, booking):
+    match = index['matches'].get(id(booking))
+    if match is None or match[0] is not booking:
+        return None
+    stays = index['stays'][match[1]]
+    last_stay = max(stays, key=lambda stay: stay.get('check_in_date') or '')
+    nights = 0
+    for stay in stays:
+        interval = row_interval(stay)
+        if interval:
+            nights += interval[1] - interval[0]
+    room_types = Counter(stay.get('room_type') for stay in stays if stay.get('room_type'))
+    return {
+        'exact': match[2],
+        'guest_id': last_stay.get('guest_id'),
+        'guest_ids': sorted({stay.get('guest_id') for stay in stays}),
+        'stays': len(stays),
+        'nights': nights,
+        'room_type': room_types.most_common(1)[0][0] if room_types else '',
+        'last_stay': last_stay,
+    }
+
+# Function to list every booking of a returning guest with its profile, by arrival date
+def returning_guests_report(index):
+    report = []
+    for booking, _, _ in index['matches'].values():
+        profile = returning_profile(index, booking)
+        last_stay = profile['last_stay']
+        report.append({
+            'first_name': booking.get('first_name'), 'last_name': booking.get('last_name'),
+            'reserved_from': booking.get('reserved_from'), 'reserved_to': booking.get('reserved_to'),
+            'room_id': booking.get('room_id'), 'guest_id': profile['guest_id'], 'past_stays': profile['stays'],
+            'past_nights': profile['nights'], 'usual_room_type': profile['room_type'],
+            'last_stay': f"{last_stay.get('check_in_date')} to {last_stay.get('check_out_date')}",
+            'match': 'exact' if profile['exact'] else 'phone',
+        })
+    report.sort(key=lambda row: (row['reserved_from'] or '', row['last_name'] or '', row['first_name'] or ''))
+    return report
+
+REPORT_FIELDS = ['first_name', 'last_name', 'reserved_from', 'reserved_to', 'room_id', 'guest_id', 'past_stays',
+                 'past_nights', 'usual_room_type', 'last_stay', 'match']
@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+import diagnostics
+
+# Helper functions for crash-safe persistence of the CSV datasets.
+#
+# Every change is appended to a small journal file next to the CSV ("Guest.csv.journal")
+# instead of rewriting the whole CSV. When a dataset is loaded, the journal is replayed over
+# the CSV. Once the journal grows past MAX_JOURNAL_SIZE it is folded back into the CSV,
+# which is replaced atomically.
+
+JOURNAL_SUFFIX = '.journal'
+MAX_JOURNAL_SIZE = 1024 * 1024  # bytes
+
+# Function to get the journal file that belongs to a CSV file
+def journal_path(file_path):
+    return file_path + JOURNAL_SUFFIX
+
+# Function to describe the CSV file a journal was started against
+def _csv_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return {'size': 0, 'mtime_ns': 0}
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+# Function to read a CSV file into its header and a list of rows.
+# Rows are built with record_class (see records.py) when the header matches it, otherwise they are dicts.
+# opener can be gzip.open for compressed files.
+def read_csv(file_path, record_class=None, opener=open):
+    with opener(file_path, 'rt', newline='') as file:
+        reader = csv.reader(file)
+        fieldnames = next(reader, [])
+        if record_class is not None and tuple(fieldnames) == tuple(record_class.FIELDS):
+            rows = [record_class(values) for values in reader if values]
+        else:
+            rows = [dict(zip(fieldnames, values)) for values in reader if values]
+        return fieldnames, rows
+
+# Function to write a whole CSV file atomically (temp file + rename)
+def save_to_csv(file_path, data, fieldnames):
+    """Save the data to the CSV file without ever leaving a half-written file behind."""
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(data)
+        file.flush()
+        os.fsync(file.fileno())
+        if diagnostics.enabled:
+            diagnostics.add_bytes(file_path, file.tell())
+    os.replace(temp_path, file_path)
+
+# Function to append one change record to the journal and flush it to disk
+def append_record(file_path, record):
+    return append_records(file_path, [record])
+
+# Function to make a journal safe to append to; only the process writing to it may do this, as a
+# reader could otherwise cut off a record that is still being written
+def repair_journal(file_path):
+    path = journal_path(file_path)
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with file:
+        try:
+            header = json.loads(file.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('op') != 'header' or header.get('csv') != _csv_signature(file_path):
+            # The CSV was rewritten after this journal was started, so it already contains these changes
+            good_size = None
+        else:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(size - 1)
+            if file.read(1) == b'\n':
+                return
+            # A torn last record means a process died while appending; that change never completed
+            file.seek(0)
+            data = file.read()
+            good_size = data.rfind(b'\n') + 1
+    if good_size is None:
+        os.remove(path)
+    else:
+        # New records go after the last complete one
+        os.truncate(path, good_size)
+
+# Function to append several change records with a single flush to disk; returns the journal size
+def append_records(file_path, records):
+    path = journal_path(file_path)
+    repair_journal(file_path)
+    with open(path, 'a') as file:
+        start = file.tell()
+        if start == 0:
+            # The header ties the journal to the exact CSV file it applies to
+            file.write(json.dumps({'op': 'header', 'csv': _csv_signature(file_path)}) + '\n')
+        file.write(''.join(json.dumps(record) + '\n' for record in records))
+        file.flush()
+        os.fsync(file.fileno())
+        if diagnostics.enabled:
+            diagnostics.add_bytes(path, file.tell() - start)
+        return file.tell()
+
+# Function to apply a single journal record to the list of rows
+def apply_record(rows, record, from_dict=dict):
+    op = record['op']
+    if op == 'update':
+        rows[record['row']].update(record['values'])
+    elif op == 'insert':
+        rows.append(from_dict(record['values']))
+    elif op == 'delete':
+        del rows[record['row']]
+
+# Function to replay the journal of a CSV file over its freshly loaded rows. The journal is only
+# read: a torn last record or a journal left from before the CSV was rewritten is ignored here and
+# repaired by the process that writes to it next (see repair_journal).
+def replay(file_path, rows, from_dict=dict):
+    records = read_records(file_path)
+    for record in records:
+        apply_record(rows, record, from_dict)
+    return len(records)
+
+# Function to read the change records of the journal without changing any file; gives no records
+# when there is no journal or it was started against an older version of the CSV, and stops at a
+# torn last record (the process died while appending it, or is appending it right now)
+def read_records(file_path):
+    path = journal_path(file_path)
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'rb') as file:
+        for line_number, line in enumerate(file):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("incomplete record")
+                record = json.loads(line)
+            except ValueError:
+                break
+            if line_number == 0:
+                if record.get('op') != 'header' or record.get('csv') != _csv_signature(file_path):
+                    return []
+                continue
+            records.append(record)
+    return records
+
+# Function to fold the journal back into the CSV file and start a new, empty journal
+def compact(file_path, rows, fieldnames):
+    save_to_csv(file_path, rows, fieldnames)
+    path = journal_path(file_path)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,351 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import csv
+import hashlib
+import io
+import mmap
+import os
+import struct
+import zlib
+import journal
+import result_cache
+from dataset import Dataset
+from field_index import field_key, filter_equal
+
+# Read-only access to a CSV file for lookup-only terminals (such as the concierge desk).
+#
+# Instead of parsing every row into memory, the CSV is memory-mapped and searched through an
+# offset index kept beside it ("Guest.csv.offsets"): the byte offset where every row starts, and
+# the hashes of the key field (guest_id) sorted together with their row numbers. A lookup is a
+# binary search in the mapped index followed by decoding the few rows it finds, so opening the
+# file and looking up a guest cost next to nothing however large the file is, and the rows are
+# never held in memory.
+#
+# The index is checked against the CSV before every lookup. Rows appended to the CSV are added to
+# it by reading only the new bytes; any other change to the file builds it again. Changes waiting
+# in the journal (see journal.py) are laid over the mapped rows, so changes made on other
+# terminals show up on the next lookup.
+#
+# Searches on other fields and anything that walks all rows read the file the usual way on first
+# use (see Dataset). Changes are refused with a ValueError.
+
+INDEX_SUFFIX = '.offsets'
+INDEX_MAGIC = b'HOTELIDX'
+INDEX_VERSION = 1
+CHECK_BYTES = 4096      # bytes at the start and end of the indexed part that must not have changed
+
+# magic, version, crc of the key field name, inode, mtime, indexed size, rows, crc of the first and last CHECK_BYTES
+_HEADER = struct.Struct('=8sIIQQQQII')
+
+# Function to get the offset index file that belongs to a CSV file
+def index_path(file_path):
+    return file_path + INDEX_SUFFIX
+
+# Function to hash a key value into 8 bytes that are the same in every process (hash() is not)
+def key_hash(value):
+    return int.from_bytes(hashlib.blake2b(field_key(value).encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Function to split one row of CSV bytes into its values
+def decode_values(line):
+    return next(csv.reader(io.StringIO(line.decode('utf-8'), newline='')), [])
+
+# Function to get the value of one column from a row of CSV bytes, splitting it by hand when it has no quotes
+def _column(line, column):
+    values = line.rstrip(b'\r\n').split(b',') if b'"' not in line else [value.encode('utf-8') for value in decode_values(line)]
+    return values[column].decode('utf-8') if column < len(values) else ''
+
+# Function to find the complete rows from a byte position on; returns their offsets, the hashes
+# of their key column and the position after the last complete row
+def scan_rows(data, position, column):
+    offsets, hashes = array('Q'), array('Q')
+    size = len(data)
+    while position < size:
+        end = data.find(b'\n', position)
+        # A quoted value can hold line breaks; the row goes on until its quotes are balanced
+        while end != -1 and data[position:end].count(b'"') % 2:
+            end = data.find(b'\n', end + 1)
+        if end == -1:
+            # The last row is still being written
+            break
+        line = data[position:end + 1]
+        if line.strip():
+            offsets.append(position)
+            hashes.append(key_hash(_column(line, column)))
+        position = end + 1
+    return offsets, hashes, position
+
+# Function to sort the key hashes together with their row numbers; returns the sorted hashes and row numbers
+def sort_keys(hashes, first_row=0):
+    keys = sorted(value << 32 | row for row, value in enumerate(hashes, start=first_row))
+    return array('Q', (key >> 32 for key in keys)), array('Q', (key & 0xFFFFFFFF for key in keys))
+
+# Function to add a few sorted keys to the sorted keys of the index, copying the runs in between whole
+def merge_keys(hashes, numbers, new_hashes, new_numbers):
+    merged_hashes, merged_numbers = array('Q'), array('Q')
+    copied = 0
+    for value, row in zip(new_hashes, new_numbers):
+        # New rows come after the old rows with the same hash
+        position = bisect_right(hashes, value, copied)
+        merged_hashes.frombytes(hashes[copied:position].tobytes())
+        merged_numbers.frombytes(numbers[copied:position].tobytes())
+        merged_hashes.append(value)
+        merged_numbers.append(row)
+        copied = position
+    merged_hashes.frombytes(hashes[copied:].tobytes())
+    merged_numbers.frombytes(numbers[copied:].tobytes())
+    return merged_hashes, merged_numbers
+
+# The mapped CSV file and its offset index
+class MappedFile:
+    def __init__(self, file_path, key_field):
+        self.file_path = file_path
+        self.key_field = key_field
+        self.signature = None
+        self.data = None
+        self.index = None
+        self.views = []
+
+    # Function to describe the CSV file, so that a change to it is noticed
+    def csv_signature(self):
+        stat = os.stat(self.file_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    # Function to get the checksums of the first and last CHECK_BYTES of the indexed part of the CSV
+    def _checksums(self, size):
+        return zlib.crc32(self.data[:min(size, CHECK_BYTES)]), zlib.crc32(self.data[max(size - CHECK_BYTES, 0):size])
+
+    # Function to map the CSV and its index, adding appended rows to the index or building it again if needed
+    def open(self):
+        self.close()
+        self.signature = inode, mtime, size = self.csv_signature()
+        with open(self.file_path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        header_end = self.data.find(b'\n') + 1 if size else 0
+        self.fieldnames = decode_values(self.data[:header_end]) if header_end else []
+        column = self.fieldnames.index(self.key_field) if self.key_field in self.fieldnames else len(self.fieldnames)
+        field_crc = zlib.crc32(self.key_field.encode('utf-8'))
+        stored = self._read_index()
+        if stored is not None:
+            magic, version, stored_field, stored_inode, stored_mtime, indexed, rows, first_crc, last_crc = stored
+            usable = ((magic, version, stored_field, stored_inode) == (INDEX_MAGIC, INDEX_VERSION, field_crc, inode)
+                      and indexed <= size and (first_crc, last_crc) == self._checksums(indexed)
+                      and (indexed < size or stored_mtime == mtime))
+            if usable and indexed == size:
+                return
+            if usable:
+                # Only rows were appended: read the new bytes and merge their keys into the index
+                offsets, hashes, end = scan_rows(self.data, indexed, column)
+                all_offsets = array('Q')
+                all_offsets.frombytes(self.offsets[:rows].tobytes())
+                all_offsets.extend(offsets)
+                self._write_index(all_offsets, end, *merge_keys(self.hashes, self.numbers, *sort_keys(hashes, rows)),
+                                  inode, mtime, field_crc)
+                return
+        offsets, hashes, end = scan_rows(self.data, header_end, column)
+        self._write_index(offsets, end, *sort_keys(hashes), inode, mtime, field_crc)
+
+    # Function to map the index file and read its header; returns None when there is no usable index
+    def _read_index(self):
+        try:
+            with open(index_path(self.file_path), 'rb') as file:
+                self.index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(self.index) < _HEADER.size:
+            return None
+        header = _HEADER.unpack_from(self.index)
+        rows = header[6]
+        if len(self.index) != _HEADER.size + (3 * rows + 1) * 8:
+            return None
+        self._view(memoryview(self.index)[_HEADER.size:].cast('Q'), rows)
+        return header
+
+    # Function to point the offsets, hashes and row numbers at one array of rows + 1 offsets, rows hashes and rows row numbers
+    def _view(self, values, rows):
+        self.offsets = values[:rows + 1]
+        self.hashes = values[rows + 1:2 * rows + 1]
+        self.numbers = values[2 * rows + 1:]
+        self.views = [values, self.offsets, self.hashes, self.numbers]
+
+    # Function to write the index file and use it
+    def _write_index(self, offsets, end, hashes, numbers, inode, mtime, field_crc):
+        rows = len(offsets)
+        values = array('Q', offsets)
+        values.append(end)
+        values.extend(hashes)
+        values.extend(numbers)
+        header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, field_crc, inode, mtime, end, rows, *self._checksums(end))
+        self._release()
+        temp_path = index_path(self.file_path) + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(header)
+                values.tofile(file)
+            os.replace(temp_path, index_path(self.file_path))
+        except OSError:
+            # The index file is only an optimisation; in a read-only directory it is kept in memory
+            pass
+        self._view(memoryview(values), rows)
+
+    # Function to let go of the index, so that its file can be closed
+    def _release(self):
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.offsets = self.hashes = self.numbers = ()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    # Function to unmap the CSV and its index
+    def close(self):
+        self._release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = None
+
+    # Function to check the CSV before a lookup and map it again if it changed; returns whether it did
+    def refresh(self):
+        if self.csv_signature() == self.signature:
+            return False
+        self.open()
+        return True
+
+    # Function to get the number of rows in the CSV
+    def __len__(self):
+        return len(self.hashes)
+
+    # Function to get the CSV values of one row
+    def values(self, row):
+        return decode_values(self.data[self.offsets[row]:self.offsets[row + 1]])
+
+    # Function to get the numbers of the rows whose key field may equal value (hashes can collide)
+    def candidates(self, value):
+        wanted = key_hash(value)
+        position = bisect_left(self.hashes, wanted)
+        rows = []
+        while position < len(self.hashes) and self.hashes[position] == wanted:
+            rows.append(self.numbers[position])
+            position += 1
+        return rows
+
+# A CSV dataset opened read-only through a MappedFile. Lookups on the key field read the mapped
+# file until the dataset is loaded in full; after that it behaves like any other Dataset.
+class MappedDataset(Dataset):
+    def __init__(self, file_path, record_class=None, key_field='guest_id'):
+        super().__init__(file_path, record_class)
+        self.key_field = key_field
+        self.mapped = None
+        self.journal_signature = None
+        self.replaced = set()       # CSV rows changed or deleted by the journal
+        self.changed_rows = {}      # key -> rows added or changed by the journal
+        self.mapped_length = 0
+
+    # Function to map the file on first use, and to follow the changes made to it or its journal since
+    def _open(self):
+        if self.mapped is None:
+            self.mapped = MappedFile(self.file_path, self.key_field)
+            self.mapped.open()
+            changed = True
+        else:
+            changed = self.mapped.refresh()
+        journal_signature = self._journal_signature()
+        if changed or journal_signature != self.journal_signature:
+            self.journal_signature = journal_signature
+            self._follow_journal()
+            result_cache.forget(self)
+        return self.mapped
+
+    # Function to describe the journal, so that changes made on other terminals are noticed
+    def _journal_signature(self):
+        try:
+            stat = os.stat(journal.journal_path(self.file_path))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    # Function to lay the journal records over the mapped rows
+    def _follow_journal(self):
+        fieldnames = self.mapped.fieldnames
+        self.fieldnames = fieldnames
+        if self.requested_class is not None and tuple(fieldnames) == tuple(self.requested_class.FIELDS):
+            self.record_class = self.requested_class
+        self.replaced, self.changed_rows = set(), {}
+        records = journal.read_records(self.file_path)
+        self.mapped_length = len(self.mapped)
+        if not records:
+            return
+        # positions[i] is the CSV row at position i, or -1 - n for the n-th row of the journal
+        positions = array('q', range(len(self.mapped)))
+        journal_rows = []
+        for record in records:
+            if record['op'] == 'update':
+                position = positions[record['row']]
+                if position >= 0:
+                    self.replaced.add(position)
+                    journal_rows.append(self._decode(position))
+                    position = positions[record['row']] = -len(journal_rows)
+                journal_rows[-1 - position].update(record['values'])
+            elif record['op'] == 'insert':
+                journal_rows.append(self.make_row(record['values']))
+                positions.append(-len(journal_rows))
+            elif record['op'] == 'delete':
+                if positions[record['row']] >= 0:
+                    self.replaced.add(positions[record['row']])
+                del positions[record['row']]
+        self.mapped_length = len(positions)
+        for position in positions:
+            if position < 0:
+                row = journal_rows[-1 - position]
+                self.changed_rows.setdefault(field_key(row.get(self.key_field)), []).append(row)
+
+    # Function to decode one row of the mapped file
+    def _decode(self, row):
+        values = self.mapped.values(row)
+        if self.record_class is not None:
+            return self.record_class(values)
+        return dict(zip(self.fieldnames, values))
+
+    # Function to find the rows whose key field equals value, decoding only those rows
+    def _lookup(self, value):
+        mapped = self._open()
+        key = field_key(value)
+        rows = []
+        for row in mapped.candidates(value):
+            if row not in self.replaced:
+                decoded = self._decode(row)
+                if field_key(decoded.get(self.key_field)) == key:
+                    rows.append(decoded)
+        return rows + self.changed_rows.get(key, [])
+
+    # Function to check the file for changes made by other programs, dropping the cached results
+    # they made stale; the result cache (see result_cache.py) calls it before every lookup
+    def refresh(self):
+        if self.mapped is not None:
+            self._open()
+
+    def find(self, field, value, **conditions):
+        if field != self.key_field or self.is_loaded():
+            return super().find(field, value, **conditions)
+        return self._found(filter_equal(self._lookup(value), conditions))
+
+    def __len__(self):
+        if self.is_loaded():
+            return super().__len__()
+        self._open()
+        return self.mapped_length
+
+    def _read_only(self):
+        raise ValueError(f"{os.path.basename(self.file_path)} is open read-only on this terminal (HOTEL_READ_ONLY).")
+
+    def update(self, row, changes, position=None):
+        self._read_only()
+
+    def append(self, row):
+        self._read_only()
+
+    def remove(self, row, position=None):
+        self._read_only()
+
+    def save(self):
+        pass
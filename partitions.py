@@ -0,0 +1,316 @@
+import csv
+import gzip
+import json
+import os
+from datetime import date
+import journal
+import snapshot
+from dataset import Dataset
+
+# Monthly partitions of a CSV dataset, used for the stay history in Guest.csv.
+#
+# `python system.py --partition` splits Guest.csv into one CSV file per month of check-in date in
+# the directory Guest.csv.partitions, together with a manifest.json that lists the months. Every
+# month is a dataset of its own with its own journal and snapshot cache, so a change is journaled
+# to (and eventually rewrites) only the month it touches, and a search by check-in date only reads
+# the months it covers. Searches on other fields, such as guest ID or name, read all months and use
+# the usual field indexes.
+#
+# `python system.py --archive` moves closed months, whose guests have all checked out, into
+# gzip-compressed CSV files. Archived months can still be searched but no longer changed.
+
+PARTITIONS_SUFFIX = '.partitions'
+MANIFEST_NAME = 'manifest.json'
+UNDATED = 'undated'     # month of the rows without a usable date
+
+# Function to get the directory that holds the partitions of a CSV file
+def partition_directory(file_path):
+    return file_path + PARTITIONS_SUFFIX
+
+def manifest_path(file_path):
+    return os.path.join(partition_directory(file_path), MANIFEST_NAME)
+
+# Function to check whether a CSV file has been split into partitions
+def is_partitioned(file_path):
+    return os.path.exists(manifest_path(file_path))
+
+# Function to describe a CSV file with its journal, or its partitions with theirs, so that a change to any of them is noticed
+def file_signature(path):
+    paths = [path, journal.journal_path(path)]
+    if is_partitioned(path):
+        directory = partition_directory(path)
+        paths += [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+    signature = []
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+            signature.append((file_path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((file_path, None))
+    return tuple(signature)
+
+# Function to get the partition ('YYYY-MM') a date belongs to
+def month_of(value):
+    text = '' if value is None else str(value).strip()
+    if len(text) >= 10 and text[4] == '-' and text[7] == '-':
+        return text[:7]
+    return UNDATED
+
+def read_manifest(file_path):
+    with open(manifest_path(file_path), 'r') as file:
+        return json.load(file)
+
+# Function to replace the manifest atomically (temp file + rename)
+def write_manifest(file_path, manifest):
+    path = manifest_path(file_path)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+
+# Function to write rows to a gzip-compressed CSV file atomically
+def save_to_gzip(file_path, rows, fieldnames):
+    temp_path = file_path + '.tmp'
+    with gzip.open(temp_path, 'wt', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_path, file_path)
+
+# Function to split a CSV file into monthly partitions by the date in `field`; returns {month: rows}.
+# The original file is kept as a backup (Guest.csv.bak) and is no longer used.
+def partition_csv(file_path, record_class=None, field='check_in_date'):
+    source = Dataset(file_path, record_class)
+    months = {}
+    for row in source:
+        months.setdefault(month_of(row.get(field)), []).append(row)
+    directory = partition_directory(file_path)
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'field': field, 'fieldnames': list(source.fieldnames), 'partitions': {}}
+    for month, rows in sorted(months.items()):
+        file_name = f"{month}.csv"
+        journal.save_to_csv(os.path.join(directory, file_name), rows, source.fieldnames)
+        manifest['partitions'][month] = {'file': file_name, 'archived': False}
+    write_manifest(file_path, manifest)
+    os.replace(file_path, file_path + '.bak')
+    for path in (journal.journal_path(file_path), snapshot.snapshot_path(file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    return {month: len(rows) for month, rows in sorted(months.items())}
+
+# Function to archive the months before the current one whose stays have all ended
+# (end_field before today); returns [(month, rows)] for the months archived
+def archive_closed_months(dataset, end_field='check_out_date', today=None):
+    today = (today or date.today()).isoformat()
+    archived = []
+    for month, entry in sorted(dataset.manifest['partitions'].items()):
+        if entry['archived'] or month == UNDATED or month >= today[:7]:
+            continue
+        partition = dataset.open_partition(month)
+        if any((row.get(end_field) or '') >= today for row in partition.rows):
+            continue
+        file_name = f"{month}.csv.gz"
+        save_to_gzip(os.path.join(dataset.directory, file_name), partition.rows, partition.fieldnames)
+        dataset.partitions[month] = ArchivedDataset.from_partition(os.path.join(dataset.directory, file_name), partition)
+        entry.update(file=file_name, archived=True)
+        write_manifest(dataset.file_path, dataset.manifest)
+        for path in (partition.file_path, journal.journal_path(partition.file_path), snapshot.snapshot_path(partition.file_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        archived.append((month, len(partition.rows)))
+    return archived
+
+# A month that has been archived: read from its compressed file and never changed again
+class ArchivedDataset(Dataset):
+    # Function to take over the rows of a partition that has just been archived
+    @classmethod
+    def from_partition(cls, file_path, partition):
+        archived = cls(file_path, partition.requested_class)
+        archived.fieldnames, archived.record_class, archived._rows = partition.fieldnames, partition.record_class, partition.rows
+        return archived
+
+    def load(self):
+        cached = snapshot.load_snapshot(self.file_path, self.requested_class)
+        if cached is None:
+            fieldnames, rows = journal.read_csv(self.file_path, self.requested_class, opener=gzip.open)
+            snapshot.save_snapshot(self.file_path, fieldnames, rows, self.requested_class)
+        else:
+            fieldnames, rows = cached
+        record_class = self.requested_class
+        if record_class is not None and tuple(fieldnames) != tuple(record_class.FIELDS):
+            record_class = None
+        self.fieldnames, self.record_class, self._rows = fieldnames, record_class, rows
+
+    def _read_only(self):
+        raise ValueError(f"The stays of {os.path.basename(self.file_path)[:7]} are archived and can no longer be changed.")
+
+    def update(self, row, changes, position=None):
+        self._read_only()
+
+    def append(self, row):
+        self._read_only()
+
+    def remove(self, row, position=None):
+        self._read_only()
+
+    def save(self):
+        pass
+
+class PartitionedDataset(Dataset):
+    def __init__(self, file_path, record_class=None):
+        super().__init__(file_path, record_class)
+        self.directory = partition_directory(file_path)
+        self.manifest = read_manifest(file_path)
+        self.field = self.manifest['field']
+        self.fieldnames = self.manifest['fieldnames']
+        if record_class is not None and tuple(self.fieldnames) == tuple(record_class.FIELDS):
+            self.record_class = record_class
+        self.partitions = {}        # month -> Dataset, read on first use
+        self.month_of_row = {}      # id(row) -> month
+
+    # Function to get the dataset of one month, reading it on first use
+    def open_partition(self, month):
+        partition = self.partitions.get(month)
+        if partition is None:
+            entry = self.manifest['partitions'][month]
+            dataset_class = ArchivedDataset if entry['archived'] else Dataset
+            partition = dataset_class(os.path.join(self.directory, entry['file']), self.requested_class)
+            if self.deferred:
+                partition.begin_batch()
+            if self.pending is not None:
+                partition.hold_writes()
+            self.partitions[month] = partition
+        if not partition.is_loaded():
+            partition.load()
+            self.month_of_row.update((id(row), month) for row in partition.rows)
+        return partition
+
+    # Function to get the month a row is stored in
+    def _month(self, row):
+        month = self.month_of_row.get(id(row))
+        if month is None:
+            raise ValueError("Row is not part of this dataset.")
+        return month
+
+    # Function to get the month a new or moved row goes to, creating its file if the month is new
+    def _writable_partition(self, month):
+        if month not in self.manifest['partitions']:
+            file_name = f"{month}.csv"
+            journal.save_to_csv(os.path.join(self.directory, file_name), [], self.fieldnames)
+            self.manifest['partitions'][month] = {'file': file_name, 'archived': False}
+            write_manifest(self.file_path, self.manifest)
+        partition = self.open_partition(month)
+        if isinstance(partition, ArchivedDataset):
+            partition._read_only()
+        return partition
+
+    # Function to tell the server (see take_pending) that there are journal records waiting
+    def _changed(self, op):
+        if self.pending is not None:
+            self.pending.append(op)
+
+    # Function to read all months, oldest first
+    def load(self):
+        rows = []
+        for month in sorted(self.manifest['partitions']):
+            rows.extend(self.open_partition(month).rows)
+        self._rows = rows
+
+    # Searches on the partition field only read the months they cover
+    def find(self, field, value, **conditions):
+        if field != self.field:
+            return super().find(field, value, **conditions)
+        month = month_of(value)
+        if month not in self.manifest['partitions']:
+            return []
+        return self.open_partition(month).find(field, value, **conditions)
+
+    def find_range(self, field, start, end):
+        first, last = month_of(start), month_of(end)
+        if field != self.field or UNDATED in (first, last):
+            return super().find_range(field, start, end)
+        results = []
+        for month in sorted(self.manifest['partitions']):
+            if first <= month <= last and month != UNDATED:
+                results.extend(self.open_partition(month).find_range(field, start, end))
+        return results
+
+    # The partition field is indexed per month when it is first searched
+    def prepare(self, *fields):
+        super().prepare(*[field for field in fields if field != self.field])
+
+    def update(self, row, changes, position=None):
+        month = self._month(row)
+        new_month = month_of(changes[self.field]) if self.field in changes else month
+        if new_month == month:
+            old_values = self.partitions[month].update(row, changes)
+        else:
+            # A new check-in date in another month moves the row to that month's file
+            target = self._writable_partition(new_month)
+            self.partitions[month].remove(row)
+            old_values = {field: row.get(field) for field in changes}
+            row.update(changes)
+            target.append(row)
+            self.month_of_row[id(row)] = new_month
+        self._changed('update')
+        self._notify('update', row, old_values)
+        return old_values
+
+    def append(self, row):
+        row = self.make_row(row)
+        month = month_of(row.get(self.field))
+        self._writable_partition(month).append(row)
+        self.month_of_row[id(row)] = month
+        if self._rows is not None:
+            self._rows.append(row)
+        self._changed('insert')
+        self._notify('insert', row)
+        return row
+
+    def remove(self, row, position=None):
+        self.partitions[self._month(row)].remove(row)
+        if self._rows is not None:
+            del self._rows[self.position(row) if position is None else position]
+        del self.month_of_row[id(row)]
+        self._changed('delete')
+        self._notify('delete', row)
+
+    # Function to rewrite the months that have journaled or batched changes, and only those
+    def save(self):
+        for partition in self.partitions.values():
+            if partition.dirty or partition.pending or os.path.exists(journal.journal_path(partition.file_path)):
+                partition.save()
+        self.dirty = False
+        if self.pending is not None:
+            self.pending = []
+        self.written()
+
+    def begin_batch(self):
+        self.deferred = True
+        for partition in self.partitions.values():
+            partition.begin_batch()
+
+    # Function to leave batch mode; each month with changes is written once
+    def end_batch(self):
+        self.deferred = False
+        for partition in self.partitions.values():
+            partition.end_batch()
+        self.written()
+
+    def hold_writes(self):
+        super().hold_writes()
+        for partition in self.partitions.values():
+            partition.hold_writes()
+
+    # The records belong to the journals of the single months, so they are written here
+    def take_pending(self):
+        for partition in self.partitions.values():
+            records = partition.take_pending()
+            if records and journal.append_records(partition.file_path, records) > journal.MAX_JOURNAL_SIZE:
+                partition.save()
+        if self.pending:
+            self.written(len(self.pending))
+        if self.pending is not None:
+            self.pending = []
+        return []
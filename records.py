@@ -0,0 +1,151 @@
+import sys
+from datetime import date
+
+# Compact row types for the CSV datasets.
+#
+# A record keeps its values in __slots__ instead of a per-row dict. Dates are stored as day
+# ordinals, counts and prices as ints, and values that repeat across many rows (room types,
+# company types, names, ...) are interned so that all rows share one string object.
+# Records still behave like the dicts returned by csv.DictReader: record['check_in_date'] gives
+# back the original 'YYYY-MM-DD' text, and .get(), .keys(), .items(), .update() work as before.
+# Values that cannot be converted without changing their text are simply kept as strings.
+
+TEXT = 'text'
+INTERNED = 'interned'
+DATE = 'date'
+INT = 'int'
+
+# Parsed dates by their text; there are only a few thousand distinct dates, so rows share the ints
+_DATE_ORDINALS = {}
+
+# Function to convert CSV text into its compact stored form
+def parse_value(kind, text):
+    if not isinstance(text, str) or kind == TEXT:
+        return text
+    if kind == INTERNED:
+        return sys.intern(text)
+    if kind == DATE:
+        ordinal = _DATE_ORDINALS.get(text)
+        if ordinal is None:
+            ordinal = text
+            if len(text) == 10 and text[4] == '-' and text[7] == '-':
+                try:
+                    ordinal = date.fromisoformat(text).toordinal()
+                except ValueError:
+                    pass
+            _DATE_ORDINALS[text] = ordinal
+        return ordinal
+    if kind == INT:
+        if text.isdigit() and (text == '0' or text[0] != '0'):
+            return int(text)
+        return text
+    return text
+
+# Function to convert a stored value back into the text that was read from the CSV
+def format_value(kind, value):
+    if isinstance(value, int):
+        if kind == DATE:
+            return date.fromordinal(value).isoformat()
+        return str(value)
+    return value
+
+class Record:
+    __slots__ = ()
+    FIELDS = ()
+    KINDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SLOT_OF = dict(zip(cls.FIELDS, cls.__slots__))
+        cls._KIND_OF = dict(zip(cls.FIELDS, cls.KINDS))
+        cls._KEYS = dict.fromkeys(cls.FIELDS).keys()
+        cls._COLUMNS = tuple(zip(cls.__slots__, cls.KINDS))
+
+    # values are the CSV texts in FIELDS order, as produced by csv.reader
+    def __init__(self, values=()):
+        values = list(values)
+        values.extend([''] * (len(self._COLUMNS) - len(values)))
+        for (slot, kind), text in zip(self._COLUMNS, values):
+            setattr(self, slot, parse_value(kind, text))
+
+    @classmethod
+    def from_dict(cls, row):
+        return cls([row.get(field, '') for field in cls.FIELDS])
+
+    def __getitem__(self, field):
+        return format_value(self._KIND_OF[field], getattr(self, self._SLOT_OF[field]))
+
+    def __setitem__(self, field, value):
+        setattr(self, self._SLOT_OF[field], parse_value(self._KIND_OF[field], value))
+
+    def __contains__(self, field):
+        return field in self._SLOT_OF
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def get(self, field, default=None):
+        if field in self._SLOT_OF:
+            return self[field]
+        return default
+
+    def keys(self):
+        return self._KEYS
+
+    def values(self):
+        return [format_value(kind, getattr(self, slot)) for slot, kind in self._COLUMNS]
+
+    def items(self):
+        return [(field, self[field]) for field in self.FIELDS]
+
+    def update(self, changes):
+        for field, value in changes.items():
+            self[field] = value
+
+    # Function to get a date field as a day ordinal (None if the stored text is not a valid date)
+    def ordinal(self, field):
+        value = getattr(self, self._SLOT_OF[field])
+        return value if isinstance(value, int) else None
+
+class GuestRecord(Record):
+    __slots__ = ('guest_id', 'first_name', 'last_name', 'email', 'phone_number',
+                 'check_in_date', 'check_out_date', 'room_id', 'room_type')
+    FIELDS = __slots__
+    KINDS = (TEXT, INTERNED, INTERNED, TEXT, TEXT, DATE, DATE, INTERNED, INTERNED)
+
+class BookingRecord(Record):
+    __slots__ = ('room_id', 'first_name', 'last_name', 'phone_number', 'reserved_from', 'reserved_to')
+    FIELDS = __slots__
+    KINDS = (INTERNED, INTERNED, INTERNED, TEXT, DATE, DATE)
+
+class CompanyRecord(Record):
+    __slots__ = ('company_name', 'company_type', 'nights_occupied_last_year', 'cooperation_status',
+                 'standard_price', 'twin_price', 'accessible_price', 'deluxe_price',
+                 'family_deluxe_price', 'suite_price')
+    FIELDS = ('Company Name', 'Company Type', 'Nights Occupied Last Year', 'Cooperation Status',
+              'Standard Price', 'Twin Price', 'Accessible Price', 'Deluxe Price',
+              'Family Deluxe Price', 'Suite Price')
+    KINDS = (TEXT, INTERNED, INT, INTERNED, INT, INT, INT, INT, INT, INT)
+
+class ServiceRecord(Record):
+    __slots__ = ('service_name', 'description', 'working_hours', 'policies', 'contact')
+    FIELDS = ('Service Name', 'Description', 'Working Hours', 'Policies', 'Contact')
+    KINDS = (TEXT, TEXT, INTERNED, TEXT, TEXT)
+
+class AppointmentRecord(Record):
+    __slots__ = ('guest_id', 'first_name', 'last_name', 'service_name', 'date', 'time')
+    FIELDS = __slots__
+    KINDS = (TEXT, INTERNED, INTERNED, INTERNED, DATE, INTERNED)
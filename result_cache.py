@@ -0,0 +1,140 @@
+from collections import OrderedDict
+import os
+import threading
+
+# Shared cache of search results and computed quotes, used by the guest, booking and company menus.
+#
+# Operators repeat the same searches all day (today's arrivals, common surnames, the prices of the
+# usual partners). A result is cached under the dataset it came from together with the fields it
+# depends on. Every dataset with cached results is followed through its change listener: a new or
+# removed row drops all results of that dataset, and a changed row drops only the results that
+# depend on one of the changed fields, so moving a booking to new dates keeps the name searches.
+# Rows in cached results are the dataset's own rows, so they always show their current values.
+#
+# Exact and range searches of the CSV datasets are answered by their in-memory field indexes, which
+# is faster than a cache lookup, so they bypass the cache; it is used for the SQLite backend, the
+# read-only terminals (mapped_csv.py), prefix searches, searches with extra conditions and computed
+# results such as quotes and in-house lists.
+#
+# The cache holds at most max_entries results and drops the least recently used one first.
+# Set HOTEL_RESULT_CACHE to the number of entries (0 turns the cache off); the hit and miss
+# counters are shown in the Diagnostics menu to help size it.
+
+DEFAULT_ENTRIES = 1000
+
+# Function to read the cache size from HOTEL_RESULT_CACHE
+def entries_from_environment():
+    value = os.environ.get('HOTEL_RESULT_CACHE', '').strip()
+    return int(value) if value.isdigit() else DEFAULT_ENTRIES
+
+max_entries = entries_from_environment()
+counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+_entries = OrderedDict()        # (source, kind, ...) -> (result, fields it depends on or None for all fields)
+_lock = threading.Lock()        # the server runs the menus of several terminals in threads
+
+# The cached results of one dataset
+class _Source:
+    def __init__(self):
+        self.keys = set()
+        self.generation = 0     # counts the changes, so a result computed during a change is not stored
+
+# Function to get the cache source of a dataset, following its changes from the first use on
+def _source(dataset):
+    def watch(dataset):
+        source = _Source()
+        dataset.on_change(lambda op, row, old_values: _invalidate(source, op, old_values))
+        return source
+    return dataset.derived('result_cache', watch)
+
+# Function to drop the results a change of the dataset makes stale
+def _invalidate(source, op, old_values=None):
+    changed = set(old_values or ()) if op == 'update' else None
+    with _lock:
+        source.generation += 1
+        for key in list(source.keys):
+            fields = _entries[key][1]
+            if changed is None or fields is None or fields & changed:
+                del _entries[key]
+                source.keys.discard(key)
+                counters['invalidations'] += 1
+
+# Function to get a result from the cache, or compute() it and keep it. key identifies the result
+# within the dataset; fields are the fields it depends on (None when it depends on whole rows).
+# Lists are kept and returned as tuples, so a hit costs no copy and no caller can change a cached result.
+def cached(dataset, key, compute, fields=None):
+    if max_entries <= 0 or not hasattr(dataset, 'derived'):
+        return compute()
+    if hasattr(dataset, 'refresh'):
+        # Datasets that follow changes made by other programs (see mapped_csv.py) check for them first
+        dataset.refresh()
+    with _lock:
+        source = _source(dataset)
+        key = (source,) + key
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            counters['hits'] += 1
+            return entry[0]
+        counters['misses'] += 1
+        generation = source.generation
+    result = compute()
+    if isinstance(result, list):
+        result = tuple(result)
+    with _lock:
+        if source.generation == generation:
+            _entries[key] = (result, None if fields is None else frozenset(fields))
+            source.keys.add(key)
+            while len(_entries) > max_entries:
+                old_key, _ = _entries.popitem(last=False)
+                old_key[0].keys.discard(old_key)
+                counters['evictions'] += 1
+    return result
+
+# Function to check whether a dataset answers exact and range searches from in-memory indexes
+def _indexed_in_memory(dataset):
+    return not hasattr(dataset, 'db_path') and not hasattr(dataset, 'refresh')
+
+def _conditions_key(conditions):
+    return tuple(sorted((field, str(value).strip()) for field, value in conditions.items()))
+
+# Function to run dataset.find() through the cache
+def find(dataset, field, value, **conditions):
+    if not conditions and _indexed_in_memory(dataset):
+        return dataset.find(field, value)
+    return cached(dataset, ('find', field, str(value).strip(), _conditions_key(conditions)),
+                  lambda: dataset.find(field, value, **conditions), {field, *conditions})
+
+# Function to run dataset.find_prefix() through the cache
+def find_prefix(dataset, field, prefix, **conditions):
+    return cached(dataset, ('prefix', field, str(prefix).strip(), _conditions_key(conditions)),
+                  lambda: dataset.find_prefix(field, prefix, **conditions), {field, *conditions})
+
+# Function to run dataset.find_range() through the cache
+def find_range(dataset, field, start, end):
+    if _indexed_in_memory(dataset):
+        return dataset.find_range(field, start, end)
+    return cached(dataset, ('range', field, start, end), lambda: dataset.find_range(field, start, end), {field})
+
+# Function to drop every result of a dataset, for example when its file was changed by another program
+def forget(dataset):
+    if hasattr(dataset, 'derived'):
+        _invalidate(_source(dataset), 'reload')
+
+# Function to empty the cache; the counters are kept
+def clear():
+    with _lock:
+        for key in _entries:
+            key[0].keys.discard(key)
+        _entries.clear()
+
+# Function to set the counters back to zero
+def reset_counters():
+    with _lock:
+        counters.update(hits=0, misses=0, invalidations=0, evictions=0)
+
+# Function to get the counters, the hit rate and the size of the cache
+def cache_stats():
+    with _lock:
+        lookups = counters['hits'] + counters['misses']
+        return dict(counters, hit_rate=counters['hits'] / lookups if lookups else 0.0,
+                    entries=len(_entries), max_entries=max_entries)
@@ -0,0 +1,78 @@
+from bisect import bisect_right, insort
+
+from room_availability import row_interval
+
+# Helper functions for assigning rooms to future bookings that do not have one yet.
+#
+# Bookings are processed in order of arrival (a sweep over time). For every room we know the
+# end of the last stay that started on or before the current arrival date (its "tail"). A booking
+# goes to the room whose tail is the latest one that still ends by the arrival date (best fit),
+# which keeps rooms packed and leaves long free stretches in other rooms for long stays. Stays
+# that were already assigned by hand are respected, so a room is never double-booked, and every
+# guest stays in a single room for the whole booking.
+
+# Function to compute room assignments without changing anything; returns (assignments, unassigned)
+def plan_assignments(bookings, availability, room_type=None):
+    if room_type:
+        room_ids = list(availability['rooms_by_type'].get(room_type, []))
+    else:
+        room_ids = sorted(availability['room_types'])
+    rooms = availability['rooms']
+
+    pending = []
+    unassigned = []
+    for booking in bookings:
+        interval = row_interval(booking)
+        if interval and interval[0] < interval[1]:
+            pending.append((interval[0], interval[1], booking))
+        else:
+            unassigned.append(booking)
+    pending.sort(key=lambda item: (item[0], item[1]))
+
+    # Existing stays of the candidate rooms, in order of their start date
+    events = sorted((start, end, room_id) for room_id in room_ids
+                    for start, end in zip(rooms[room_id]['starts'], rooms[room_id]['ends']))
+    tails = {room_id: 0 for room_id in room_ids}
+    ready = sorted((0, room_id) for room_id in room_ids)   # (tail, room_id), sorted by tail
+    next_event = 0
+
+    assignments = []
+    for start, end, booking in pending:
+        # Stays that begin on or before this arrival now occupy their room up to their end date
+        while next_event < len(events) and events[next_event][0] <= start:
+            _, event_end, room_id = events[next_event]
+            next_event += 1
+            if event_end > tails[room_id]:
+                ready.pop(bisect_right(ready, (tails[room_id], room_id)) - 1)
+                tails[room_id] = event_end
+                insort(ready, (event_end, room_id))
+
+        chosen = None
+        position = bisect_right(ready, (start, '\U0010ffff'))
+        while position > 0:
+            position -= 1
+            room_id = ready[position][1]
+            starts = rooms[room_id]['starts']
+            upcoming = bisect_right(starts, start)
+            # The room is only usable if its next existing stay begins on or after our departure
+            if upcoming == len(starts) or starts[upcoming] >= end:
+                chosen = room_id
+                break
+
+        if chosen is None:
+            unassigned.append(booking)
+            continue
+        ready.pop(position)
+        tails[chosen] = end
+        insort(ready, (end, chosen))
+        assignments.append((booking, chosen))
+    return assignments, unassigned
+
+# Function to assign rooms to all bookings without a room and save the result
+def assign_rooms(bookings_data, availability, room_type=None):
+    positions = {id(booking): position for position, booking in enumerate(bookings_data) if not booking.get('room_id')}
+    waiting = [bookings_data[position] for position in positions.values()]
+    assignments, unassigned = plan_assignments(waiting, availability, room_type)
+    for booking, room_id in assignments:
+        bookings_data.update(booking, {'room_id': room_id}, position=positions[id(booking)])
+    return assignments, unassigned
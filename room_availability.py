@@ -0,0 +1,155 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from records import Record
+
+# Helper functions for tracking which rooms are occupied on which dates.
+#
+# For every room the stays from Guest.csv and the reservations from Future booking.csv are kept
+# as intervals [from, to) sorted by their start date (as date ordinals). Next to the sorted starts
+# we keep, for every position, which of the intervals up to it ends last and which ends second
+# last. The intervals that start before `to` are the ones up to a position found by binary search,
+# and one of them overlaps [from, to) exactly when the one that ends last ends after `from`, so the
+# question is answered with one binary search however long the stays are. The second last is for
+# when the last one is the stay being moved itself.
+
+# Function to turn a YYYY-MM-DD string into a day number that is cheap to compare
+def date_ordinal(text):
+    return date.fromisoformat(text).toordinal()
+
+# Function to get the stay interval of a guest or booking row, or None if it has no usable dates
+def row_interval(row):
+    if isinstance(row, Record):
+        # Records already hold their dates as ordinals
+        if 'check_in_date' in row:
+            start, end = row.ordinal('check_in_date'), row.ordinal('check_out_date')
+        else:
+            start, end = row.ordinal('reserved_from'), row.ordinal('reserved_to')
+        return (start, end) if start is not None and end is not None else None
+    start = row.get('check_in_date', row.get('reserved_from'))
+    end = row.get('check_out_date', row.get('reserved_to'))
+    try:
+        return date_ordinal(start), date_ordinal(end)
+    except (TypeError, ValueError):
+        return None
+
+# Function to create the empty interval lists of a room
+def _new_room():
+    return {'starts': [], 'ends': [], 'rows': [], 'last': [], 'second': []}
+
+# Function to recompute, from a position onwards, the positions of the intervals that end last and
+# second last among the intervals up to each position
+def _refresh_last_ends(room, position):
+    ends, last, second = room['ends'], room['last'], room['second']
+    del last[position:]
+    del second[position:]
+    first = last[-1] if last else None
+    runner_up = second[-1] if second else None
+    for current in range(position, len(ends)):
+        if first is None or ends[current] > ends[first]:
+            first, runner_up = current, first
+        elif runner_up is None or ends[current] > ends[runner_up]:
+            runner_up = current
+        last.append(first)
+        second.append(runner_up)
+
+# Function to build the availability index from the current stays and the future bookings
+def build_availability(guest_data, booking_data):
+    availability = {'rooms': {}, 'room_types': {}, 'rooms_by_type': {}}
+    type_by_prefix = {}
+    for guest in guest_data:
+        room_id = guest.get('room_id')
+        if room_id and guest.get('room_type'):
+            _register_room(availability, room_id, guest['room_type'])
+            type_by_prefix.setdefault(room_id[:2], guest['room_type'])
+    # Future bookings carry no room type, so it is derived from the room ID pattern (ST001, TW050, ...)
+    for booking in booking_data:
+        room_id = booking.get('room_id')
+        if room_id and room_id not in availability['room_types']:
+            _register_room(availability, room_id, type_by_prefix.get(room_id[:2], 'Unknown'))
+
+    collected = {}
+    for row in list(guest_data) + list(booking_data):
+        interval = row_interval(row)
+        if row.get('room_id') and interval:
+            collected.setdefault(row['room_id'], []).append((interval[0], interval[1], row))
+    for room_id, intervals in collected.items():
+        intervals.sort(key=lambda item: item[0])
+        room = availability['rooms'].setdefault(room_id, _new_room())
+        room['starts'] = [start for start, _, _ in intervals]
+        room['ends'] = [end for _, end, _ in intervals]
+        room['rows'] = [row for _, _, row in intervals]
+        _refresh_last_ends(room, 0)
+    return availability
+
+# Function to add a room to the inventory of its room type
+def _register_room(availability, room_id, room_type):
+    if room_id in availability['room_types']:
+        return
+    availability['room_types'][room_id] = room_type
+    rooms = availability['rooms_by_type'].setdefault(room_type, [])
+    rooms.insert(bisect_left(rooms, room_id), room_id)
+    availability['rooms'].setdefault(room_id, _new_room())
+
+# Function to find a stay or booking that overlaps [start, end) in a room (ordinals); ignore skips one row
+def find_conflict(availability, room_id, start, end, ignore=None):
+    room = availability['rooms'].get(room_id)
+    if not room:
+        return None
+    position = bisect_left(room['starts'], end)  # intervals before this position start before `end`
+    if position == 0:
+        return None
+    for candidate in (room['last'][position - 1], room['second'][position - 1]):
+        if candidate is None or room['ends'][candidate] <= start:
+            return None
+        if room['rows'][candidate] is not ignore:
+            return room['rows'][candidate]
+    return None
+
+# Function to check whether a room is free for [start, end) given as YYYY-MM-DD strings
+def is_room_free(availability, room_id, start, end, ignore=None):
+    return find_conflict(availability, room_id, date_ordinal(start), date_ordinal(end), ignore) is None
+
+# Function to list all rooms of a type that are free for [start, end) given as YYYY-MM-DD strings
+def list_free_rooms(availability, room_type, start, end):
+    start, end = date_ordinal(start), date_ordinal(end)
+    return [room_id for room_id in availability['rooms_by_type'].get(room_type, [])
+            if find_conflict(availability, room_id, start, end) is None]
+
+# Function to get the known room types
+def room_types(availability):
+    return sorted(availability['rooms_by_type'])
+
+# Function to add the interval of a row to the index
+def add_interval(availability, row):
+    room_id = row.get('room_id')
+    interval = row_interval(row)
+    if not room_id or not interval:
+        return
+    if room_id not in availability['room_types']:
+        _register_room(availability, room_id, row.get('room_type') or 'Unknown')
+    room = availability['rooms'][room_id]
+    position = bisect_right(room['starts'], interval[0])
+    room['starts'].insert(position, interval[0])
+    room['ends'].insert(position, interval[1])
+    room['rows'].insert(position, row)
+    _refresh_last_ends(room, position)
+
+# Function to remove the interval of a row from the index
+def remove_interval(availability, row, room_id=None):
+    room = availability['rooms'].get(room_id or row.get('room_id'))
+    if not room:
+        return
+    for position, candidate in enumerate(room['rows']):
+        if candidate is row:
+            del room['starts'][position]
+            del room['ends'][position]
+            del room['rows'][position]
+            _refresh_last_ends(room, position)
+            return
+
+# Function to apply a change reported by the guest or booking dataset to the index
+def update_availability(availability, op, row, old_values=None):
+    if op in ('update', 'delete'):
+        remove_interval(availability, row, (old_values or {}).get('room_id'))
+    if op in ('update', 'insert'):
+        add_interval(availability, row)
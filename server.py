@@ -0,0 +1,238 @@
+import asyncio
+import builtins
+import io
+import json
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+
+import batch
+import journal
+import system
+from company_index import get_company_index
+from guest_identity import get_identity_index
+from appointments import get_schedule
+
+# Reservation server: one process holds the datasets in memory and serves many front desk terminals.
+#
+# Clients connect over TCP and exchange one JSON object per line. There are two kinds of connection:
+# - Requests: {"op": "search_guest_by_id", "guest_id": "G001"} runs one of the batch commands (see
+#   batch.py) and answers with its result dict, for example {"ok": true, "results": [...]}.
+# - Terminals: {"op": "terminal"} starts the normal menus (system.main) for this connection. The server
+#   answers with {"output": "...", "prompt": "Choose an option: "}, the client replies with
+#   {"input": "1"}, and so on until the menus are left, which is answered with {"output": "...", "closed": true}.
+#
+# Work on the in-memory data is guarded by one readers-writer lock: read-only commands run side by side,
+# while a change (or a menu step, which may change anything) runs alone. Those steps only touch memory
+# and take microseconds. Writing the changes to disk is the slow part; it happens after the step, with
+# one lock per dataset, so that writes to one file are serialized while the other files and all readers
+# carry on. A client gets its answer once its changes are on disk.
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+class StateLock:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    # Shared access for read-only work; new readers wait while a writer is waiting, so writers are not starved
+    @contextmanager
+    def reading(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    # Exclusive access for work that changes the data
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+state_lock = StateLock()
+write_locks = {}
+
+# Function to list the datasets served by the server
+def served_datasets():
+    return [system.guest_data, system.company_data, system.booking_data, system.services_data, system.appointments_data]
+
+# Function to load everything the commands and menus use, so that nothing is built lazily by two threads
+def warm_up():
+    for dataset in served_datasets():
+        if not dataset.is_loaded():
+            dataset.load()
+        dataset.hold_writes()
+        write_locks[dataset] = threading.Lock()
+    system.guest_data.prepare('guest_id', 'first_name', 'check_in_date')
+    system.booking_data.prepare('first_name', 'reserved_from')
+    system.company_data.prepare('Company Name')
+    system.get_room_availability()
+    get_identity_index(system.guest_data, system.booking_data)
+    get_company_index(system.company_data)
+    get_schedule(system.services_data, system.appointments_data)
+
+# Function to write the waiting journal records of every dataset; each file is written by one thread at a time
+def flush_writes():
+    for dataset in served_datasets():
+        if not dataset.pending:
+            continue
+        with write_locks[dataset]:
+            with state_lock.writing():
+                records = dataset.take_pending()
+            # Records taken by several clients at once are written with a single flush to disk
+            if records:
+                size = journal.append_records(dataset.file_path, records)
+                dataset.written(len(records))
+                if size > journal.MAX_JOURNAL_SIZE:
+                    with state_lock.writing():
+                        dataset.save()
+
+# Function to run one request and wait until its changes are on disk
+def run_request(command):
+    if command.get('op') in batch.READ_COMMANDS:
+        with state_lock.reading():
+            return batch.run_command(command)
+    with state_lock.writing():
+        result = batch.run_command(command)
+    flush_writes()
+    return result
+
+# print() and input() of the menus are sent to the terminal of the thread that runs them
+session = threading.local()
+_print = builtins.print
+_input = builtins.input
+
+def _session_print(*args, **kwargs):
+    terminal = getattr(session, 'terminal', None)
+    if terminal is None or kwargs.get('file') is not None:
+        return _print(*args, **kwargs)
+    return _print(*args, file=terminal.output, **kwargs)
+
+def _session_input(prompt=''):
+    terminal = getattr(session, 'terminal', None)
+    if terminal is None:
+        return _input(prompt)
+    return terminal.read_line(prompt)
+
+class Terminal:
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self.output = io.StringIO()
+        self.lines = queue.Queue()
+
+    def send(self, message):
+        data = (json.dumps(message) + '\n').encode()
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+    # Called by input() in the menus: the data is released while the user is typing, so a row found
+    # before the prompt may have been removed by another terminal when it returns (see Dataset.contains)
+    def read_line(self, prompt):
+        state_lock.release_write()
+        flush_writes()
+        self.send({'output': self.output.getvalue(), 'prompt': prompt})
+        self.output = io.StringIO()
+        line = self.lines.get()
+        state_lock.acquire_write()
+        if line is None:
+            raise EOFError
+        return line
+
+    # Function to run the menus for this terminal (in its own thread)
+    def run(self):
+        session.terminal = self
+        state_lock.acquire_write()
+        try:
+            system.main()
+        except (EOFError, SystemExit):
+            pass
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            state_lock.release_write()
+            flush_writes()
+            self.send({'output': self.output.getvalue(), 'closed': True})
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+# Function to serve one client connection
+async def handle_connection(reader, writer):
+    loop = asyncio.get_running_loop()
+    terminal = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            if terminal is not None:
+                terminal.lines.put(str(message.get('input', '')) if isinstance(message, dict) else '')
+                continue
+            if not isinstance(message, dict):
+                result = {'ok': False, 'error': "Invalid request: expected one JSON object per line."}
+            elif message.get('op') == 'terminal':
+                terminal = Terminal(loop, writer)
+                threading.Thread(target=terminal.run, daemon=True).start()
+                continue
+            else:
+                result = await loop.run_in_executor(None, run_request, message)
+                if 'id' in message:
+                    result = dict(result, id=message['id'])
+            writer.write((json.dumps(result) + '\n').encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        if terminal is not None:
+            # Ends the menus of a client that went away
+            terminal.lines.put(None)
+        else:
+            writer.close()
+
+# Function to start the server and serve until interrupted
+async def serve(host=HOST, port=PORT, ready=None):
+    warm_up()
+    builtins.print, builtins.input = _session_print, _session_input
+    server = await asyncio.start_server(handle_connection, host, port, limit=1024 * 1024)
+    address = server.sockets[0].getsockname()
+    print(f"Python Hotel System server listening on {address[0]}:{address[1]}", flush=True)
+    if ready is not None:
+        ready(address)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    try:
+        asyncio.run(serve(port=port))
+    except KeyboardInterrupt:
+        print("Server stopped.")
@@ -1,4 +1,9 @@
 import csv
+from datetime import date
+import diagnostics
+import result_cache
+from appointments import (SEARCH_DAYS, get_schedule, find_service, book_appointment, cancel_appointment,
+                          guest_appointments, next_free_slot, open_services)
 
 # Helper functions for managing hotel services
 
@@ -38,17 +43,123 @@ def get_service_by_number(services_data):
         # Display an error message for invalid input
         print("Invalid choice. Please try again.")
 
+# Function to let the user pick a service by number; returns the service row or None
+def choose_service(services_data):
+    print("\nAvailable Services:")
+    for idx, service in enumerate(services_data, start=1):
+        print(f"{idx}. {service.get('Service Name', 'N/A')} ({service.get('Working Hours', 'N/A')})")
+    choice = input("Choose a service by number: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(services_data):
+        return services_data[int(choice) - 1]
+    print("Invalid choice. Please try again.")
+    return None
+
+# Function to ask for a date, with today as the default
+def ask_date(prompt):
+    return input(f"{prompt} (YYYY-MM-DD, leave empty for today): ").strip() or date.today().isoformat()
+
+# Function to book an appointment for a guest who is staying at the hotel
+def book_service_appointment(services_data, appointments_data, guest_data):
+    guest_id = input("Enter guest ID: ").strip()
+    guests = result_cache.find(guest_data, 'guest_id', guest_id)
+    if not guests:
+        print(f"No match found for guest ID '{guest_id}'.")
+        return
+    service = choose_service(services_data)
+    if service is None:
+        return
+    day = ask_date("Enter the appointment date")
+    time = input("Enter the appointment time (HH:MM): ").strip()
+    schedule = get_schedule(services_data, appointments_data)
+    appointment, error = book_appointment(appointments_data, schedule, guests[0], service['Service Name'], day, time)
+    if error:
+        print(error)
+        return
+    print(f"Appointment booked: {appointment['first_name']} {appointment['last_name']}, "
+          f"{appointment['service_name']} on {appointment['date']} at {appointment['time']}.")
+
+# Function to cancel an appointment of a guest
+def cancel_service_appointment(services_data, appointments_data):
+    guest_id = input("Enter guest ID: ").strip()
+    schedule = get_schedule(services_data, appointments_data)
+    appointments = guest_appointments(schedule, guest_id)
+    if not appointments:
+        print(f"Guest {guest_id} has no appointments.")
+        return
+    for idx, appointment in enumerate(appointments, start=1):
+        print(f"{idx}. {appointment['service_name']} on {appointment['date']} at {appointment['time']}")
+    choice = input("Choose the appointment to cancel by number: ").strip()
+    if not (choice.isdigit() and 1 <= int(choice) <= len(appointments)):
+        print("Invalid choice. Please try again.")
+        return
+    appointment = appointments[int(choice) - 1]
+    error = cancel_appointment(appointments_data, schedule, guest_id, appointment['service_name'],
+                               appointment['date'], appointment['time'])
+    print(error or "The appointment has been canceled.")
+
+# Function to list the appointments of a guest
+def show_guest_appointments(services_data, appointments_data):
+    guest_id = input("Enter guest ID: ").strip()
+    appointments = guest_appointments(get_schedule(services_data, appointments_data), guest_id)
+    if not appointments:
+        print(f"Guest {guest_id} has no appointments.")
+        return
+    print(f"\nAppointments of guest {guest_id}:")
+    for appointment in appointments:
+        print(f"{appointment['date']} {appointment['time']}  {appointment['service_name']}")
+
+# Function to find the first slot of a service with a free place
+def show_next_free_slot(services_data, appointments_data):
+    service = choose_service(services_data)
+    if service is None:
+        return
+    day = ask_date("From which date")
+    time = input("From which time (HH:MM, leave empty for the start of the day): ").strip() or '00:00'
+    schedule = get_schedule(services_data, appointments_data)
+    if not find_service(schedule, service['Service Name'])['open']:
+        print(f"The working hours of {service['Service Name']} ('{service.get('Working Hours')}') have no bookable slots.")
+        return
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    try:
+        slot = next_free_slot(schedule, service['Service Name'], day, time)
+    except ValueError as e:
+        print(e)
+        return
+    if slot:
+        print(f"The next free slot of {service['Service Name']} is on {slot[0]} at {slot[1]}.")
+    else:
+        print(f"{service['Service Name']} is fully booked for the next {SEARCH_DAYS} days.")
+
+# Function to list the services that are open right now
+def show_open_services(services_data, appointments_data):
+    services = open_services(get_schedule(services_data, appointments_data))
+    if not services:
+        print("No service is open right now.")
+        return
+    print(f"\n{'Service':<36}{'Capacity':>9}{'Free now':>10}")
+    for service, free in services:
+        print(f"{service['name']:<36}{service['capacity']:>9}{free:>10}")
+
 # Main function to handle hotel services operations
-def services_operations(services_data):
+def services_operations(services_data, appointments_data=None, guest_data=None):
     while True:
         # Display the main menu for service operations
         print("\nHotel Services Operations:")
         print("1. See the list of hotel services")
         print("2. Get specific service information")
-        print("3. Go back")
+        print("3. Book an appointment")
+        print("4. Cancel an appointment")
+        print("5. Show a guest's appointments")
+        print("6. Find the next free slot of a service")
+        print("7. Services open now")
+        print("8. Go back")
 
         # Prompt the user to choose an operation
-        choice = input("Choose an operation: ").strip()
+        choice = diagnostics.ask_menu_choice('services', "Choose an operation: ").strip()
 
         # Option 1: Display the list of all hotel services
         if choice == "1":
@@ -58,8 +169,27 @@ def services_operations(services_data):
         elif choice == "2":
             get_service_by_number(services_data)
 
-        # Option 3: Exit the loop and return to the previous menu
+        # Options 3 to 7: appointments, which need the appointments and the guests
+        elif choice in ("3", "4", "5", "6", "7") and (appointments_data is None or guest_data is None):
+            print("Appointments are not available.")
+
         elif choice == "3":
+            book_service_appointment(services_data, appointments_data, guest_data)
+
+        elif choice == "4":
+            cancel_service_appointment(services_data, appointments_data)
+
+        elif choice == "5":
+            show_guest_appointments(services_data, appointments_data)
+
+        elif choice == "6":
+            show_next_free_slot(services_data, appointments_data)
+
+        elif choice == "7":
+            show_open_services(services_data, appointments_data)
+
+        # Option 8: Exit the loop and return to the previous menu
+        elif choice == "8":
             break
 
         # Handle invalid input with an error message
@@ -0,0 +1,50 @@
+import os
+import pickle
+
+# Helper functions for the binary snapshot cache of parsed CSV files.
+#
+# Next to every CSV file a pickled copy of its parsed rows is kept ("Guest.csv.cache").
+# It is only used while the CSV still has the size and modification time it had when the
+# snapshot was written; otherwise the CSV is parsed again and the snapshot is rebuilt.
+
+SNAPSHOT_SUFFIX = '.cache'
+SNAPSHOT_VERSION = 1
+
+# Function to get the snapshot file that belongs to a CSV file
+def snapshot_path(file_path):
+    return file_path + SNAPSHOT_SUFFIX
+
+# Function to describe the CSV file so that a stale snapshot can be recognised
+def csv_signature(file_path):
+    stat = os.stat(file_path)
+    return (SNAPSHOT_VERSION, stat.st_size, stat.st_mtime_ns)
+
+# Function to load the parsed rows from the snapshot; returns None when there is no usable snapshot
+def load_snapshot(file_path, record_class=None):
+    try:
+        with open(snapshot_path(file_path), 'rb') as file:
+            snapshot = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    if snapshot.get('signature') != csv_signature(file_path):
+        return None
+    if snapshot.get('record_class') != (record_class.__name__ if record_class else None):
+        return None
+    return snapshot['fieldnames'], snapshot['rows']
+
+# Function to write the parsed rows of a CSV file to its snapshot
+def save_snapshot(file_path, fieldnames, rows, record_class=None):
+    snapshot = {
+        'signature': csv_signature(file_path),
+        'record_class': record_class.__name__ if record_class else None,
+        'fieldnames': fieldnames,
+        'rows': rows,
+    }
+    temp_path = snapshot_path(file_path) + '.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path(file_path))
+    except OSError:
+        # The cache is only an optimisation; a read-only directory simply means no cache
+        pass
@@ -0,0 +1,248 @@
+import os
+import sqlite3
+import time
+import diagnostics
+from dataset import Dataset
+
+# SQLite storage backend for the datasets.
+#
+# The CSV files become tables of one database file, created once with
+# `python system.py --migrate hotel.db`. Every column holds the CSV text and compares
+# case-insensitively, and the columns the menus search on are indexed. Rows are only read when
+# they are needed: find(), find_prefix() and find_range() run as indexed SQL queries, and the whole
+# table is read only when something iterates over the dataset. Every change is a single UPDATE,
+# INSERT or DELETE statement, committed right away or at the end of a batch.
+#
+# A row read from the database is kept for as long as it exists, so the same row is always the
+# same object, as with the CSV backend; changes to it are written back by its rowid.
+
+# Table name and indexed columns for each CSV file
+TABLES = {
+    'Guest.csv': ('guests', ['guest_id', 'first_name', 'last_name', 'check_in_date', 'check_out_date', 'room_id']),
+    'Future booking.csv': ('bookings', ['first_name', 'last_name', 'reserved_from', 'reserved_to', 'room_id']),
+    'Companies.csv': ('companies', ['Company Name', 'Company Type']),
+    'Hotel_Services.csv': ('services', []),
+    'Appointments.csv': ('appointments', ['guest_id', 'service_name', 'date']),
+}
+
+# One connection per database file, shared by its datasets, so that a batch touching several
+# tables is one transaction instead of several writers locking each other out
+_connections = {}
+
+# Function to get the shared connection to a database file
+def open_connection(db_path):
+    if db_path not in _connections:
+        _connections[db_path] = sqlite3.connect(db_path, check_same_thread=False)
+    return _connections[db_path]
+
+# Function to get the table name and indexed columns for a CSV file
+def table_for(file_path):
+    file_name = os.path.basename(file_path)
+    default_name = os.path.splitext(file_name)[0].lower().replace(' ', '_')
+    return TABLES.get(file_name, (default_name, []))
+
+# Function to quote a table or column name for SQL (column names may contain spaces)
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# Function to escape the wildcard characters of a LIKE pattern
+def like_prefix(prefix):
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+# Function to create an empty table with a text column per field
+def create_table(connection, table, fieldnames):
+    columns = ', '.join(f"{quote(field)} TEXT COLLATE NOCASE" for field in fieldnames)
+    connection.execute(f"CREATE TABLE {quote(table)} ({columns})")
+
+# Function to index the searched columns of a table
+def create_indexes(connection, table, indexed, fieldnames):
+    for field in indexed:
+        if field in fieldnames:
+            index_name = f"{table}_{field.lower().replace(' ', '_')}"
+            connection.execute(f"CREATE INDEX {quote(index_name)} ON {quote(table)} ({quote(field)})")
+
+# Function to copy CSV datasets into a new SQLite database; returns {table: row count}
+def migrate(db_path, datasets):
+    counts = {}
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            for dataset in datasets:
+                table, indexed = table_for(dataset.file_path)
+                rows = dataset.rows
+                fieldnames = list(dataset.fieldnames)
+                connection.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+                create_table(connection, table, fieldnames)
+                placeholders = ', '.join('?' * len(fieldnames))
+                if dataset.record_class is not None:
+                    values = (row.values() for row in rows)
+                else:
+                    values = ([row.get(field) or '' for field in fieldnames] for row in rows)
+                connection.executemany(f"INSERT INTO {quote(table)} VALUES ({placeholders})", values)
+                # Indexes are built after the rows are in, which is much faster than updating them row by row
+                create_indexes(connection, table, indexed, fieldnames)
+                counts[table] = len(rows)
+    finally:
+        connection.close()
+    return counts
+
+class SqliteDataset(Dataset):
+    def __init__(self, db_path, file_path, record_class=None, missing_ok=False):
+        super().__init__(file_path, record_class, missing_ok)
+        self.db_path = db_path
+        self.table = table_for(file_path)[0]
+        self.connection = None
+        self.columns = None
+        self.by_rowid = {}
+        self.rowid_of = {}      # id(row) -> rowid
+
+    # Function to open the database and read the columns of the table on first use
+    def connect(self):
+        if self.connection is None:
+            connection = open_connection(self.db_path)
+            fieldnames = [column[1] for column in connection.execute(f"PRAGMA table_info({quote(self.table)})")]
+            if not fieldnames and self.missing_ok:
+                # A database migrated before the file existed; it starts out as an empty table
+                fieldnames = list(self.requested_class.FIELDS)
+                with connection:
+                    create_table(connection, self.table, fieldnames)
+                    create_indexes(connection, self.table, table_for(self.file_path)[1], fieldnames)
+            if not fieldnames:
+                raise FileNotFoundError(f"Table '{self.table}' not found in '{self.db_path}'. "
+                                        f"Create it with: python system.py --migrate {self.db_path}")
+            record_class = self.requested_class
+            if record_class is not None and tuple(fieldnames) != tuple(record_class.FIELDS):
+                record_class = None
+            self.connection, self.fieldnames, self.record_class = connection, fieldnames, record_class
+            self.columns = ', '.join(quote(field) for field in fieldnames)
+        return self.connection
+
+    # Function to turn a database row into the dataset's row object, reusing the one already read
+    def _row(self, rowid, values):
+        row = self.by_rowid.get(rowid)
+        if row is None:
+            row = self.record_class(values) if self.record_class else dict(zip(self.fieldnames, values))
+            self.by_rowid[rowid] = row
+            self.rowid_of[id(row)] = rowid
+        return row
+
+    # Function to run a SELECT over the table and return the matching rows
+    def _select(self, where='', parameters=(), order='rowid'):
+        cursor = self.connect().execute(
+            f"SELECT rowid, {self.columns} FROM {quote(self.table)} {where} ORDER BY {order}", parameters)
+        return [self._row(rowid, values) for rowid, *values in cursor]
+
+    # Function to turn extra keyword conditions into SQL, e.g. last_name='Smith'
+    def _conditions(self, conditions):
+        return ''.join(f" AND {quote(field)} = ?" for field in conditions), [str(value).strip() for value in conditions.values()]
+
+    def _rowid(self, row):
+        rowid = self.rowid_of.get(id(row))
+        if rowid is None or self.by_rowid.get(rowid) is not row:
+            raise ValueError("Row is not part of this dataset.")
+        return rowid
+
+    # Function to check whether a row object is still part of the table, without reading the table
+    def contains(self, row):
+        rowid = self.rowid_of.get(id(row))
+        return rowid is not None and self.by_rowid.get(rowid) is row
+
+    # Function to find the position of a row among the rows, which are in rowid order; the position
+    # is found by bisecting their rowids, or counted by the database when the table has not been read
+    def position(self, row):
+        rowid = self._rowid(row)
+        if self._rows is None:
+            return self.connect().execute(f"SELECT COUNT(*) FROM {quote(self.table)} WHERE rowid < ?",
+                                          [rowid]).fetchone()[0]
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.rowid_of[id(self._rows[middle])] < rowid:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self._rows) or self._rows[low] is not row:
+            raise ValueError("Row is not part of this dataset.")
+        return low
+
+    # Function to read the whole table, in the order the rows were added
+    def load(self):
+        start = time.perf_counter()
+        self._rows = self._select()
+        if diagnostics.enabled:
+            diagnostics.record_load(self.file_path, 'sqlite', time.perf_counter() - start, len(self._rows))
+
+    def find(self, field, value, **conditions):
+        extra, parameters = self._conditions(conditions)
+        return self._found(self._select(f"WHERE {quote(field)} = ?{extra}", [str(value).strip()] + parameters))
+
+    def find_prefix(self, field, prefix, **conditions):
+        extra, parameters = self._conditions(conditions)
+        return self._found(self._select(f"WHERE {quote(field)} LIKE ? ESCAPE '\\'{extra}",
+                                        [like_prefix(prefix.strip())] + parameters, f"{quote(field)}, rowid"))
+
+    def find_range(self, field, start, end):
+        return self._found(self._select(f"WHERE {quote(field)} >= ? AND {quote(field)} < ?", [start, end],
+                                        f"{quote(field)}, rowid"))
+
+    # The indexes live in the database, so there is nothing to build
+    def prepare(self, *fields):
+        self.connect()
+
+    # Function to commit a change right away, or leave it for end_batch() or take_pending()
+    def _commit(self, op):
+        if self.deferred:
+            self.dirty = True
+        elif self.pending is not None:
+            self.pending.append(op)
+        else:
+            self.connection.commit()
+
+    def update(self, row, changes, position=None):
+        rowid = self._rowid(row)
+        old_values = {field: row.get(field) for field in changes}
+        row.update(changes)
+        assignments = ', '.join(f"{quote(field)} = ?" for field in changes)
+        self.connection.execute(f"UPDATE {quote(self.table)} SET {assignments} WHERE rowid = ?",
+                                [row.get(field) for field in changes] + [rowid])
+        self._commit('update')
+        self._notify('update', row, old_values)
+        return old_values
+
+    def append(self, row):
+        self.connect()
+        row = self.make_row(row)
+        placeholders = ', '.join('?' * len(self.fieldnames))
+        cursor = self.connection.execute(f"INSERT INTO {quote(self.table)} ({self.columns}) VALUES ({placeholders})",
+                                         [row.get(field) or '' for field in self.fieldnames])
+        self.by_rowid[cursor.lastrowid] = row
+        self.rowid_of[id(row)] = cursor.lastrowid
+        if self._rows is not None:
+            self._rows.append(row)
+        self._commit('insert')
+        self._notify('insert', row)
+        return row
+
+    def remove(self, row, position=None):
+        rowid = self._rowid(row)
+        self.connection.execute(f"DELETE FROM {quote(self.table)} WHERE rowid = ?", [rowid])
+        if self._rows is not None:
+            del self._rows[self.position(row) if position is None else position]
+        del self.by_rowid[rowid]
+        del self.rowid_of[id(row)]
+        self._commit('delete')
+        self._notify('delete', row)
+
+    # Function to commit all changes that are not committed yet
+    def save(self):
+        if self.connection is not None:
+            self.connection.commit()
+        self.dirty = False
+        if self.pending is not None:
+            self.pending = []
+        self.written()
+
+    # The changes are already in the database; committing them is all that is left to do
+    def take_pending(self):
+        self.save()
+        return []
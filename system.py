@@ -1,60 +1,104 @@
-import csv
-from datetime import datetime, timedelta
+import os
+import sys
 from company_operations import company_operations
-from tracking_future_bookings import track_bookings_operations
+from tracking_future_bookings import track_bookings_operations, check_booking_dates, check_room_conflict
 from service_operations import services_operations
+from dataset import Dataset
+from sqlite_store import SqliteDataset, migrate
+from partitions import PartitionedDataset, is_partitioned, partition_csv, archive_closed_months
+from mapped_csv import MappedDataset
+from chain import CHAIN, Chain, chain_operations
+from records import GuestRecord, BookingRecord, CompanyRecord, ServiceRecord, AppointmentRecord
+from room_availability import build_availability, update_availability
+from guest_identity import get_identity_index
+from date_queries import STAY_DATES, show_arrivals_and_departures, show_in_house
+from daily_views import get_daily_views, check_views, rebuild_views, show_day_lists
+from change_log import ChangeLog, track, export_changes
+import diagnostics
+import result_cache
 
-# Load datasets
-def load_csv(file_path):
-    with open(file_path, 'r') as file:
-        reader = csv.DictReader(file)
-        return list(reader)
+# Storage: the CSV files, or the SQLite database named by the HOTEL_DB environment variable
+# (create it from the CSV files with: python system.py --migrate hotel.db)
+DATABASE = os.environ.get('HOTEL_DB')
 
-def save_to_csv(file_path, data, fieldnames):
-    """Save the updated data back to the CSV file."""
-    with open(file_path, 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+# Lookup-only terminals (HOTEL_READ_ONLY=1) open Guest.csv read-only and look guests up by ID in the
+# memory-mapped file instead of reading it all (see mapped_csv.py)
+READ_ONLY = os.environ.get('HOTEL_READ_ONLY') == '1'
+READ_ONLY_MESSAGE = "Guest.csv is open read-only on this terminal (HOTEL_READ_ONLY)."
 
-guest_data = load_csv('Guest.csv')
-company_data = load_csv('Companies.csv')
-booking_data = load_csv('Future booking.csv')
-services_data = load_csv('Hotel_Services.csv')
+# Function to open a CSV file, or its monthly partitions if it has been split (see partitions.py)
+def csv_dataset(file_path, record_class=None, missing_ok=False):
+    if is_partitioned(file_path):
+        return PartitionedDataset(file_path, record_class)
+    return Dataset(file_path, record_class, missing_ok)
+
+# Load datasets (the CSV file plus any changes journaled since it was last written, or its database table).
+# Nothing is read here; each dataset is read the first time one of its menus uses it.
+# key_field is the field a read-only terminal looks rows up by without reading the whole file.
+# missing_ok is for files added in later versions, which start out empty (see Dataset).
+def load_csv(file_path, record_class=None, key_field=None, missing_ok=False):
+    if DATABASE:
+        return SqliteDataset(DATABASE, file_path, record_class, missing_ok)
+    if READ_ONLY and key_field and not is_partitioned(file_path):
+        return MappedDataset(file_path, record_class, key_field)
+    return csv_dataset(file_path, record_class, missing_ok)
+
+guest_data = load_csv('Guest.csv', GuestRecord, key_field='guest_id')
+company_data = load_csv('Companies.csv', CompanyRecord)
+booking_data = load_csv('Future booking.csv', BookingRecord)
+services_data = load_csv('Hotel_Services.csv', ServiceRecord)
+appointments_data = load_csv('Appointments.csv', AppointmentRecord, missing_ok=True)
+
+# Every change to the stays, companies and bookings is numbered and recorded in the change log
+# (see change_log.py), so that accounting and the CRM can copy only what changed
+change_log = ChangeLog()
+track(change_log, guest_data, company_data, booking_data)
+
+# Room occupancy from current stays and future bookings, used to avoid double-booking (built on first use)
+room_availability = None
+
+def get_room_availability():
+    global room_availability
+    if room_availability is None:
+        room_availability = build_availability(guest_data, booking_data)
+        guest_data.on_change(lambda op, row, old_values: update_availability(room_availability, op, row, old_values))
+        booking_data.on_change(lambda op, row, old_values: update_availability(room_availability, op, row, old_values))
+        # Everything that checks the availability can change stays and bookings, which the daily views follow
+        get_front_office_views()
+    return room_availability
+
+# Arrivals, departures and in-house counts per day (see daily_views.py). They are opened before stays and
+# bookings change so that they follow the changes, instead of being built again on the next start.
+def get_front_office_views():
+    return get_daily_views(guest_data, booking_data)
 
 def search_guest_by_name(name):
-    try:
-        results = [guest for guest in guest_data if 'first_name' in guest and name.lower() in guest['first_name'].lower()]
-        if len(results) > 1:
-            print(f"Multiple guests found with the name '{name}'. Please provide the last name.")
-            last_name = input("Enter last name: ").strip().lower()
-            results = [guest for guest in results if 'last_name' in guest and last_name == guest['last_name'].strip().lower()]
-        if not results:
-            print(f"No match found for the name '{name}'. Check the available names in the dataset.")
-        return results
-    except KeyError:
-        print("Error: 'first_name' or 'last_name' column not found in the dataset. Available keys are:", guest_data[0].keys())
-        return []
+    results = result_cache.find_prefix(guest_data, 'first_name', name)
+    if len(results) > 1:
+        print(f"Multiple guests found with the name '{name}'. Please provide the last name.")
+        last_name = input("Enter last name: ").strip()
+        results = result_cache.find_prefix(guest_data, 'first_name', name, last_name=last_name)
+    if not results:
+        print(f"No match found for the name '{name}'. Check the available names in the dataset.")
+    return results
+
+# Function to find a guest by ID; returns None if there is no such guest
+def find_guest(guest_id):
+    guests = result_cache.find(guest_data, 'guest_id', guest_id)
+    return guests[0] if guests else None
 
 def search_guest_by_id(guest_id):
-    try:
-        results = [guest for guest in guest_data if 'guest_id' in guest and guest['guest_id'] == guest_id]
-        if not results:
-            print(f"No match found for guest ID '{guest_id}'.")
-        return results
-    except KeyError:
-        print("Error: 'guest_id' column not found in the dataset. Available keys are:", guest_data[0].keys())
+    guest = find_guest(guest_id)
+    if guest is None:
+        print(f"No match found for guest ID '{guest_id}'.")
         return []
+    return [guest]
 
 def search_guests_by_checkin_date(checkin_date):
-    try:
-        results = [guest for guest in guest_data if 'check_in_date' in guest and guest['check_in_date'] == checkin_date]
-        if not results:
-            print(f"No guests found for the check-in date '{checkin_date}'.")
-        return results
-    except KeyError:
-        print("Error: 'check_in_date' column not found in the dataset. Available keys are:", guest_data[0].keys())
-        return []
+    results = result_cache.find(guest_data, 'check_in_date', checkin_date)
+    if not results:
+        print(f"No guests found for the check-in date '{checkin_date}'.")
+    return results
 
 def display_guest_info(guest):
     print("\nGuest Information:")
@@ -63,18 +107,25 @@ def display_guest_info(guest):
     print()
 
 def modify_guest_data(guest_id, updates):
-    for guest in guest_data:
-        if 'guest_id' in guest and guest['guest_id'] == guest_id:
-            for field, new_value in updates.items():
-                if field in guest:
-                    guest[field] = new_value
-                else:
-                    print(f"Error: Field '{field}' not found in the dataset.")
-                    return False
-            save_to_csv('Guest.csv', guest_data, guest.keys())
-            return True
-    print("Guest ID not found.")
-    return False
+    if isinstance(guest_data, MappedDataset):
+        # Refused before the daily views are opened, which would read the whole file
+        print(f"Error: {READ_ONLY_MESSAGE}")
+        return False
+    guest = find_guest(guest_id)
+    if guest is None:
+        print("Guest ID not found.")
+        return False
+    for field in updates:
+        if field not in guest:
+            print(f"Error: Field '{field}' not found in the dataset.")
+            return False
+    get_front_office_views()
+    try:
+        guest_data.update(guest, updates)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    return True
 
 def ask_to_go_back():
     while True:
@@ -93,18 +144,24 @@ def ask_to_go_back():
         else:
             print("Invalid input. Please type 'yes' or 'no'.")
 
-def validate_dates(checkin_date, checkout_date):
-    today = datetime.now().date()
-    checkin = datetime.strptime(checkin_date, "%Y-%m-%d").date()
-    checkout = datetime.strptime(checkout_date, "%Y-%m-%d").date()
-
-    if checkin <= today:
-        print("Check-in date must be from tomorrow onwards.")
-        return False
-    if checkout <= checkin:
-        print("Check-out date must be after the check-in date.")
-        return False
-    return True
+# Function to change a guest's check-out date without prompting; returns an error message or None
+def change_checkout_date(guest_id, new_checkout):
+    if isinstance(guest_data, MappedDataset):
+        # Refused before the room check, which would take the guest's own stay for a conflict
+        return READ_ONLY_MESSAGE
+    guest = find_guest(guest_id)
+    if guest is None:
+        return "Guest ID not found."
+    error = (check_booking_dates(guest['check_in_date'], new_checkout) or
+             check_room_conflict(get_room_availability(), guest['room_id'], guest['check_in_date'], new_checkout, ignore=guest))
+    if error:
+        return error
+    try:
+        guest_data.update(guest, {'check_out_date': new_checkout})
+    except ValueError as e:
+        # Archived months are read-only
+        return str(e)
+    return None
 
 def guest_operations():
     while True:
@@ -113,9 +170,12 @@ def guest_operations():
         print("2. Search guest by ID")
         print("3. Search guests by check-in date")
         print("4. Change check-out date")
-        print("5. Go back")
+        print("5. Arrivals and departures between two dates")
+        print("6. Guests in-house on a night")
+        print("7. Front office lists for a day")
+        print("8. Go back")
 
-        choice = input("Choose an operation: ")
+        choice = diagnostics.ask_menu_choice('guest', "Choose an operation: ")
 
         if choice == "1":
             name = input("Enter guest name to search: ")
@@ -147,24 +207,52 @@ def guest_operations():
         elif choice == "4":
             guest_id = input("Enter guest ID to modify: ")
             new_checkout = input("Enter new check-out date (YYYY-MM-DD): ")
-            checkin_date = next((guest['check_in_date'] for guest in guest_data if guest['guest_id'] == guest_id), None)
-            if checkin_date and validate_dates(checkin_date, new_checkout):
-                success = modify_guest_data(guest_id, {'check_out_date': new_checkout})
-            else:
-                success = False
+            error = change_checkout_date(guest_id, new_checkout)
 
-            if success:
-                print("Modification successful.")
-            else:
+            if error:
+                print(error)
                 print("Guest ID not found or field is incorrect.")
+            else:
+                print("Modification successful.")
 
         elif choice == "5":
+            show_arrivals_and_departures(guest_data, STAY_DATES)
+
+        elif choice == "6":
+            show_in_house(guest_data, STAY_DATES)
+
+        elif choice == "7":
+            show_day_lists(guest_data, booking_data)
+
+        elif choice == "8":
             break
 
         else:
             print("Invalid choice. Please try again.")
 
+def reports_menu():
+    # The reports use NumPy, which the rest of the system does not need
+    try:
+        from analytics import reports_operations
+    except ImportError:
+        print("Reports need the NumPy package. Install it with: pip install numpy")
+        return
+    reports_operations(guest_data, booking_data)
+
+# Searches across all properties of the chain (see chain.py); the worker processes start on first use
+chain = None
+
+def chain_menu():
+    global chain
+    if not CHAIN:
+        print("Set HOTEL_CHAIN to the directory that holds one directory per property to search the whole chain.")
+        return
+    if chain is None:
+        chain = Chain(CHAIN)
+    chain_operations(chain)
+
 def main():
+    diagnostics.enable_from_environment()
     while True:
         print("\nWELCOME TO PYTHON HOTEL SYSTEM")
         print("Hotel Management System:")
@@ -172,23 +260,98 @@ def main():
         print("2. Work with Company Information")
         print("3. Track Bookings")
         print("4. Manage Services")
-        print("5. Exit")
+        print("5. Reports")
+        print("6. Diagnostics")
+        print("7. Chain-wide search")
+        print("8. Exit")
 
-        main_choice = input("Choose an option: ")
+        main_choice = diagnostics.ask_menu_choice('main', "Choose an option: ")
 
         if main_choice == "1":
             guest_operations()
         elif main_choice == "2":
             company_operations(company_data)
         elif main_choice == "3":
-            track_bookings_operations(booking_data)
+            track_bookings_operations(booking_data, get_room_availability(), get_identity_index(guest_data, booking_data))
         elif main_choice == "4":
-            services_operations(services_data)
+            services_operations(services_data, appointments_data, guest_data)
         elif main_choice == "5":
+            reports_menu()
+        elif main_choice == "6":
+            diagnostics.diagnostics_operations()
+        elif main_choice == "7":
+            chain_menu()
+        elif main_choice == "8":
+            diagnostics.finish_operation()
             print("Thank you for using Python Hotel System!")
             break
         else:
             print("Invalid choice. Please try again.")
 
+# Function to copy the CSV files (with their journaled changes) into a new SQLite database
+def migrate_to_sqlite(db_path):
+    datasets = [csv_dataset('Guest.csv', GuestRecord), Dataset('Companies.csv', CompanyRecord),
+                Dataset('Future booking.csv', BookingRecord), Dataset('Hotel_Services.csv', ServiceRecord),
+                Dataset('Appointments.csv', AppointmentRecord, missing_ok=True)]
+    counts = migrate(db_path, datasets)
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+    print(f"Data copied to '{db_path}'. Use it with: HOTEL_DB={db_path} python system.py")
+
+# Function to split Guest.csv into monthly partitions by check-in date
+def partition_guests():
+    if is_partitioned('Guest.csv'):
+        print("Guest.csv is already partitioned.")
+        return
+    counts = partition_csv('Guest.csv', GuestRecord)
+    print(f"Guest.csv split into {len(counts)} monthly partitions ({sum(counts.values())} stays) in 'Guest.csv.partitions'.")
+    print("The original file was kept as Guest.csv.bak.")
+
+# Function to compare the daily views with a full rebuild from the CSV files
+def check_daily_views():
+    differences = check_views(guest_data, booking_data)
+    for difference in differences:
+        print(difference)
+    if differences:
+        rebuild_views(guest_data, booking_data, get_front_office_views())
+        print(f"{len(differences)} difference(s) found; the daily views have been built again.")
+    else:
+        print("The daily views match the CSV files.")
+
+# Function to compress the months whose guests have all checked out
+def archive_guests():
+    if not is_partitioned('Guest.csv'):
+        print("Guest.csv is not partitioned yet. Run: python system.py --partition")
+        return
+    archived = archive_closed_months(PartitionedDataset('Guest.csv', GuestRecord))
+    for month, count in archived:
+        print(f"{month}: {count} stays archived")
+    print(f"{len(archived)} closed month(s) archived.")
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--partition':
+        # Split the stay history into monthly files: python system.py --partition
+        partition_guests()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--export-changes':
+        # Changes after a sequence number as JSONL: python system.py --export-changes [since] [output.jsonl]
+        export_changes(int(sys.argv[2]) if len(sys.argv) > 2 else 0, sys.argv[3] if len(sys.argv) > 3 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--check-views':
+        # Compare the daily views with a full rebuild: python system.py --check-views
+        check_daily_views()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--archive':
+        # Compress closed months: python system.py --archive
+        archive_guests()
+    elif len(sys.argv) > 2 and sys.argv[1] == '--import':
+        # Bulk import of a partner feed: python system.py --import feed.csv [rejects.csv] [workers]
+        from bulk_import import run_import
+        run_import(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None,
+                   int(sys.argv[4]) if len(sys.argv) > 4 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--migrate':
+        # One-shot copy of the CSV files into SQLite: python system.py --migrate hotel.db
+        migrate_to_sqlite(sys.argv[2] if len(sys.argv) > 2 else 'hotel.db')
+    elif len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        # Non-interactive mode: python system.py --batch commands.jsonl [results.jsonl]
+        from batch import run_batch_file
+        run_batch_file(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        main()
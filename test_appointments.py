@@ -0,0 +1,51 @@
+import csv
+import os
+import sqlite3
+import subprocess
+import sys
+from generate_data import generate_dataset
+from records import AppointmentRecord
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Books the first guest into the fitness center on the day they check in and writes the file
+BOOK = """
+import system
+from appointments import get_schedule, book_appointment
+schedule = get_schedule(system.services_data, system.appointments_data)
+guest = system.guest_data.rows[0]
+appointment, error = book_appointment(system.appointments_data, schedule, guest, 'Fitness Center',
+                                      guest['check_in_date'], '09:00')
+assert error is None, error
+system.appointments_data.save()
+print(len(system.appointments_data))
+"""
+
+def run(directory, *args, env=None):
+    result = subprocess.run([sys.executable, *args], cwd=directory, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=SOURCE_DIRECTORY, **(env or {})))
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+# A data directory from before appointments existed
+def old_directory(tmp_path):
+    generate_dataset(str(tmp_path), guests=50, bookings=20, companies=5, seed=1)
+    os.remove(tmp_path / 'Appointments.csv')
+    return str(tmp_path)
+
+def test_missing_appointments_file_is_an_empty_table(tmp_path):
+    directory = old_directory(tmp_path)
+    assert run(directory, '-c', BOOK).split() == ['1']
+    with open(tmp_path / 'Appointments.csv', newline='') as file:
+        rows = list(csv.reader(file))
+    assert tuple(rows[0]) == AppointmentRecord.FIELDS
+    assert len(rows) == 2
+
+def test_missing_appointments_file_with_sqlite(tmp_path):
+    directory = old_directory(tmp_path)
+    run(directory, os.path.join(SOURCE_DIRECTORY, 'system.py'), '--migrate', 'hotel.db')
+    # As migrated by a version without appointments
+    with sqlite3.connect(tmp_path / 'hotel.db') as connection:
+        connection.execute('DROP TABLE appointments')
+    assert run(directory, '-c', BOOK, env={'HOTEL_DB': 'hotel.db'}).split() == ['1']
+    assert not os.path.exists(tmp_path / 'Appointments.csv')
@@ -0,0 +1,106 @@
+import json
+import os
+import random
+from change_log import ChangeLog, track, read_changes, export_changes
+from dataset import Dataset, batch_writes
+from generate_data import generate_bookings, make_rooms, write_csv
+from records import BookingRecord
+
+def make_file(directory, count=100):
+    path = os.path.join(directory, 'Future booking.csv')
+    write_csv(path, generate_bookings(count, random.Random(31), make_rooms(bookings=count)), BookingRecord.FIELDS)
+    return path
+
+def rows_of(dataset):
+    return sorted(tuple(sorted(dict(row).items())) for row in dataset)
+
+# Function to make one change of each kind in turn
+def change(dataset, rng, number):
+    choice = number % 3
+    if choice == 0:
+        dataset.append({'room_id': '', 'first_name': 'Test', 'last_name': f"Guest{number}",
+                        'phone_number': '+1-555-0100', 'reserved_from': '2031-01-01', 'reserved_to': '2031-01-03'})
+    elif choice == 1:
+        dataset.update(rng.choice(dataset.rows), {'last_name': f"Moved{number}"})
+    else:
+        dataset.remove(rng.choice(dataset.rows))
+
+# Function to apply the logged changes to a copy of the original rows, as a downstream system would
+def apply_changes(rows, records):
+    rows = list(rows)
+    for record in records:
+        if record['op'] != 'insert':
+            rows.remove(tuple(sorted(record['before'].items())))
+        if record['op'] != 'delete':
+            rows.append(tuple(sorted(record['after'].items())))
+    return sorted(rows)
+
+def test_log_replays_to_the_dataset(tmp_path):
+    path = make_file(tmp_path)
+    original = rows_of(Dataset(path, BookingRecord))
+    log = ChangeLog(os.path.join(tmp_path, 'changes.jsonl'))
+    dataset = Dataset(path, BookingRecord)
+    track(log, dataset)
+    rng = random.Random(32)
+    for number in range(30):
+        change(dataset, rng, number)
+    # A batch is logged once its file is written
+    with batch_writes(dataset):
+        for number in range(30, 60):
+            change(dataset, rng, number)
+    # Changes held back by the server are logged when they are written
+    dataset.hold_writes()
+    for number in range(60, 90):
+        change(dataset, rng, number)
+    dataset.save()
+    log.close()
+    records = list(read_changes(log.path))
+    assert [record['seq'] for record in records] == list(range(1, 91))
+    assert apply_changes(original, records) == rows_of(dataset) == rows_of(Dataset(path, BookingRecord))
+
+def test_numbers_continue_across_terminals_and_restarts(tmp_path):
+    path = make_file(tmp_path)
+    log_path = os.path.join(tmp_path, 'changes.jsonl')
+    first, second = Dataset(path, BookingRecord), Dataset(path, BookingRecord)
+    first_log, second_log = ChangeLog(log_path), ChangeLog(log_path)
+    track(first_log, first)
+    track(second_log, second)
+    rng = random.Random(33)
+    for number in range(20):
+        # Appends only, so that both terminals can work on their own copy of the rows
+        change(first if number % 2 else second, rng, 0)
+    first_log.close()
+    # The first terminal is started again
+    restarted, third = ChangeLog(log_path), Dataset(path, BookingRecord)
+    track(restarted, third)
+    change(third, rng, 0)
+    restarted.close()
+    second_log.close()
+    assert [record['seq'] for record in read_changes(log_path)] == list(range(1, 22))
+
+def test_export_since_matches_a_full_read(tmp_path):
+    path = make_file(tmp_path)
+    log = ChangeLog(os.path.join(tmp_path, 'changes.jsonl'))
+    dataset = Dataset(path, BookingRecord)
+    track(log, dataset)
+    rng = random.Random(34)
+    for number in range(200):
+        change(dataset, rng, number)
+    log.close()
+    with open(log.path, 'rb') as file:
+        everything = [json.loads(line) for line in file]
+    for since in [0, 1, 2, 57, 100, 198, 199, 200, 500]:
+        assert list(read_changes(log.path, since)) == [record for record in everything if record['seq'] > since]
+    output = os.path.join(tmp_path, 'export.jsonl')
+    assert export_changes(150, output, log.path) == (50, 200)
+    with open(output) as file:
+        assert [json.loads(line) for line in file] == everything[150:]
+    # A record torn by a terminal that died while appending is not exported, and is dropped by the next writer
+    with open(log.path, 'ab') as file:
+        file.write(b'{"seq": 201, "time"')
+    assert [record['seq'] for record in read_changes(log.path, 195)] == [196, 197, 198, 199, 200]
+    log, dataset = ChangeLog(log.path), Dataset(path, BookingRecord)
+    track(log, dataset)
+    change(dataset, rng, 0)
+    log.close()
+    assert [record['seq'] for record in read_changes(log.path, 198)] == [199, 200, 201]
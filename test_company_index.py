@@ -0,0 +1,36 @@
+import csv
+import os
+from company_index import build_company_index, search_companies
+
+COMPANIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Companies.csv')
+
+def make_index(names):
+    return build_company_index([{'Company Name': name, 'Company Type': 'Direct Companies'} for name in names])
+
+def found_names(index, query, limit=None):
+    return [company['Company Name'] for company in search_companies(index, query, limit)]
+
+def test_three_letters_inside_a_word():
+    index = make_index(['Garcia-Larson', 'Smith Ltd', 'Arcadia Travel'])
+    for query in ['arc', 'rci', 'cia', 'ars']:
+        assert 'Garcia-Larson' in found_names(index, query)
+    assert set(found_names(index, 'arc')) == {'Garcia-Larson', 'Arcadia Travel'}
+
+def test_every_three_letter_substring_of_the_shipped_names():
+    with open(COMPANIES_CSV, newline='') as file:
+        names = [row['Company Name'] for row in csv.DictReader(file)]
+    index = make_index(names)
+    missed = []
+    for name in names:
+        folded = name.casefold()
+        for position in range(len(folded) - 2):
+            query = folded[position:position + 3]
+            if query.strip() == query and name not in found_names(index, query):
+                missed.append((query, name))
+    assert missed == []
+
+def test_substring_matches_come_first_and_typos_still_match():
+    index = make_index(['Garcia-Larson', 'Larsen Group', 'Smith Ltd'])
+    assert found_names(index, 'larson')[0] == 'Garcia-Larson'
+    assert 'Garcia-Larson' in found_names(index, 'garcai-larson')
+    assert found_names(index, 'smith', limit=1) == ['Smith Ltd']
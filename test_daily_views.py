@@ -0,0 +1,106 @@
+import os
+import random
+from datetime import date, timedelta
+from dataset import Dataset, batch_writes
+from daily_views import get_daily_views, rebuild_views, check_views, day_lists, data_signature, _save_on_exit, STAY, BOOKING
+from generate_data import generate_guests, generate_bookings, make_rooms, write_csv
+from records import GuestRecord, BookingRecord
+
+TABLES = ('arrivals', 'departures', 'in_house', 'room_types')
+
+def open_datasets(directory):
+    return (Dataset(os.path.join(directory, 'Guest.csv'), GuestRecord),
+            Dataset(os.path.join(directory, 'Future booking.csv'), BookingRecord))
+
+def make_files(directory, guests=300, bookings=200):
+    rng = random.Random(1)
+    rooms = make_rooms(guests, bookings)
+    write_csv(os.path.join(directory, 'Guest.csv'), generate_guests(guests, rng, rooms), GuestRecord.FIELDS)
+    write_csv(os.path.join(directory, 'Future booking.csv'), generate_bookings(bookings, rng, rooms), BookingRecord.FIELDS)
+
+def shifted(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+# Function to make one random change: a new booking, new dates, a new room or a cancellation
+def random_change(rng, guest_data, booking_data):
+    choice = rng.randrange(6)
+    if choice == 0:
+        start = shifted(date.today().isoformat(), rng.randint(1, 60))
+        booking_data.append({'room_id': rng.choice(['', 'ST001', 'SU002', 'TW010']), 'first_name': 'Test',
+                             'last_name': f"Guest{rng.randrange(1000)}", 'phone_number': '+1-555-0100',
+                             'reserved_from': start, 'reserved_to': shifted(start, rng.randint(1, 7))})
+    elif choice == 1 and len(booking_data):
+        booking = booking_data[rng.randrange(len(booking_data))]
+        start = shifted(booking['reserved_from'], rng.randint(-3, 3))
+        booking_data.update(booking, {'reserved_from': start, 'reserved_to': shifted(start, rng.randint(1, 7))})
+    elif choice == 2 and len(booking_data):
+        booking_data.remove(booking_data[rng.randrange(len(booking_data))])
+    elif choice == 3:
+        stay = guest_data[rng.randrange(len(guest_data))]
+        guest_data.update(stay, {'check_out_date': shifted(stay['check_in_date'], rng.randint(1, 10))})
+    elif choice == 4:
+        stay = guest_data[rng.randrange(len(guest_data))]
+        guest_data.update(stay, {'room_id': rng.choice(['ST001', 'DE003', 'FA004']), 'room_type': rng.choice(['Standard', 'Deluxe'])})
+    elif choice == 5:
+        stay = guest_data[rng.randrange(len(guest_data))]
+        guest_data.update(stay, {'email': f"changed{rng.randrange(1000)}@example.com"})
+
+def assert_same_as_rebuild(views, guest_data, booking_data):
+    rebuilt = {}
+    rebuild_views(guest_data, booking_data, rebuilt)
+    for table in TABLES:
+        assert views[table] == rebuilt[table], table
+    assert check_views(guest_data, booking_data, views) == []
+
+def test_random_changes_match_a_full_rebuild(tmp_path):
+    make_files(tmp_path)
+    guest_data, booking_data = open_datasets(tmp_path)
+    views = get_daily_views(guest_data, booking_data)
+    rng = random.Random(0)
+    for number in range(1, 1001):
+        random_change(rng, guest_data, booking_data)
+        if number % 100 == 0:
+            assert_same_as_rebuild(views, guest_data, booking_data)
+
+def test_changes_in_batch_mode_match_a_full_rebuild(tmp_path):
+    make_files(tmp_path)
+    guest_data, booking_data = open_datasets(tmp_path)
+    views = get_daily_views(guest_data, booking_data)
+    rng = random.Random(1)
+    with batch_writes(guest_data, booking_data):
+        for _ in range(300):
+            random_change(rng, guest_data, booking_data)
+    assert_same_as_rebuild(views, guest_data, booking_data)
+    # Written at the end of the batch, so the views describe the files again
+    assert views['signature'] == data_signature(guest_data, booking_data)
+
+def test_views_survive_a_restart(tmp_path):
+    make_files(tmp_path)
+    guest_data, booking_data = open_datasets(tmp_path)
+    views = get_daily_views(guest_data, booking_data)
+    rng = random.Random(2)
+    for _ in range(200):
+        random_change(rng, guest_data, booking_data)
+    # What the exit handler does, without waiting for the test run to end
+    _save_on_exit(guest_data, booking_data, views)
+
+    guest_data, booking_data = open_datasets(tmp_path)
+    reopened = get_daily_views(guest_data, booking_data)
+    assert not guest_data.is_loaded()
+    for table in TABLES:
+        assert reopened[table] == views[table], table
+    assert_same_as_rebuild(reopened, guest_data, booking_data)
+
+def test_day_lists_count_stays_and_bookings(tmp_path):
+    make_files(tmp_path, guests=0, bookings=0)
+    guest_data, booking_data = open_datasets(tmp_path)
+    views = get_daily_views(guest_data, booking_data)
+    guest_data.append({'guest_id': '1', 'first_name': 'Eve', 'last_name': 'Jones', 'email': '', 'phone_number': '',
+                       'check_in_date': '2030-05-01', 'check_out_date': '2030-05-04', 'room_id': 'ST001', 'room_type': 'Standard'})
+    booking_data.append({'room_id': 'ST002', 'first_name': 'Bob', 'last_name': 'Smith', 'phone_number': '+1',
+                         'reserved_from': '2030-05-02', 'reserved_to': '2030-05-03'})
+    lists = day_lists(views, '2030-05-02')
+    assert [entry[2] for entry in lists['arrivals']] == ['Smith']
+    assert lists['departures'] == []
+    assert lists['in_house'] == {'Standard': {STAY: 1, BOOKING: 1}}
+    assert day_lists(views, '2030-05-04')['in_house'] == {}
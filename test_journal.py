@@ -0,0 +1,95 @@
+import csv
+import os
+import random
+import pytest
+import journal
+from dataset import Dataset
+from generate_data import generate_bookings, make_rooms, write_csv
+from records import BookingRecord
+
+def make_file(directory, count=200):
+    path = os.path.join(directory, 'Future booking.csv')
+    write_csv(path, generate_bookings(count, random.Random(1), make_rooms(bookings=count)), BookingRecord.FIELDS)
+    return path
+
+def contents(dataset):
+    return [dict(row) for row in dataset]
+
+def csv_contents(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+# Function to make some changes of every kind, each journaled as it is made
+def change(dataset, rng, count=30):
+    for number in range(count):
+        choice = rng.randrange(3)
+        if choice == 0:
+            dataset.append({'room_id': '', 'first_name': 'Test', 'last_name': f"Guest{number}",
+                            'phone_number': '+1-555-0100', 'reserved_from': '2031-01-01', 'reserved_to': '2031-01-03'})
+        elif choice == 1:
+            dataset.update(rng.choice(dataset.rows), {'last_name': f"Moved{number}"})
+        else:
+            dataset.remove(rng.choice(dataset.rows))
+
+def test_replay_after_crash(tmp_path):
+    path = make_file(tmp_path)
+    dataset = Dataset(path, BookingRecord)
+    change(dataset, random.Random(2))
+    # The process ends without saving: the CSV is untouched and the journal holds every change
+    assert os.path.exists(journal.journal_path(path))
+    assert len(csv_contents(path)) == 200
+    assert contents(Dataset(path, BookingRecord)) == contents(dataset)
+
+def test_torn_record_is_dropped_and_repaired(tmp_path):
+    path = make_file(tmp_path)
+    dataset = Dataset(path, BookingRecord)
+    change(dataset, random.Random(3))
+    expected = contents(dataset)
+    # A process died halfway through appending a record
+    with open(journal.journal_path(path), 'a') as file:
+        file.write('{"op": "update", "row": 0, "val')
+    reopened = Dataset(path, BookingRecord)
+    assert contents(reopened) == expected
+    # The next writer cuts the torn record off before appending its own
+    reopened.update(reopened.rows[0], {'first_name': 'After'})
+    assert contents(Dataset(path, BookingRecord)) == contents(reopened)
+
+def test_journal_of_a_rewritten_csv_is_ignored(tmp_path):
+    path = make_file(tmp_path)
+    dataset = Dataset(path, BookingRecord)
+    change(dataset, random.Random(4))
+    # Another program writes a new CSV; the journal describes changes to the old one
+    write_csv(path, generate_bookings(50, random.Random(5), make_rooms(bookings=50)), BookingRecord.FIELDS)
+    reopened = Dataset(path, BookingRecord)
+    assert contents(reopened) == csv_contents(path)
+    reopened.update(reopened.rows[0], {'first_name': 'After'})
+    assert contents(Dataset(path, BookingRecord)) == contents(reopened)
+
+def test_compaction_replaces_the_csv(tmp_path, monkeypatch):
+    path = make_file(tmp_path)
+    monkeypatch.setattr(journal, 'MAX_JOURNAL_SIZE', 2000)
+    dataset = Dataset(path, BookingRecord)
+    change(dataset, random.Random(6), count=100)
+    # The journal was folded into the CSV whenever it grew past the limit
+    assert os.path.getsize(journal.journal_path(path)) <= 2000 + 500
+    dataset.save()
+    assert not os.path.exists(journal.journal_path(path))
+    assert not os.path.exists(path + '.tmp')
+    assert csv_contents(path) == contents(dataset)
+    assert contents(Dataset(path, BookingRecord)) == contents(dataset)
+
+def test_interrupted_compaction_keeps_the_old_csv(tmp_path, monkeypatch):
+    path = make_file(tmp_path)
+    dataset = Dataset(path, BookingRecord)
+    change(dataset, random.Random(7))
+    before = csv_contents(path)
+
+    def crash(source, target):
+        raise OSError("power cut")
+    monkeypatch.setattr(journal.os, 'replace', crash)
+    with pytest.raises(OSError):
+        dataset.save()
+    monkeypatch.undo()
+    # The new CSV only ever existed as the temp file; the old CSV and its journal are untouched
+    assert csv_contents(path) == before
+    assert contents(Dataset(path, BookingRecord)) == contents(dataset)
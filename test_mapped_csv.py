@@ -0,0 +1,84 @@
+import csv
+import os
+import random
+import pytest
+from dataset import Dataset
+from generate_data import generate_guests, make_rooms, write_csv
+from mapped_csv import MappedDataset, index_path
+from records import GuestRecord
+
+def make_file(directory, count=500):
+    path = os.path.join(directory, 'Guest.csv')
+    guests = generate_guests(count, random.Random(21), make_rooms(guests=count))
+    # A quoted value with a line break and a comma must not shift the offsets of the rows after it
+    guests[10]['email'] = 'two\nlines, and a comma'
+    write_csv(path, guests, GuestRecord.FIELDS)
+    return path
+
+# Function to compare lookups on the mapped file with a full read of the CSV and its journal
+def assert_same_lookups(mapped, path, extra_ids=()):
+    full = Dataset(path, GuestRecord)
+    guest_ids = [row['guest_id'] for row in full] + list(extra_ids) + ['0000000000000000']
+    for guest_id in guest_ids:
+        assert [dict(row) for row in mapped.find('guest_id', guest_id)] == \
+               [dict(row) for row in full.find('guest_id', guest_id)]
+    assert len(mapped) == len(full)
+    assert not mapped.is_loaded()
+
+def test_lookups_match_the_csv(tmp_path):
+    path = make_file(tmp_path)
+    mapped = MappedDataset(path, GuestRecord)
+    assert_same_lookups(mapped, path)
+    assert os.path.exists(index_path(path))
+    # A second terminal uses the index file as it is
+    assert_same_lookups(MappedDataset(path, GuestRecord), path)
+
+def test_appended_rows_are_indexed(tmp_path):
+    path = make_file(tmp_path)
+    mapped = MappedDataset(path, GuestRecord)
+    assert_same_lookups(mapped, path)
+    rows = generate_guests(50, random.Random(22), make_rooms(guests=50))
+    with open(path, 'a', newline='') as file:
+        csv.DictWriter(file, fieldnames=GuestRecord.FIELDS).writerows(rows)
+    assert_same_lookups(mapped, path)
+    assert_same_lookups(MappedDataset(path, GuestRecord), path)
+
+def test_journal_and_rewrites_are_followed(tmp_path):
+    path = make_file(tmp_path)
+    mapped = MappedDataset(path, GuestRecord)
+    assert_same_lookups(mapped, path)
+    writer = Dataset(path, GuestRecord)
+    rng = random.Random(23)
+    removed = []
+    for number in range(60):
+        choice = rng.randrange(3)
+        if choice == 0:
+            writer.append({**dict(rng.choice(writer.rows)), 'guest_id': f"new{number}"})
+        elif choice == 1:
+            writer.update(rng.choice(writer.rows), {'last_name': f"Changed{number}"})
+        else:
+            guest = rng.choice(writer.rows)
+            removed.append(guest['guest_id'])
+            writer.remove(guest)
+    assert_same_lookups(mapped, path, removed)
+    # The journal is folded into a new CSV file; the index is built again
+    writer.save()
+    assert_same_lookups(mapped, path, removed)
+
+def test_damaged_index_is_rebuilt(tmp_path):
+    path = make_file(tmp_path)
+    MappedDataset(path, GuestRecord).find('guest_id', '1')
+    with open(index_path(path), 'r+b') as file:
+        file.seek(100)
+        file.write(b'\xff' * 16)
+        file.truncate(200)
+    assert_same_lookups(MappedDataset(path, GuestRecord), path)
+
+def test_changes_are_refused(tmp_path):
+    path = make_file(tmp_path)
+    mapped = MappedDataset(path, GuestRecord)
+    guest = mapped.find('guest_id', Dataset(path, GuestRecord).rows[0]['guest_id'])[0]
+    with pytest.raises(ValueError):
+        mapped.update(guest, {'last_name': 'Changed'})
+    with pytest.raises(ValueError):
+        mapped.append(dict(guest))
@@ -0,0 +1,93 @@
+import gzip
+import os
+import random
+import shutil
+from datetime import date, timedelta
+import pytest
+from dataset import Dataset
+from generate_data import generate_guests, make_rooms, write_csv
+from partitions import PartitionedDataset, partition_csv, archive_closed_months, partition_directory, read_manifest
+from records import GuestRecord
+
+def by_id(rows):
+    return sorted((dict(row) for row in rows), key=lambda row: row['guest_id'])
+
+# Function to write Guest.csv and a copy of it that stays unpartitioned, as the reference
+def make_files(directory, count=400):
+    path = os.path.join(directory, 'Guest.csv')
+    write_csv(path, generate_guests(count, random.Random(11), make_rooms(guests=count)), GuestRecord.FIELDS)
+    reference = os.path.join(directory, 'Reference.csv')
+    shutil.copy(path, reference)
+    return path, reference
+
+def test_partitions_hold_the_same_rows(tmp_path):
+    path, reference = make_files(tmp_path)
+    counts = partition_csv(path, GuestRecord)
+    full = Dataset(reference, GuestRecord)
+    assert sum(counts.values()) == len(full)
+    assert not os.path.exists(path) and os.path.exists(path + '.bak')
+    partitioned = PartitionedDataset(path, GuestRecord)
+    assert by_id(partitioned) == by_id(full)
+    guest = full.rows[len(full) // 2]
+    day = guest['check_in_date']
+    end = (date.fromisoformat(day) + timedelta(days=40)).isoformat()
+    fresh = PartitionedDataset(path, GuestRecord)
+    assert by_id(fresh.find('check_in_date', day)) == by_id(full.find('check_in_date', day))
+    assert by_id(fresh.find_range('check_in_date', day, end)) == by_id(full.find_range('check_in_date', day, end))
+    # A search by check-in date only reads the months it covers
+    assert len(fresh.partitions) < len(fresh.manifest['partitions'])
+    assert by_id(fresh.find('guest_id', guest['guest_id'])) == [dict(guest)]
+
+def test_changes_match_the_unpartitioned_file(tmp_path):
+    path, reference = make_files(tmp_path)
+    partition_csv(path, GuestRecord)
+    partitioned, full = PartitionedDataset(path, GuestRecord), Dataset(reference, GuestRecord)
+    rng = random.Random(12)
+    for number in range(150):
+        guest = rng.choice(partitioned.rows)
+        twin = full.find('guest_id', guest['guest_id'])[0]
+        choice = rng.randrange(4)
+        if choice == 0:
+            start = date.today() + timedelta(days=rng.randint(-400, 60))
+            row = {**dict(guest), 'guest_id': f"new{number}", 'check_in_date': start.isoformat(),
+                   'check_out_date': (start + timedelta(days=3)).isoformat()}
+            partitioned.append(row)
+            full.append(row)
+        elif choice == 1:
+            partitioned.remove(guest)
+            full.remove(twin)
+        else:
+            # Either a new check-out date, or a new check-in date that moves the stay to another month
+            field = 'check_out_date' if choice == 2 else 'check_in_date'
+            value = (date.fromisoformat(guest['check_out_date']) + timedelta(days=rng.randint(-300, 30))).isoformat()
+            partitioned.update(guest, {field: value})
+            full.update(twin, {field: value})
+    assert by_id(partitioned) == by_id(full)
+    assert by_id(PartitionedDataset(path, GuestRecord)) == by_id(full)
+    partitioned.save()
+    assert by_id(PartitionedDataset(path, GuestRecord)) == by_id(full)
+
+def test_archived_months_read_back_from_gzip(tmp_path):
+    path, reference = make_files(tmp_path)
+    partition_csv(path, GuestRecord)
+    archived = archive_closed_months(PartitionedDataset(path, GuestRecord))
+    assert archived
+    manifest = read_manifest(path)
+    for month, count in archived:
+        entry = manifest['partitions'][month]
+        assert entry['archived'] and entry['file'].endswith('.csv.gz')
+        with gzip.open(os.path.join(partition_directory(path), entry['file']), 'rt') as file:
+            assert sum(1 for _ in file) == count + 1
+        assert not os.path.exists(os.path.join(partition_directory(path), f"{month}.csv"))
+    partitioned, full = PartitionedDataset(path, GuestRecord), Dataset(reference, GuestRecord)
+    assert by_id(partitioned) == by_id(full)
+    month = archived[0][0]
+    first, last = f"{month}-01", f"{month}-31"
+    assert by_id(partitioned.find_range('check_in_date', first, last)) == by_id(full.find_range('check_in_date', first, last))
+    stay = partitioned.find_range('check_in_date', first, last)[0]
+    with pytest.raises(ValueError):
+        partitioned.update(stay, {'last_name': 'Changed'})
+    # Stays of open months can still be changed
+    current = partitioned.find_range('check_in_date', date.today().isoformat()[:7], '9999')[0]
+    partitioned.update(current, {'last_name': 'Changed'})
+    assert PartitionedDataset(path, GuestRecord).find('guest_id', current['guest_id'])[0]['last_name'] == 'Changed'
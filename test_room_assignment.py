@@ -0,0 +1,87 @@
+import os
+import random
+from datetime import date, timedelta
+from dataset import Dataset
+from generate_data import generate_guests, generate_bookings, make_rooms, write_csv
+from records import GuestRecord, BookingRecord
+from room_assignment import plan_assignments, assign_rooms
+from room_availability import build_availability, update_availability, row_interval
+
+def day(offset):
+    return (date(2030, 1, 1) + timedelta(days=offset)).isoformat()
+
+def stay(room_id, start, end):
+    return {'room_id': room_id, 'room_type': 'Standard', 'check_in_date': day(start), 'check_out_date': day(end)}
+
+def booking(start, end, room_id=''):
+    return {'room_id': room_id, 'first_name': 'Test', 'last_name': f"Guest{start}-{end}",
+            'phone_number': '+1-555-0100', 'reserved_from': day(start), 'reserved_to': day(end)}
+
+# Function to check that no room holds two overlapping stays or bookings
+def assert_not_double_booked(rows):
+    by_room = {}
+    for row in rows:
+        interval = row_interval(row)
+        if row.get('room_id') and interval:
+            by_room.setdefault(row['room_id'], []).append(interval)
+    for intervals in by_room.values():
+        intervals.sort()
+        for (_, end), (start, _) in zip(intervals, intervals[1:]):
+            assert start >= end
+
+def test_best_fit_takes_the_room_that_frees_up_last():
+    availability = build_availability([stay('ST001', 0, 5), stay('ST002', 0, 9)], [])
+    assignments, unassigned = plan_assignments([booking(10, 12), booking(6, 8)], availability)
+    assert {row['reserved_from']: room_id for row, room_id in assignments} == {day(6): 'ST001', day(10): 'ST002'}
+    assert unassigned == []
+
+def test_later_stays_are_respected():
+    # ST002 is free now but booked by hand from day 20, so a booking over day 20 cannot go there
+    availability = build_availability([stay('ST001', 0, 5), stay('ST002', 0, 8)], [booking(20, 25, 'ST002')])
+    assignments, unassigned = plan_assignments([booking(18, 22)], availability)
+    assert [room_id for _, room_id in assignments] == ['ST001']
+    assignments, unassigned = plan_assignments([booking(18, 22), booking(19, 21)], availability)
+    assert len(assignments) == 1 and len(unassigned) == 1
+
+def test_every_booking_fits_when_the_rooms_suffice():
+    rng = random.Random(8)
+    rooms = [stay(f"ST{number:03d}", -10, -9) for number in range(1, 6)]
+    # Random bookings, kept only while no day has more of them than there are rooms
+    bookings, nights = [], {}
+    for _ in range(400):
+        start = rng.randrange(0, 200)
+        end = start + rng.randint(1, 10)
+        if all(nights.get(night, 0) < len(rooms) for night in range(start, end)):
+            for night in range(start, end):
+                nights[night] = nights.get(night, 0) + 1
+            bookings.append(booking(start, end))
+    assignments, unassigned = plan_assignments(bookings, build_availability(rooms, []))
+    assert unassigned == []
+    for row, room_id in assignments:
+        row['room_id'] = room_id
+    assert_not_double_booked(bookings)
+
+def test_assign_rooms_against_rebuild(tmp_path):
+    rng = random.Random(9)
+    rooms = make_rooms(300, 300)
+    guest_path, booking_path = os.path.join(tmp_path, 'Guest.csv'), os.path.join(tmp_path, 'Future booking.csv')
+    write_csv(guest_path, generate_guests(300, rng, rooms), GuestRecord.FIELDS)
+    bookings = generate_bookings(300, rng, rooms)
+    for row in bookings:
+        if rng.random() < 0.4:
+            row['room_id'] = ''
+    write_csv(booking_path, bookings, BookingRecord.FIELDS)
+    guest_data, booking_data = Dataset(guest_path, GuestRecord), Dataset(booking_path, BookingRecord)
+    availability = build_availability(guest_data, booking_data)
+    booking_data.on_change(lambda op, row, old_values: update_availability(availability, op, row, old_values))
+
+    waiting = sum(1 for row in booking_data if not row['room_id'])
+    assignments, unassigned = assign_rooms(booking_data, availability)
+    assert len(assignments) + len(unassigned) == waiting
+    assert_not_double_booked(list(guest_data) + list(booking_data))
+    # The index followed the assignments, and the journal holds them
+    rebuilt = build_availability(guest_data, booking_data)
+    for room_id, room in rebuilt['rooms'].items():
+        have = availability['rooms'][room_id]
+        assert sorted(zip(have['starts'], have['ends'])) == sorted(zip(room['starts'], room['ends']))
+    assert [dict(row) for row in Dataset(booking_path, BookingRecord)] == [dict(row) for row in booking_data]
@@ -0,0 +1,82 @@
+import os
+import random
+from datetime import date, timedelta
+from dataset import Dataset
+from generate_data import generate_guests, generate_bookings, make_rooms, write_csv
+from records import GuestRecord, BookingRecord
+from room_availability import build_availability, update_availability, find_conflict, list_free_rooms, row_interval
+
+def day(offset):
+    return (date(2025, 1, 1) + timedelta(days=offset)).isoformat()
+
+def overlapping(rows, room_id, start, end, ignore=None):
+    return [row for row in rows if row.get('room_id') == room_id and row is not ignore
+            and row_interval(row) and row_interval(row)[0] < end and row_interval(row)[1] > start]
+
+# Function to check find_conflict against a scan of the rows for random stays in the given rooms
+def assert_conflicts_match(rng, availability, rows, room_ids, span, checks=500):
+    for _ in range(checks):
+        room_id = rng.choice(room_ids)
+        start = date(2025, 1, 1).toordinal() + rng.randrange(-30, span)
+        end = start + rng.randint(1, 20)
+        ignore = rng.choice(rows) if rng.random() < 0.3 else None
+        expected = overlapping(rows, room_id, start, end, ignore)
+        conflict = find_conflict(availability, room_id, start, end, ignore)
+        if expected:
+            assert conflict is not None and conflict in expected
+        else:
+            assert conflict is None
+
+def test_long_stay_room():
+    rng = random.Random(3)
+    # A long-term resident for three years, with short stays before, after and (double-booked) during it
+    guests = [{'guest_id': '1', 'room_id': 'ST001', 'room_type': 'Standard',
+               'check_in_date': day(0), 'check_out_date': day(3 * 365)}]
+    for number in range(2, 600):
+        start = rng.randrange(-400, 1500)
+        guests.append({'guest_id': str(number), 'room_id': rng.choice(['ST001', 'ST002']), 'room_type': 'Standard',
+                       'check_in_date': day(start), 'check_out_date': day(start + rng.randint(1, 5))})
+    availability = build_availability(guests, [])
+    assert_conflicts_match(rng, availability, guests, ['ST001', 'ST002'], 1500)
+    assert find_conflict(availability, 'ST001', date(2026, 6, 1).toordinal(), date(2026, 6, 3).toordinal()) is not None
+    # Only the long stay itself overlaps the middle of it, so moving it conflicts with nothing there
+    middle = date(2026, 6, 1).toordinal()
+    if not overlapping(guests, 'ST001', middle, middle + 1, guests[0]):
+        assert find_conflict(availability, 'ST001', middle, middle + 1, ignore=guests[0]) is None
+    assert 'ST001' not in list_free_rooms(availability, 'Standard', day(500), day(502))
+
+def test_follows_changes_like_rebuild(tmp_path):
+    rng = random.Random(5)
+    rooms = make_rooms(300, 200)
+    write_csv(os.path.join(tmp_path, 'Guest.csv'), generate_guests(300, rng, rooms), GuestRecord.FIELDS)
+    write_csv(os.path.join(tmp_path, 'Future booking.csv'), generate_bookings(200, rng, rooms), BookingRecord.FIELDS)
+    guest_data = Dataset(os.path.join(tmp_path, 'Guest.csv'), GuestRecord)
+    booking_data = Dataset(os.path.join(tmp_path, 'Future booking.csv'), BookingRecord)
+    availability = build_availability(guest_data, booking_data)
+    for dataset in (guest_data, booking_data):
+        dataset.on_change(lambda op, row, old_values: update_availability(availability, op, row, old_values))
+    room_ids = [room_id for room_id, _ in rooms]
+    today = date.today()
+    for _ in range(300):
+        choice = rng.randrange(4)
+        start = today + timedelta(days=rng.randint(-60, 90))
+        if choice == 0:
+            booking_data.append({'room_id': rng.choice(room_ids), 'first_name': 'Test', 'last_name': 'Guest',
+                                 'phone_number': '+1-555-0100', 'reserved_from': start.isoformat(),
+                                 'reserved_to': (start + timedelta(days=rng.randint(1, 30))).isoformat()})
+        elif choice == 1 and len(booking_data):
+            booking_data.remove(rng.choice(booking_data.rows))
+        elif choice == 2:
+            booking = rng.choice(booking_data.rows)
+            booking_data.update(booking, {'room_id': rng.choice(room_ids), 'reserved_from': start.isoformat(),
+                                          'reserved_to': (start + timedelta(days=rng.randint(1, 400))).isoformat()})
+        else:
+            guest = rng.choice(guest_data.rows)
+            guest_data.update(guest, {'check_out_date': (start + timedelta(days=rng.randint(1, 200))).isoformat()})
+    rebuilt = build_availability(guest_data, booking_data)
+    for room_id, room in rebuilt['rooms'].items():
+        have = availability['rooms'][room_id]
+        assert sorted(zip(have['starts'], have['ends'])) == sorted(zip(room['starts'], room['ends']))
+    rows = list(guest_data) + list(booking_data)
+    span = (today - date(2025, 1, 1)).days + 120
+    assert_conflicts_match(rng, availability, rows, room_ids, span, checks=1000)
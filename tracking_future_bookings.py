@@ -1,58 +1,126 @@
-import csv
 from datetime import datetime
+import diagnostics
+import result_cache
+from room_availability import find_conflict, date_ordinal, list_free_rooms, room_types
+from room_assignment import assign_rooms
+from guest_identity import returning_profile, returning_guests_report, REPORT_FIELDS
+from date_queries import BOOKING_DATES, show_arrivals_and_departures, show_in_house
+import journal
 
 # Helper functions for managing bookings
 
-# Function to save updated data back to the CSV file
-def save_to_csv(file_path, data, fieldnames):
-    """Save the updated data back to the CSV file."""
-    with open(file_path, 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
-
-# Function to display booking details in a user-friendly format
-def display_booking_info(booking):
+# Function to display booking details in a user-friendly format; with the identity index
+# (see guest_identity.py) it also shows what is known about a returning guest
+def display_booking_info(booking, identity=None):
     print("\nBooking Information:")
-    print(f"Room ID: {booking.get('room_id', 'The room will be assigned by hotel reservation agents')}")
+    print(f"Room ID: {booking.get('room_id') or 'The room will be assigned by hotel reservation agents'}")
     print(f"First Name: {booking.get('first_name', 'N/A')}")
     print(f"Last Name: {booking.get('last_name', 'N/A')}")
     print(f"Phone Number: {booking.get('phone_number', 'N/A')}")
     print(f"Reserved From: {booking.get('reserved_from', 'N/A')}")
     print(f"Reserved To: {booking.get('reserved_to', 'N/A')}")
+    profile = returning_profile(identity, booking) if identity is not None else None
+    if profile:
+        last_stay = profile['last_stay']
+        match = "Returning guest" if profile['exact'] else "Possible returning guest (same phone number)"
+        print(f"{match}: {profile['stays']} past stay(s), {profile['nights']} night(s), guest ID {profile['guest_id']}")
+        print(f"Usual Room Type: {profile['room_type'] or 'N/A'}")
+        print(f"Last Stay: {last_stay.get('check_in_date')} to {last_stay.get('check_out_date')} in room {last_stay.get('room_id')}")
     print()
 
 # Function to search for a guest by their first name
 def search_upcoming_guest_by_name(bookings_data, first_name):
-    results = [guest for guest in bookings_data if 'first_name' in guest and first_name.lower() in guest['first_name'].lower()]
+    results = result_cache.find_prefix(bookings_data, 'first_name', first_name)
     if len(results) > 1:
         print(f"Multiple guests found with the first name '{first_name}'. Please provide the last name.")
-        last_name = input("Enter last name: ").strip().lower()
-        results = [guest for guest in results if 'last_name' in guest and last_name == guest['last_name'].strip().lower()]
+        last_name = input("Enter last name: ").strip()
+        results = result_cache.find_prefix(bookings_data, 'first_name', first_name, last_name=last_name)
     if not results:
         print(f"No upcoming guests found with the name '{first_name}'.")
     return results
 
 # Function to search for a guest by their last name
 def search_upcoming_guest_by_last_name(bookings_data, last_name):
-    results = [guest for guest in bookings_data if 'last_name' in guest and last_name.lower() in guest['last_name'].lower()]
+    results = result_cache.find_prefix(bookings_data, 'last_name', last_name)
     if len(results) > 1:
         print(f"Multiple guests found with the last name '{last_name}'. Please provide the first name.")
-        first_name = input("Enter first name: ").strip().lower()
-        results = [guest for guest in results if 'first_name' in guest and first_name == guest['first_name'].strip().lower()]
+        first_name = input("Enter first name: ").strip()
+        results = result_cache.find_prefix(bookings_data, 'last_name', last_name, first_name=first_name)
     if not results:
         print(f"No upcoming guests found with the last name '{last_name}'.")
     return results
 
 # Function to search for bookings by check-in date
 def search_upcoming_guests_by_checkin_date(bookings_data, check_in_date):
-    results = [guest for guest in bookings_data if 'reserved_from' in guest and guest['reserved_from'] == check_in_date]
+    results = result_cache.find(bookings_data, 'reserved_from', check_in_date)
     if not results:
         print(f"No upcoming guests found for the check-in date '{check_in_date}'.")
     return results
 
+# Function to describe why a room cannot be used for the requested dates
+def conflict_message(conflict, room_id):
+    start = conflict.get('check_in_date', conflict.get('reserved_from'))
+    end = conflict.get('check_out_date', conflict.get('reserved_to'))
+    return f"Room {room_id} is already occupied by {conflict.get('first_name', '')} {conflict.get('last_name', '')} from {start} to {end}."
+
+# Function to print why a room cannot be used for the requested dates
+def report_conflict(conflict, room_id):
+    print(conflict_message(conflict, room_id))
+
+# Function to validate the dates of a reservation; returns an error message or None if they are fine
+def check_booking_dates(checkin_date, checkout_date):
+    try:
+        checkin = datetime.strptime(checkin_date, "%Y-%m-%d").date()
+        checkout = datetime.strptime(checkout_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return "Invalid date format. Please use YYYY-MM-DD."
+    today = datetime.now().date()
+    if checkin <= today:
+        return "Check-in date must be from tomorrow onwards."
+    if checkout <= checkin:
+        return "Check-out date must be after the check-in date."
+    return None
+
+# Function to check that a room is free for new dates; returns an error message or None
+def check_room_conflict(availability, room_id, checkin_date, checkout_date, ignore=None):
+    if availability is None or not room_id:
+        return None
+    conflict = find_conflict(availability, room_id, date_ordinal(checkin_date), date_ordinal(checkout_date), ignore)
+    return conflict_message(conflict, room_id) if conflict else None
+
+# Shown when a booking found before a prompt was cancelled by another terminal while this one waited
+BOOKING_GONE = "The booking no longer exists; it was cancelled on another terminal."
+
+# Function to find the first booking made under a guest's full name
+def find_booking(bookings_data, first_name, last_name):
+    bookings = result_cache.find(bookings_data, 'first_name', first_name, last_name=last_name)
+    return bookings[0] if bookings else None
+
+# Function to store a new reservation without prompting; returns (booking, error message)
+def create_reservation(bookings_data, reservation, availability=None):
+    new_reservation = {field: reservation.get(field, '').strip() for field in
+                       ['room_id', 'first_name', 'last_name', 'phone_number', 'reserved_from', 'reserved_to']}
+    new_reservation['room_id'] = new_reservation['room_id'].upper()
+    error = (check_booking_dates(new_reservation['reserved_from'], new_reservation['reserved_to']) or
+             check_room_conflict(availability, new_reservation['room_id'],
+                                 new_reservation['reserved_from'], new_reservation['reserved_to']))
+    if error:
+        return None, error
+    return bookings_data.append(new_reservation), None
+
+# Function to move an existing booking to new dates without prompting; returns an error message or None
+def change_booking_dates(bookings_data, booking, new_checkin, new_checkout, availability=None):
+    if not bookings_data.contains(booking):
+        return BOOKING_GONE
+    error = (check_booking_dates(new_checkin, new_checkout) or
+             check_room_conflict(availability, booking.get('room_id'), new_checkin, new_checkout, ignore=booking))
+    if error:
+        return error
+    bookings_data.update(booking, {'reserved_from': new_checkin, 'reserved_to': new_checkout})
+    return None
+
 # Function to add a new reservation to the bookings
-def add_upcoming_reservation(bookings_data):
+def add_upcoming_reservation(bookings_data, availability=None, identity=None):
     new_reservation = {}
     new_reservation['first_name'] = input("Enter guest first name: ").strip()
     new_reservation['last_name'] = input("Enter guest last name: ").strip()
@@ -61,93 +129,147 @@ def add_upcoming_reservation(bookings_data):
     new_reservation['reserved_to'] = input("Enter check-out date (YYYY-MM-DD): ").strip()
 
     # Validate check-in and check-out dates
-    checkin_date = new_reservation['reserved_from']
-    checkout_date = new_reservation['reserved_to']
-    today = datetime.now().date()
-    checkin = datetime.strptime(checkin_date, "%Y-%m-%d").date()
-    checkout = datetime.strptime(checkout_date, "%Y-%m-%d").date()
-
-    if checkin <= today:
-        print("Check-in date must be from tomorrow onwards.")
-        return
-    if checkout <= checkin:
-        print("Check-out date must be after the check-in date.")
+    error = check_booking_dates(new_reservation['reserved_from'], new_reservation['reserved_to'])
+    if error:
+        print(error)
         return
 
-    new_reservation['room_id'] = ""  # Room will be assigned by reservation agents prior to the guests' arrival
-
-    bookings_data.append(new_reservation)
-    save_to_csv('Future booking.csv', bookings_data, bookings_data[0].keys())
+    # Room is optional; if left empty it will be assigned by reservation agents prior to the guests' arrival
+    new_reservation['room_id'] = input("Enter room ID (leave empty to assign later): ").strip()
+    booking, error = create_reservation(bookings_data, new_reservation, availability)
+    if error:
+        print(error)
+        return
 
     print("\nReservation was made successfully with the following details:")
-    display_booking_info(new_reservation)
+    display_booking_info(booking, identity)
 
 # Function to modify check-in or check-out dates for an existing booking
-def modify_booking_dates(bookings_data):
+def modify_booking_dates(bookings_data, availability=None, identity=None):
     first_name = input("Enter guest first name: ").strip().lower()
     last_name = input("Enter guest last name: ").strip().lower()
 
-    results = [guest for guest in bookings_data if 
-               guest.get('first_name', '').lower() == first_name and 
-               guest.get('last_name', '').lower() == last_name]
-
-    if not results:
+    booking_to_modify = find_booking(bookings_data, first_name, last_name)
+    if not booking_to_modify:
         print(f"No booking found for {first_name.title()} {last_name.title()}.")
         return
 
-    booking_to_modify = results[0]
     print("\nBooking to be modified:")
-    display_booking_info(booking_to_modify)
+    display_booking_info(booking_to_modify, identity)
 
     new_checkin = input("Enter new check-in date (YYYY-MM-DD): ").strip()
     new_checkout = input("Enter new check-out date (YYYY-MM-DD): ").strip()
 
-    today = datetime.now().date()
-    checkin = datetime.strptime(new_checkin, "%Y-%m-%d").date()
-    checkout = datetime.strptime(new_checkout, "%Y-%m-%d").date()
-
-    if checkin <= today:
-        print("Check-in date must be from tomorrow onwards.")
-        return
-    if checkout <= checkin:
-        print("Check-out date must be after the check-in date.")
+    error = change_booking_dates(bookings_data, booking_to_modify, new_checkin, new_checkout, availability)
+    if error:
+        print(error)
         return
 
-    booking_to_modify['reserved_from'] = new_checkin
-    booking_to_modify['reserved_to'] = new_checkout
-
-    save_to_csv('Future booking.csv', bookings_data, bookings_data[0].keys())
-
     print("\nBooking dates updated successfully. Here are the updated details:")
-    display_booking_info(booking_to_modify)
+    display_booking_info(booking_to_modify, identity)
 
 # Function to cancel an existing booking
-def cancel_booking(bookings_data):
+def cancel_booking(bookings_data, identity=None):
     first_name = input("Enter guest first name: ").strip().lower()
     last_name = input("Enter guest last name: ").strip().lower()
 
-    results = [guest for guest in bookings_data if 
-               guest.get('first_name', '').lower() == first_name and 
-               guest.get('last_name', '').lower() == last_name]
-
-    if not results:
+    booking_to_cancel = find_booking(bookings_data, first_name, last_name)
+    if not booking_to_cancel:
         print(f"No booking found for {first_name.title()} {last_name.title()}.")
         return
 
-    booking_to_cancel = results[0]
     print("\nBooking to be canceled:")
-    display_booking_info(booking_to_cancel)
+    display_booking_info(booking_to_cancel, identity)
 
     confirm = input("Are you sure you want to cancel this booking? (yes/no): ").strip().lower()
     if confirm in ['yes', 'y']:
+        if not bookings_data.contains(booking_to_cancel):
+            print(BOOKING_GONE)
+            return
         bookings_data.remove(booking_to_cancel)
-        save_to_csv('Future booking.csv', bookings_data, bookings_data[0].keys())
         print("\nThe booking has been successfully canceled.")
     else:
         print("\nThe booking was not canceled.")
 
+# Function to check whether a specific room is free for a date range
+def check_room_availability(availability):
+    room_id = input("Enter room ID: ").strip().upper()
+    date_from = input("Enter check-in date (YYYY-MM-DD): ").strip()
+    date_to = input("Enter check-out date (YYYY-MM-DD): ").strip()
+    try:
+        if date_ordinal(date_to) <= date_ordinal(date_from):
+            print("Check-out date must be after the check-in date.")
+            return
+        conflict = find_conflict(availability, room_id, date_ordinal(date_from), date_ordinal(date_to))
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    if conflict:
+        report_conflict(conflict, room_id)
+    else:
+        print(f"Room {room_id} is free from {date_from} to {date_to}.")
+
+# Function to list the free rooms of a chosen room type for a date range
+def list_free_rooms_by_type(availability):
+    types = room_types(availability)
+    print("Available Room Types:")
+    for idx, room_type in enumerate(types, start=1):
+        print(f"{idx}. {room_type}")
+    choice = input("Select a room type by number: ").strip()
+    if not (choice.isdigit() and 1 <= int(choice) <= len(types)):
+        print("Invalid choice.")
+        return
+    room_type = types[int(choice) - 1]
+    date_from = input("Enter check-in date (YYYY-MM-DD): ").strip()
+    date_to = input("Enter check-out date (YYYY-MM-DD): ").strip()
+    try:
+        free_rooms = list_free_rooms(availability, room_type, date_from, date_to)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return
+    if free_rooms:
+        print(f"Free {room_type} rooms from {date_from} to {date_to}: {', '.join(free_rooms)}")
+    else:
+        print(f"No {room_type} rooms are free from {date_from} to {date_to}.")
+
+# Function to automatically assign rooms to all bookings that do not have one yet
+def assign_rooms_to_bookings(bookings_data, availability):
+    types = room_types(availability)
+    print("Room Types:")
+    for idx, room_type in enumerate(types, start=1):
+        print(f"{idx}. {room_type}")
+    choice = input("Select the room type to assign by number (leave empty for any type): ").strip()
+    if choice and not (choice.isdigit() and 1 <= int(choice) <= len(types)):
+        print("Invalid choice.")
+        return
+    room_type = types[int(choice) - 1] if choice else None
+    assignments, unassigned = assign_rooms(bookings_data, availability, room_type)
+    for booking, room_id in assignments:
+        print(f"{booking.get('first_name', '')} {booking.get('last_name', '')} ({booking.get('reserved_from')} to {booking.get('reserved_to')}): room {room_id}")
+    print(f"\n{len(assignments)} booking(s) assigned, {len(unassigned)} booking(s) could not be assigned.")
+
+# Function to list the upcoming bookings of returning guests and optionally save them to a CSV file
+def show_returning_guests(bookings_data, identity):
+    report = returning_guests_report(identity)
+    if not report:
+        print("None of the upcoming bookings is from a returning guest.")
+        return
+    print(f"{'Guest':<24}{'Arrival':<12}{'Room':<7}{'Stays':>6}{'Nights':>7}  {'Usual Room Type':<16}{'Last Stay':<26}{'Match':<6}")
+    for row in report:
+        name = f"{row['first_name']} {row['last_name']}"
+        print(f"{name:<24}{row['reserved_from']:<12}{row['room_id'] or '-':<7}{row['past_stays']:>6}{row['past_nights']:>7}  "
+              f"{row['usual_room_type']:<16}{row['last_stay']:<26}{row['match']:<6}")
+    print(f"\n{len(report)} of {len(bookings_data)} upcoming bookings are from returning guests.")
+    file_path = input("Enter a file name to save the report as CSV (leave empty to skip): ").strip()
+    if file_path:
+        try:
+            journal.save_to_csv(file_path, report, REPORT_FIELDS)
+            print(f"Report saved to '{file_path}'.")
+        except OSError as e:
+            print(f"Error: Could not write '{file_path}': {e.strerror}.")
+
 # Main function to manage all booking-related operations
-def track_bookings_operations(bookings_data):
+def track_bookings_operations(bookings_data, availability, identity=None):
     while True:
         print("\nTrack Bookings Operations:")
         print("1. Search upcoming guest by name")
@@ -156,38 +278,65 @@ def track_bookings_operations(bookings_data):
         print("4. Add upcoming reservation")
         print("5. Modify booking dates")
         print("6. Cancel a booking")
-        print("7. Go back")
+        print("7. Check room availability")
+        print("8. List free rooms by type")
+        print("9. Assign rooms to unassigned bookings")
+        print("10. Returning guests report")
+        print("11. Arrivals and departures between two dates")
+        print("12. Guests in-house on a night")
+        print("13. Go back")
 
-        choice = input("Choose an operation: ")
+        choice = diagnostics.ask_menu_choice('bookings', "Choose an operation: ")
 
         if choice == "1":
             first_name = input("Enter guest first name: ").strip()
             results = search_upcoming_guest_by_name(bookings_data, first_name)
             for guest in results:
-                display_booking_info(guest)
+                display_booking_info(guest, identity)
 
         elif choice == "2":
             last_name = input("Enter guest last name: ").strip()
             results = search_upcoming_guest_by_last_name(bookings_data, last_name)
             for guest in results:
-                display_booking_info(guest)
+                display_booking_info(guest, identity)
 
         elif choice == "3":
             check_in_date = input("Enter check-in date (YYYY-MM-DD): ").strip()
             results = search_upcoming_guests_by_checkin_date(bookings_data, check_in_date)
             for guest in results:
-                display_booking_info(guest)
+                display_booking_info(guest, identity)
 
         elif choice == "4":
-            add_upcoming_reservation(bookings_data)
+            add_upcoming_reservation(bookings_data, availability, identity)
 
         elif choice == "5":
-            modify_booking_dates(bookings_data)
+            modify_booking_dates(bookings_data, availability, identity)
 
         elif choice == "6":
-            cancel_booking(bookings_data)
+            cancel_booking(bookings_data, identity)
 
         elif choice == "7":
+            check_room_availability(availability)
+
+        elif choice == "8":
+            list_free_rooms_by_type(availability)
+
+        elif choice == "9":
+            assign_rooms_to_bookings(bookings_data, availability)
+
+        elif choice == "10":
+            if identity is None:
+                print("The returning guests report is not available.")
+            else:
+                show_returning_guests(bookings_data, identity)
+
+        elif choice == "11":
+            show_arrivals_and_departures(bookings_data, BOOKING_DATES)
+
+        elif choice == "12":
+            show_in_house(bookings_data, BOOKING_DATES)
+
+        elif choice == "13":
             break
 
         else: